@@ -1,26 +1,86 @@
 from contextlib import asynccontextmanager
+from datetime import date, datetime
 from typing import Annotated
 
-from fastapi import FastAPI, Depends, HTTPException, Query
-from sqlmodel import create_engine, SQLModel, Session, select
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from sqlmodel import SQLModel, Session
 from fastapi.middleware.cors import CORSMiddleware
 
 
-from app.model_operations_manager import operation_router
-from app.auth_client import User, get_current_user
-from app.db_tools import seed_products
+from app.model_operations_manager import run_db, run_operation
+from app.auth_client import (
+    User,
+    auth_client,
+    get_current_superuser,
+    get_current_user,
+)
+from app.categories import category_index
+from app.database import (
+    DB_PERSISTENT,
+    DB_SEED,
+    DB_TEMPLATE_PATH,
+    dispose_engines,
+    engine,
+    get_session,
+)
+from app.db_tools import prepare_database
+from app.etags import (
+    etag_matches,
+    not_modified,
+    order_etag,
+    product_etag,
+    product_list_etag,
+    set_etag,
+)
+from app.exports import (
+    Export,
+    ExportFormat,
+    export_response,
+    orders_query,
+    products_query,
+)
+from app.imports import iter_chunks, iter_import_records
+from app.metrics import (
+    METRICS_CONTENT_TYPE,
+    METRICS_ENABLED,
+    MetricsMiddleware,
+    registry,
+)
+from app.pagination import NEXT_CURSOR_HEADER, set_next_cursor
+from app.sales import SalesGrouping, rebuild_sales_rollup, sales_report
+from app.serialization import render_json
+from app.query_profiler import (
+    QUERY_PROFILE_HEADER,
+    QUERY_PROFILER_ENABLED,
+    QueryProfilerMiddleware,
+)
+from app.product_cache import product_cache
 
 
-from .logging_config import app_logger as logger
+from .logging_config import (
+    REQUEST_ID_HEADER,
+    RequestIdMiddleware,
+    app_logger as logger,
+    setup_logging,
+    shutdown_logging,
+)
 from .model_operations_manager import ModelType, Operation
 
 from app.model import (
+    CategorySummary,
     OrderBatchCreate,
     OrderBatchResponse,
+    OrderBulkDelete,
+    OrderBulkDeleteResponse,
     Product,
+    ProductBulkUpdate,
+    ProductBulkUpdateReport,
     ProductCreate,
+    ProductImportReport,
     ProductPublic,
+    ProductSearch,
     ProductUpdate,
+    SalesReportRow,
     Order,
     OrderPublic,
     OrderUpdate,
@@ -30,40 +90,29 @@ model_operation = Operation
 model_type = ModelType
 
 
-sqlite_file_name = "database.db"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, connect_args=connect_args)
-
-
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
-
-
 def drop_db_and_tables():
     SQLModel.metadata.drop_all(engine)
 
 
-def get_session():
-    with Session(engine) as session:
-        yield session
-
-
 SessionDep = Annotated[Session, Depends(get_session)]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
+    setup_logging()
     logger.info("Application starting up")
-    with Session(engine) as session:
-        logger.info("Application shutting down")
-        seed_products(session)
+    prepare_database(engine, template_path=DB_TEMPLATE_PATH, seed=DB_SEED)
+    auth_client.start()
 
     yield
 
-    # Use this to drop DB everytime the app is closed
-    drop_db_and_tables()
+    logger.info("Application shutting down")
+    await auth_client.close()
+
+    if not DB_PERSISTENT:
+        drop_db_and_tables()
+    await dispose_engines()
+    await shutdown_logging()
 
 
 app = FastAPI(lifespan=lifespan, debug=True)
@@ -74,7 +123,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        NEXT_CURSOR_HEADER,
+        "ETag",
+        REQUEST_ID_HEADER,
+        QUERY_PROFILE_HEADER,
+    ],
 )
+if QUERY_PROFILER_ENABLED:
+    app.add_middleware(QueryProfilerMiddleware)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
 
 
 @app.get("/users/me")
@@ -82,16 +147,26 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 
-@app.get("/categories/", response_model=list[str])
-def get_categories(session: SessionDep, current_user: User = Depends(get_current_user)):
-    categories = session.exec(
-        select(Product.category).where(Product.category.is_not(None)).distinct()
-    ).all()
-    return [cat for cat in categories if cat]
+@app.get("/auth/cache/stats")
+def get_auth_cache_stats(current_user: User = Depends(get_current_superuser)):
+    return auth_client.cache.stats()
+
+
+@app.get("/categories/", response_model=list[str] | list[CategorySummary])
+async def get_categories(
+    session: SessionDep,
+    with_counts: bool = False,
+    current_user: User = Depends(get_current_user),
+):
+    summary = await run_db(session, category_index.summary)
+
+    if with_counts:
+        return summary
+    return [entry["category"] for entry in summary]
 
 
 @app.post("/products/", response_model=ProductPublic)
-def create_product(
+async def create_product(
     create_product: ProductCreate,
     session: SessionDep,
     current_user: User = Depends(get_current_user),
@@ -105,36 +180,136 @@ def create_product(
     }
 
     try:
-        product = operation_router(**new_product)
+        product = await run_operation(**new_product)
         return product
     except Exception as e:
-        logger.error(f"Failed to create product: {str(e)}")
+        logger.error("Failed to create product: {}", e)
+
+
+@app.post("/products/import", response_model=ProductImportReport)
+async def import_products(
+    request: Request,
+    session: SessionDep,
+    current_user: User = Depends(get_current_user),
+):
+    report = ProductImportReport()
+    seen_names = set()
+
+    async for records in iter_chunks(iter_import_records(request)):
+        products = {
+            "session": session,
+            "records": records,
+            "seen_names": seen_names,
+            "operation": model_operation.IMPORT,
+            "model_type": model_type.PRODUCT,
+        }
+        report.rows.extend(await run_operation(**products))
+
+    for row in report.rows:
+        if row.status == "created":
+            report.created += 1
+        elif row.status == "duplicate":
+            report.duplicates += 1
+        elif row.status == "invalid":
+            report.invalid += 1
+        else:
+            report.failed += 1
+
+    logger.info(
+        "Product import finished: {} created, {} duplicates, {} invalid",
+        report.created,
+        report.duplicates,
+        report.invalid,
+    )
+    return report
 
 
 @app.get("/products/", response_model=list[ProductPublic])
-def read_products(
+async def read_products(
     session: SessionDep,
+    request: Request,
+    response: Response,
     offset: int = 0,
     limit: Annotated[int, Query(le=100)] = 100,
+    cursor: str | None = None,
     current_user: User = Depends(get_current_user),
 ):
 
+    etag = await run_db(session, product_list_etag, offset, limit, cursor)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     products = {
         "session": session,
         "offset": offset,
         "limit": limit,
+        "cursor": cursor,
         "operation": model_operation.LIST,
         "model_type": model_type.PRODUCT,
     }
 
-    return operation_router(**products)
+    products = await run_operation(**products)
+    set_next_cursor(response, products, limit)
+    set_etag(response, etag)
+    return render_json(products, list[ProductPublic], response)
+
+
+@app.get("/products/cache/stats")
+def get_product_cache_stats(current_user: User = Depends(get_current_superuser)):
+    return product_cache.stats()
+
+
+@app.get("/products/search", response_model=list[ProductPublic])
+async def search_products(
+    session: SessionDep,
+    response: Response,
+    q: str | None = None,
+    category: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    out_of_stock: bool | None = None,
+    offset: int = 0,
+    limit: Annotated[int, Query(le=100)] = 20,
+    cursor: str | None = None,
+    current_user: User = Depends(get_current_user),
+):
+
+    search = ProductSearch(
+        query=q,
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        out_of_stock=out_of_stock,
+        offset=offset,
+        limit=limit,
+        cursor=cursor,
+    )
+    products = {
+        "session": session,
+        "search": search,
+        "operation": model_operation.SEARCH,
+        "model_type": model_type.PRODUCT,
+    }
+
+    products, next_cursor = await run_operation(**products)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return render_json(products, list[ProductPublic], response)
 
 
 @app.get("/products/{product_id}", response_model=ProductPublic)
-def read_product(
-    product_id: int, session: SessionDep, current_user: User = Depends(get_current_user)
+async def read_product(
+    product_id: int,
+    session: SessionDep,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
 ) -> Product:
 
+    etag = await run_db(session, product_etag, product_id)
+    if etag is not None and etag_matches(request, etag):
+        return not_modified(etag)
+
     product = {
         "session": session,
         "operation": model_operation.GET,
@@ -142,11 +317,14 @@ def read_product(
         "product_id": product_id,
     }
 
-    product = operation_router(**product)
+    product = await run_operation(**product)
+    if etag is not None:
+        set_etag(response, etag)
+    return product
 
 
 @app.delete("/products/{product_id}")
-def delete_product(
+async def delete_product(
     product_id: int, session: SessionDep, current_user: User = Depends(get_current_user)
 ):
 
@@ -157,11 +335,30 @@ def delete_product(
         "product_id": product_id,
     }
 
-    return operation_router(**product)
+    return await run_operation(**product)
+
+
+@app.patch("/products/", response_model=ProductBulkUpdateReport)
+async def bulk_update_products(
+    updates: list[ProductBulkUpdate],
+    session: SessionDep,
+    partial: bool = False,
+    current_user: User = Depends(get_current_user),
+):
+
+    products = {
+        "bulk_update": updates,
+        "partial": partial,
+        "session": session,
+        "operation": model_operation.BULK_UPDATE,
+        "model_type": model_type.PRODUCT,
+    }
+
+    return await run_operation(**products)
 
 
 @app.patch("/products/{product_id}", response_model=ProductPublic)
-def update_product(
+async def update_product(
     product_id: int,
     product: ProductUpdate,
     session: SessionDep,
@@ -176,14 +373,16 @@ def update_product(
         "product_id": product_id,
     }
 
-    return operation_router(**product)
+    return await run_operation(**product)
 
 
 @app.get("/orders/", response_model=list[OrderPublic])
-def read_orders(
+async def read_orders(
     session: SessionDep,
+    response: Response,
     offset: int = 0,
     limit: Annotated[int, Query(le=100)] = 100,
+    cursor: str | None = None,
     current_user: User = Depends(get_current_user),
 ):
 
@@ -191,18 +390,51 @@ def read_orders(
         "session": session,
         "offset": offset,
         "limit": limit,
+        "cursor": cursor,
         "operation": model_operation.LIST,
         "model_type": model_type.ORDER,
     }
 
-    return operation_router(**orders)
+    orders = await run_operation(**orders)
+    set_next_cursor(response, orders, limit)
+    return render_json(orders, list[OrderPublic], response)
+
+
+@app.post("/orders/cancel", response_model=OrderBulkDeleteResponse)
+async def delete_orders(
+    orders: OrderBulkDelete,
+    session: SessionDep,
+    current_user: User = Depends(get_current_user),
+):
+    if orders.order_batch_id is None and not orders.order_ids:
+        raise HTTPException(
+            status_code=422, detail="Provide order_ids or an order_batch_id"
+        )
+
+    orders = {
+        "order_ids": orders.order_ids,
+        "order_batch_id": orders.order_batch_id,
+        "operation": model_operation.BULK_DELETE,
+        "session": session,
+        "model_type": model_type.ORDER,
+    }
+
+    return await run_operation(**orders)
 
 
 @app.get("/orders/{order_id}", response_model=OrderPublic)
-def read_order(
-    order_id: int, session: SessionDep, current_user: User = Depends(get_current_user)
+async def read_order(
+    order_id: int,
+    session: SessionDep,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
 ) -> Order:
 
+    etag = await run_db(session, order_etag, order_id)
+    if etag is not None and etag_matches(request, etag):
+        return not_modified(etag)
+
     order = {
         "session": session,
         "operation": model_operation.GET,
@@ -210,11 +442,14 @@ def read_order(
         "order_id": order_id,
     }
 
-    return operation_router(**order)
+    order = await run_operation(**order)
+    if etag is not None:
+        set_etag(response, etag)
+    return order
 
 
 @app.delete("/orders/{order_id}")
-def delete_order(
+async def delete_order(
     order_id: int, session: SessionDep, current_user: User = Depends(get_current_user)
 ):
 
@@ -225,11 +460,11 @@ def delete_order(
         "order_id": order_id,
     }
 
-    return operation_router(**order)
+    return await run_operation(**order)
 
 
 @app.patch("/orders/{order_id}", response_model=OrderPublic)
-def update_order(
+async def update_order(
     order_id: int,
     order: OrderUpdate,
     session: SessionDep,
@@ -244,11 +479,11 @@ def update_order(
         "model_type": model_type.ORDER,
     }
 
-    return operation_router(**order)
+    return await run_operation(**order)
 
 
 @app.post("/orders/", response_model=OrderBatchResponse)
-def create_order_batch(
+async def create_order_batch(
     orders_data: OrderBatchCreate,
     session: SessionDep,
     current_user: User = Depends(get_current_user),
@@ -261,4 +496,50 @@ def create_order_batch(
         "model_type": model_type.ORDER,
     }
 
-    return operation_router(**order)
+    order_batch = await run_operation(**order)
+    return render_json(order_batch, OrderBatchResponse)
+
+
+@app.get("/export/products")
+async def export_products(
+    session: SessionDep,
+    export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON,
+    since: datetime | None = None,
+    current_user: User = Depends(get_current_user),
+):
+    return export_response(
+        session, products_query(since), Export("products", export_format)
+    )
+
+
+@app.get("/export/orders")
+async def export_orders(
+    session: SessionDep,
+    export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON,
+    since: datetime | None = None,
+    current_user: User = Depends(get_current_user),
+):
+    return export_response(
+        session, orders_query(since), Export("orders", export_format)
+    )
+
+
+@app.get("/reports/sales", response_model=list[SalesReportRow])
+async def get_sales_report(
+    session: SessionDep,
+    group_by: SalesGrouping = SalesGrouping.DAY,
+    start: date | None = None,
+    end: date | None = None,
+    status: Annotated[list[str] | None, Query()] = None,
+    current_user: User = Depends(get_current_user),
+):
+    return await run_db(session, sales_report, group_by, start, end, status)
+
+
+@app.post("/reports/sales/rebuild")
+async def rebuild_sales_report(
+    session: SessionDep,
+    current_user: User = Depends(get_current_superuser),
+):
+    rows = await run_db(session, rebuild_sales_rollup)
+    return {"ok": True, "rows": rows}
@@ -0,0 +1,235 @@
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlmodel import select
+from app.categories import category_index
+from app.model import Order, OrderBatch, OrderDetail, Product
+from app.orders import (
+    batch_demand,
+    batch_detail_rows,
+    batch_order_ids,
+    batch_order_rows,
+    delete_order_rows,
+    insufficient_stock,
+    order_batch_with_orders,
+    order_details_loader,
+    reserve_stock,
+    sold_out_changes,
+)
+from app.metrics import order_batch_size
+from app.pagination import paginate
+from app.sales import change_order_status, record_order_batch
+from app.product_cache import bump_product_version, product_cache
+from .logging_config import app_logger as logger, log_sampler
+
+
+async def create_order_batch(orders):
+
+    orders_data = orders["orders_data"]
+    session = orders["session"]
+
+    logger.info("Creating order batch with {} orders", len(orders_data.order_list))
+    order_batch_size.observe(len(orders_data.order_list))
+
+    try:
+        product_ids = {
+            item.product_id for order in orders_data.order_list for item in order.items
+        }
+        products = {
+            product.id: product
+            for product in (
+                await session.exec(select(Product).where(Product.id.in_(product_ids)))
+            ).all()
+        }
+        demand = batch_demand(orders_data, products)
+
+        now = datetime.utcnow()
+
+        for product_id in sorted(demand):
+            quantity = demand[product_id]
+            reserved = await session.exec(reserve_stock(product_id, quantity, now))
+            if reserved.rowcount != 1:
+                await session.rollback()
+                product = await session.get(Product, product_id, populate_existing=True)
+                raise insufficient_stock(product, product_id, quantity)
+
+        order_batch = OrderBatch(created_at=now)
+        session.add(order_batch)
+        await session.flush()
+
+        order_rows = batch_order_rows(orders_data, products, order_batch.id, now)
+        if order_rows:
+            await session.exec(insert(Order), params=order_rows)
+        order_ids = (await session.exec(batch_order_ids(order_batch.id))).all()
+
+        detail_rows = batch_detail_rows(orders_data, products, order_ids)
+        for order_id, order in zip(order_ids, orders_data.order_list):
+            if log_sampler.allow("orders.create_order_batch.order"):
+                logger.debug(
+                    "Order {} created for {} with {} items",
+                    order_id,
+                    order.customer_email,
+                    len(order.items),
+                )
+        if detail_rows:
+            await session.exec(insert(OrderDetail), params=detail_rows)
+        await session.run_sync(record_order_batch, order_batch.id)
+        sold_out = sold_out_changes(products, demand)
+
+        version = await session.run_sync(bump_product_version)
+        await session.commit()
+        product_cache.written(version, demand)
+        category_index.products_changed(sold_out, version)
+        order_batch = (
+            await session.exec(order_batch_with_orders(order_batch.id))
+        ).one()
+
+        logger.success(
+            "Order batch created successfully with {} orders", len(order_ids)
+        )
+        return order_batch
+
+    except HTTPException:
+        await session.rollback()
+        logger.error("Order batch creation failed due to business logic error")
+        raise
+
+    except Exception as e:
+        await session.rollback()
+        logger.error("Unexpected error creating order batch: {}", e)
+        raise HTTPException(status_code=500, detail="Failed to create order batch")
+
+
+async def get_orders(orders):
+
+    session = orders["session"]
+    offset = orders["offset"]
+    limit = orders["limit"]
+    cursor = orders.get("cursor")
+
+    try:
+        orders = (
+            await session.exec(
+                paginate(
+                    select(Order).options(order_details_loader),
+                    Order.id,
+                    offset,
+                    limit,
+                    cursor,
+                )
+            )
+        ).all()
+        logger.info(
+            "Retrieved {} orders",
+            len(orders),
+            extra={
+                "count": len(orders),
+                "offset": offset,
+                "limit": limit,
+                "cursor": cursor,
+            },
+        )
+        return orders
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.error("Database error retrieving orders: {}", e)
+        raise HTTPException(status_code=500, detail="Failed to retrieve orders")
+
+
+async def get_order(order):
+
+    session = order["session"]
+    order_id = order["order_id"]
+
+    order = await session.get(Order, order_id, options=[order_details_loader])
+    if not order:
+        logger.warning("Order {} not found", order_id)
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    logger.info("Order {} retrieved successfully", order_id)
+    return order
+
+
+async def delete_order(order):
+
+    session = order["session"]
+    order_id = order["order_id"]
+
+    try:
+        deleted = await session.run_sync(delete_order_rows, [order_id])
+
+    except Exception as e:
+        await session.rollback()
+        logger.error("Failed to delete order {}: {}", order_id, e)
+        raise HTTPException(status_code=500, detail="Failed to delete order")
+
+    if not deleted:
+        logger.warning("Order {} not found for deletion", order_id)
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    logger.success("Order {} deleted successfully", order_id)
+    return {"ok": True}
+
+
+async def delete_orders(orders):
+
+    session = orders["session"]
+    order_ids = orders["order_ids"]
+    order_batch_id = orders.get("order_batch_id")
+
+    try:
+        deleted = await session.run_sync(delete_order_rows, order_ids, order_batch_id)
+
+    except Exception as e:
+        await session.rollback()
+        logger.error("Failed to delete orders: {}", e)
+        raise HTTPException(status_code=500, detail="Failed to delete orders")
+
+    if order_batch_id is not None and not deleted:
+        logger.warning("Order batch {} not found for deletion", order_batch_id)
+        raise HTTPException(status_code=404, detail="Order batch not found")
+
+    missing = sorted(set(order_ids) - set(deleted))
+    logger.success("Deleted {} orders", len(deleted), extra={"missing": len(missing)})
+    return {"ok": True, "deleted": sorted(deleted), "missing": missing}
+
+
+async def update_order(order):
+
+    order_to_update = order["update_order"]
+    order_id = order["order_id"]
+    session = order["session"]
+
+    order_data = order_to_update.model_dump(exclude_unset=True)
+    if not order_data:
+        logger.warning(
+            "No data provided for order update", extra={"order_id": order_id}
+        )
+        raise HTTPException(status_code=422, detail="Unprocessable Entity")
+
+    order_db = await session.get(Order, order_id)
+    if not order_db:
+        logger.warning("Order {} not found for update", order_id)
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    try:
+        if order_data.get("status") not in (None, order_db.status):
+            await session.run_sync(change_order_status, order_id, order_data["status"])
+        order_data.setdefault("updated_at", datetime.utcnow())
+        order_db.sqlmodel_update(order_data)
+        await session.commit()
+        order_db = await session.get(
+            Order, order_id, options=[order_details_loader], populate_existing=True
+        )
+        logger.success(
+            "Order {} updated successfully", order_id, extra={"order_id": order_id}
+        )
+        return order_db
+
+    except Exception as e:
+        await session.rollback()
+        logger.error("Failed to update order {}: {}", order_id, e)
+        raise HTTPException(status_code=500, detail=f"Failed to update order: {str(e)}")
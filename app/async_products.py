@@ -0,0 +1,198 @@
+from datetime import datetime
+from fastapi import HTTPException
+from sqlmodel import select
+from app.categories import category_index, is_in_stock
+from app.model import Product
+from app.pagination import paginate
+from app.search import search_page, search_statement
+from app.product_cache import bump_product_version, product_cache
+from app.products import bulk_update_product_rows, import_product_chunk
+from .logging_config import app_logger as logger
+
+
+async def create_product(new_product):
+
+    create_product = new_product["create_product"]
+    session = new_product["session"]
+    current_user = new_product["current_user"]
+
+    product = Product.model_validate(create_product, strict=True)
+
+    existing_product = (
+        await session.exec(select(Product).where(Product.name == product.name))
+    ).first()
+
+    if existing_product:
+        logger.warning("Product '{}' already exists", product.name)
+        raise HTTPException(
+            status_code=409, detail=f"Product '{product.name}' already exists"
+        )
+
+    try:
+        session.add(product)
+        await session.flush()
+        version = await session.run_sync(bump_product_version)
+        await session.commit()
+        await session.refresh(product)
+        product_cache.written(version, [product.id], membership_changed=True)
+        category_index.product_added(product, version)
+        logger.success(
+            "Product '{}' created by {}",
+            product.name,
+            current_user.email,
+            extra={"product_id": product.id, "user_email": current_user.email},
+        )
+        return product
+
+    except Exception as e:
+        await session.rollback()
+        logger.error("Database error creating product: {}", e)
+        raise HTTPException(status_code=500, detail="Failed to create product")
+
+
+async def list_products(products):
+    session = products["session"]
+    offset = products["offset"]
+    limit = products["limit"]
+    cursor = products.get("cursor")
+
+    await session.run_sync(product_cache.check_version)
+    generation = product_cache.generation
+    cached = product_cache.get_page(offset, limit, cursor)
+    if cached is not None:
+        return cached
+
+    products = (
+        await session.exec(paginate(select(Product), Product.id, offset, limit, cursor))
+    ).all()
+    products = product_cache.put_page(offset, limit, cursor, products, generation)
+    logger.info(
+        "Retrieved {} products",
+        len(products),
+        extra={
+            "count": len(products),
+            "offset": offset,
+            "limit": limit,
+            "cursor": cursor,
+        },
+    )
+    return products
+
+
+async def search_products(product_search):
+    session = product_search["session"]
+    search = product_search["search"]
+
+    rows = (await session.exec(search_statement(session, **search.model_dump()))).all()
+    products, next_cursor = search_page(rows, search.limit)
+    logger.info(
+        "Search matched {} products",
+        len(products),
+        extra={"count": len(products), **search.model_dump(exclude_none=True)},
+    )
+    return products, next_cursor
+
+
+async def get_product(current_product):
+    session = current_product["session"]
+    product_id = current_product["product_id"]
+
+    await session.run_sync(product_cache.check_version)
+    generation = product_cache.generation
+    cached = product_cache.get_product(product_id)
+    if cached is not None:
+        return cached
+
+    product = await session.get(Product, product_id)
+    if not product:
+        logger.warning("Product {} not found", product_id)
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product_cache.put_product(product, generation)
+
+
+async def delete_product(product):
+    session = product["session"]
+    product_id = product["product_id"]
+    product = await session.get(Product, product_id)
+    if not product:
+        logger.warning("Product {} not found for deletion", product_id)
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    try:
+        product_name = product.name
+        category = product.category
+        in_stock = is_in_stock(product)
+        await session.delete(product)
+        await session.flush()
+        version = await session.run_sync(bump_product_version)
+        await session.commit()
+        product_cache.written(version, [product_id], membership_changed=True)
+        category_index.product_removed(category, in_stock, version)
+        logger.success(
+            "Product '{}' deleted successfully",
+            product_name,
+            extra={"product_id": product_id},
+        )
+        return {"ok": True}
+
+    except Exception as e:
+        await session.rollback()
+        logger.error("Failed to delete product: {}", e)
+        raise HTTPException(
+            status_code=500, detail=f"Failed to delete product: {str(e)}"
+        )
+
+
+async def update_product(product_for_update):
+
+    product = product_for_update["update_product"]
+    product_id = product_for_update["product_id"]
+    session = product_for_update["session"]
+
+    product_data = product.model_dump(exclude_unset=True)
+    if not product_data:
+        logger.warning(
+            "No data provided for product update", extra={"product_id": product_id}
+        )
+        raise HTTPException(status_code=422, detail="Unprocessable Entity")
+
+    product_db = await session.get(Product, product_id)
+    if not product_db:
+        logger.warning("Product {} not found for update", product_id)
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    try:
+        old_category = product_db.category
+        old_in_stock = is_in_stock(product_db)
+        product_data.setdefault("updated_at", datetime.utcnow())
+        product_db.sqlmodel_update(product_data)
+        version = await session.run_sync(bump_product_version)
+        await session.commit()
+        await session.refresh(product_db)
+        product_cache.written(version, [product_id])
+        category_index.product_changed(old_category, old_in_stock, product_db, version)
+        logger.success(
+            "Updated product successfully", extra={"product_id": product_db.id}
+        )
+        return product_db
+
+    except Exception as e:
+        await session.rollback()
+        logger.error("Failed to update product: {}", e)
+        raise HTTPException(
+            status_code=500, detail=f"Failed to update product: {str(e)}"
+        )
+
+
+async def import_products(import_request):
+    session = import_request["session"]
+    records = import_request["records"]
+    seen_names = import_request["seen_names"]
+    return await session.run_sync(import_product_chunk, records, seen_names)
+
+
+async def bulk_update_products(bulk_update):
+    session = bulk_update["session"]
+    updates = bulk_update["bulk_update"]
+    partial = bulk_update["partial"]
+    return await session.run_sync(bulk_update_product_rows, updates, partial)
@@ -1,11 +1,46 @@
+import asyncio
+import hashlib
+import json
 import os
-import requests
+import time
+from collections import OrderedDict
+
+import httpx
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 
+from app.metrics import auth_request_duration
+
 load_dotenv()
 AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://localhost:5001")
+AUTH_POOL_SIZE = int(os.getenv("AUTH_POOL_SIZE", "20"))
+AUTH_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("AUTH_KEEPALIVE_CONNECTIONS", str(AUTH_POOL_SIZE))
+)
+AUTH_KEEPALIVE_EXPIRY = float(os.getenv("AUTH_KEEPALIVE_EXPIRY", "30"))
+AUTH_TIMEOUT = float(os.getenv("AUTH_TIMEOUT", "5"))
+AUTH_CONNECT_TIMEOUT = float(os.getenv("AUTH_CONNECT_TIMEOUT", "2"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_NEGATIVE_TTL = float(os.getenv("AUTH_CACHE_NEGATIVE_TTL", "5"))
+
+# "remote" asks the auth service for every new token, "local" verifies signed
+# JWTs against AUTH_JWT_PUBLIC_KEY(_FILE) or AUTH_JWKS(_FILE).
+AUTH_MODE = os.getenv("AUTH_MODE", "remote")
+AUTH_JWT_PUBLIC_KEY = os.getenv("AUTH_JWT_PUBLIC_KEY")
+AUTH_JWT_PUBLIC_KEY_FILE = os.getenv("AUTH_JWT_PUBLIC_KEY_FILE")
+AUTH_JWKS = os.getenv("AUTH_JWKS")
+AUTH_JWKS_FILE = os.getenv("AUTH_JWKS_FILE")
+AUTH_JWT_ALGORITHMS = os.getenv("AUTH_JWT_ALGORITHMS", "RS256,ES256")
+AUTH_JWT_AUDIENCE = os.getenv("AUTH_JWT_AUDIENCE")
+AUTH_JWT_ISSUER = os.getenv("AUTH_JWT_ISSUER")
+AUTH_JWT_LEEWAY = float(os.getenv("AUTH_JWT_LEEWAY", "0"))
+AUTH_JWT_REMOTE_FALLBACK = os.getenv("AUTH_JWT_REMOTE_FALLBACK", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
 
 security = HTTPBearer()
 
@@ -18,38 +53,351 @@ class User:
         self.is_superuser = user_data.get("is_superuser", False)
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-) -> User:
+class TokenCache:
+    """Bounded LRU cache of token verification results with per-entry TTL.
 
-    token = credentials.credentials
+    Entries are keyed by a SHA-256 digest of the token so raw credentials are
+    never kept in memory. Rejected tokens are cached too, with a shorter TTL.
+    """
 
-    try:
-        response = requests.get(
-            f"{AUTH_SERVICE_URL}/users/me",
-            headers={"Authorization": f"Bearer {token}"},
-            timeout=5,
+    def __init__(
+        self,
+        max_size: int = AUTH_CACHE_SIZE,
+        ttl: float = AUTH_CACHE_TTL,
+        negative_ttl: float = AUTH_CACHE_NEGATIVE_TTL,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: OrderedDict[str, tuple[float, User | HTTPException]] = (
+            OrderedDict()
         )
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
-        if response.status_code == 401:
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, key: str) -> User | HTTPException | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def set(self, key: str, result: User | HTTPException):
+        if self.max_size <= 0:
+            return
+
+        ttl = self.ttl if isinstance(result, User) else self.negative_ttl
+        self._entries[key] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class LocalTokenVerifier:
+    """Verifies signed JWTs in-process and builds the User from their claims.
+
+    Keys come from a single PEM public key or a JWK set; with a key set the
+    token's ``kid`` header selects the key. Requires the ``jwt`` extra
+    (PyJWT with cryptography).
+    """
+
+    def __init__(
+        self,
+        public_key: str | None = None,
+        jwks: dict | None = None,
+        algorithms: list[str] | None = None,
+        audience: str | None = None,
+        issuer: str | None = None,
+        leeway: float = 0,
+        remote_fallback: bool = False,
+    ):
+        try:
+            import jwt
+        except ImportError as e:
+            raise RuntimeError(
+                "Local token verification requires PyJWT: "
+                "pip install python-backend-app[jwt]"
+            ) from e
+
+        if public_key is None and jwks is None:
+            raise ValueError("A public key or a JWK set is required")
+
+        self._jwt = jwt
+        self.public_key = public_key
+        self.jwk_set = jwt.PyJWKSet.from_dict(jwks) if jwks is not None else None
+        self.algorithms = algorithms or ["RS256", "ES256"]
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        self.remote_fallback = remote_fallback
+
+    @classmethod
+    def from_env(cls) -> "LocalTokenVerifier":
+        public_key = AUTH_JWT_PUBLIC_KEY
+        if public_key is None and AUTH_JWT_PUBLIC_KEY_FILE:
+            with open(AUTH_JWT_PUBLIC_KEY_FILE) as f:
+                public_key = f.read()
+
+        jwks = json.loads(AUTH_JWKS) if AUTH_JWKS else None
+        if jwks is None and AUTH_JWKS_FILE:
+            with open(AUTH_JWKS_FILE) as f:
+                jwks = json.load(f)
+
+        return cls(
+            public_key=public_key,
+            jwks=jwks,
+            algorithms=[a.strip() for a in AUTH_JWT_ALGORITHMS.split(",") if a],
+            audience=AUTH_JWT_AUDIENCE,
+            issuer=AUTH_JWT_ISSUER,
+            leeway=AUTH_JWT_LEEWAY,
+            remote_fallback=AUTH_JWT_REMOTE_FALLBACK,
+        )
+
+    def _signing_key(self, token: str):
+        if self.jwk_set is None:
+            return self.public_key
+
+        kid = self._jwt.get_unverified_header(token).get("kid")
+        if kid is None:
+            if len(self.jwk_set.keys) != 1:
+                raise self._jwt.InvalidTokenError("Token has no key id")
+            return self.jwk_set.keys[0].key
+        try:
+            return self.jwk_set[kid].key
+        except KeyError:
+            raise self._jwt.InvalidTokenError(f"Unknown key id {kid}")
+
+    def verify(self, token: str) -> User | None:
+        """Return the User for a valid token.
+
+        Expired tokens and tokens for another audience or issuer are always
+        rejected. Tokens that cannot be verified locally at all (not a JWT,
+        unknown key) return None when remote fallback is enabled so the
+        caller can ask the auth service instead.
+        """
+        jwt = self._jwt
+        options = {"require": ["exp"]}
+        if self.audience is None:
+            options["verify_aud"] = False
+
+        try:
+            claims = jwt.decode(
+                token,
+                self._signing_key(token),
+                algorithms=self.algorithms,
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.leeway,
+                options=options,
+            )
+        except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or expired token",
             )
-        elif response.status_code != 200:
+        except (
+            jwt.InvalidAudienceError,
+            jwt.InvalidIssuerError,
+            jwt.MissingRequiredClaimError,
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+            )
+        except jwt.InvalidTokenError:
+            if self.remote_fallback:
+                return None
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
             )
 
-        user_data = response.json()
-        return User(user_data)
+        user_id = claims.get("id", claims.get("sub"))
+        if isinstance(user_id, str) and user_id.isdigit():
+            user_id = int(user_id)
 
-    except requests.RequestException:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Authentication service unavailable",
+        return User(
+            {
+                "id": user_id,
+                "email": claims.get("email"),
+                "is_active": claims.get("is_active", True),
+                "is_superuser": claims.get("is_superuser", False),
+            }
+        )
+
+
+class AuthClient:
+    """Async client for the auth service, backed by a keep-alive connection pool.
+
+    The pool is opened with ``start()`` and released with ``close()``; both are
+    called from the application lifespan.
+    """
+
+    def __init__(
+        self,
+        base_url: str = AUTH_SERVICE_URL,
+        pool_size: int = AUTH_POOL_SIZE,
+        keepalive_connections: int = AUTH_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = AUTH_KEEPALIVE_EXPIRY,
+        timeout: float = AUTH_TIMEOUT,
+        connect_timeout: float = AUTH_CONNECT_TIMEOUT,
+        verifier: LocalTokenVerifier | None = None,
+    ):
+        self.base_url = base_url
+        self.limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
         )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._client: httpx.AsyncClient | None = None
+        self.cache = TokenCache()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.verifier = verifier
+
+    @property
+    def is_started(self) -> bool:
+        return self._client is not None and not self._client.is_closed
+
+    def start(self):
+        if not self.is_started:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, limits=self.limits, timeout=self.timeout
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch_user(self, token: str) -> User:
+        # Dependencies may run outside the lifespan (e.g. in scripts), so the
+        # pool is opened on first use if it has not been started yet.
+        self.start()
+
+        sent_at = time.perf_counter()
+        try:
+            response = await self._client.get(
+                "/users/me", headers={"Authorization": f"Bearer {token}"}
+            )
+        except httpx.HTTPError:
+            auth_request_duration.observe(time.perf_counter() - sent_at, "error")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service unavailable",
+            )
+
+        auth_request_duration.observe(
+            time.perf_counter() - sent_at, str(response.status_code)
+        )
+
+        if response.status_code == 401:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token",
+            )
+        elif response.status_code == 403:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+            )
+        elif response.status_code != 200:
+            # 5xx, 429 and the like say nothing about the token itself.
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service unavailable",
+            )
+
+        return User(response.json())
+
+    async def verify_token(self, token: str) -> User:
+        """Resolve a token to a User, serving repeat tokens from the cache.
+
+        Concurrent misses for the same token share a single upstream call.
+        Only definitive rejections are cached; an unavailable auth service
+        is not. With a local verifier configured the auth service is only
+        consulted for tokens the verifier hands back.
+        """
+        if self.verifier is not None:
+            user = self.verifier.verify(token)
+            if user is not None:
+                return user
+
+        key = self.cache.key(token)
+        cached = self.cache.get(key)
+        if isinstance(cached, HTTPException):
+            raise HTTPException(status_code=cached.status_code, detail=cached.detail)
+        if cached is not None:
+            return cached
+
+        # The upstream call runs in a task of its own that every caller
+        # shields, so a caller that is cancelled, e.g. by a client disconnect,
+        # does not cancel the call for the others sharing it.
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_cache(key, token))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._fetch_done(key, done))
+        return await asyncio.shield(task)
+
+    async def _fetch_and_cache(self, key: str, token: str) -> User:
+        try:
+            user = await self.fetch_user(token)
+        except HTTPException as e:
+            if e.status_code == status.HTTP_401_UNAUTHORIZED:
+                self.cache.set(key, e)
+            raise
+        self.cache.set(key, user)
+        return user
+
+    def _fetch_done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every caller was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+
+auth_client = AuthClient(
+    verifier=LocalTokenVerifier.from_env() if AUTH_MODE == "local" else None
+)
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> User:
+
+    token = credentials.credentials
+    return await auth_client.verify_token(token)
 
 
 async def get_current_superuser(current_user: User = Depends(get_current_user)) -> User:
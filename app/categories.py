@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+
+from sqlalchemy import case, func
+from sqlmodel import select
+
+from app.model import CacheVersion, Product
+from app.product_cache import PRODUCT_VERSION_KEY, read_product_version
+from .logging_config import app_logger as logger
+
+# Other workers update their own index only, so a loaded summary is rebuilt
+# after this many seconds to pick up their writes.
+CATEGORY_INDEX_TTL = float(os.getenv("CATEGORY_INDEX_TTL", "30"))
+
+
+def is_in_stock(product) -> bool:
+    return not product.out_of_stock and product.stock_quantity > 0
+
+
+class CategoryIndex:
+    """In-memory per-category product and in-stock counts.
+
+    The summary is built with a single GROUP BY on first use and then kept
+    up to date by the product write paths. ``invalidate()`` drops it so the
+    next read rebuilds it from the database.
+
+    A load records the product version its snapshot was taken at. Write
+    paths pass the version their commit bumped to, and a delta at or below
+    the loaded version is skipped: the rebuild already counted it.
+    """
+
+    def __init__(self, ttl: float = CATEGORY_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts: dict[str, dict[str, int]] | None = None
+        self._version = 0
+        self._loaded_at = 0.0
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._counts is not None and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    def _load(self, session):
+        in_stock = case(
+            (Product.out_of_stock.is_(False) & (Product.stock_quantity > 0), 1),
+            else_=0,
+        )
+        # Read in the same statement so the version matches the counts.
+        version = (
+            select(CacheVersion.version)
+            .where(CacheVersion.name == PRODUCT_VERSION_KEY)
+            .scalar_subquery()
+        )
+        rows = session.exec(
+            select(
+                Product.category,
+                func.count(Product.id),
+                func.sum(in_stock),
+                version,
+            )
+            .where(Product.category.is_not(None))
+            .group_by(Product.category)
+        ).all()
+        self._counts = {
+            category: {"product_count": count, "in_stock_count": in_stock_count}
+            for category, count, in_stock_count, _ in rows
+            if category
+        }
+        self._version = (rows[0][3] if rows else read_product_version(session)) or 0
+        self._loaded_at = time.monotonic()
+        logger.info("Category index rebuilt with {} categories", len(self._counts))
+
+    def summary(self, session) -> list[dict]:
+        with self._lock:
+            if not self._is_fresh():
+                self._load(session)
+            return [
+                {"category": category, **counts}
+                for category, counts in sorted(self._counts.items())
+            ]
+
+    def invalidate(self):
+        with self._lock:
+            self._counts = None
+
+    def _apply(self, category: str | None, products: int, in_stock: int):
+        if not category:
+            return
+        counts = self._counts.setdefault(
+            category, {"product_count": 0, "in_stock_count": 0}
+        )
+        counts["product_count"] += products
+        counts["in_stock_count"] += in_stock
+        if counts["product_count"] <= 0:
+            del self._counts[category]
+
+    def _is_pending(self, version: int) -> bool:
+        return self._counts is not None and version > self._version
+
+    def product_added(self, product, version: int):
+        with self._lock:
+            if self._is_pending(version):
+                self._apply(product.category, 1, int(is_in_stock(product)))
+
+    def product_removed(self, category: str | None, in_stock: bool, version: int):
+        with self._lock:
+            if self._is_pending(version):
+                self._apply(category, -1, -int(in_stock))
+
+    def product_changed(
+        self, old_category: str | None, old_in_stock: bool, product, version: int
+    ):
+        with self._lock:
+            if self._is_pending(version):
+                self._apply(old_category, -1, -int(old_in_stock))
+                self._apply(product.category, 1, int(is_in_stock(product)))
+
+    def products_changed(self, changes, version: int):
+        """Apply ``(old_category, old_in_stock, category, in_stock)`` changes.
+
+        For the batch write paths: order reservations and restocks, and bulk
+        updates.
+        """
+        with self._lock:
+            if self._is_pending(version):
+                for old_category, old_in_stock, category, in_stock in changes:
+                    self._apply(old_category, -1, -int(old_in_stock))
+                    self._apply(category, 1, int(in_stock))
+
+
+category_index = CategoryIndex()
@@ -0,0 +1,209 @@
+import os
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlmodel import Session, create_engine
+
+from app.metrics import db_pool_checked_out, db_pool_checkouts, db_pool_wait
+from app.query_profiler import QUERY_PROFILER_ENABLED, instrument_engine
+
+load_dotenv()
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///database.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+# Serve requests through an async engine and AsyncSession (needs the
+# ``async`` extra) instead of sync sessions in FastAPI's threadpool.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Keep the database across restarts. Set to false for a throwaway database
+# whose tables are dropped when the application shuts down.
+DB_PERSISTENT = os.getenv("DB_PERSISTENT", "true").lower() in ("1", "true", "yes")
+# Prebuilt SQLite database (``python -m app.db_tools build-template PATH``)
+# copied into place when DATABASE_URL names a file that does not exist yet.
+DB_TEMPLATE_PATH = os.getenv("DB_TEMPLATE_PATH") or None
+# Sample products: "auto" adds them to a database whose schema startup
+# created, "true" adds the missing ones on every start, "false" never.
+DB_SEED = (
+    None
+    if os.getenv("DB_SEED", "auto").lower() == "auto"
+    else os.getenv("DB_SEED").lower() in ("1", "true", "yes")
+)
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+# Applied to every new SQLite connection. WAL lets readers proceed while a
+# writer holds the lock; NORMAL sync is durable across application crashes
+# in WAL mode and avoids an fsync per commit.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, so the default is a 64 MiB page cache.
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+
+
+def sqlite_pragmas() -> dict[str, str | int]:
+    return {
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "cache_size": SQLITE_CACHE_SIZE,
+    }
+
+
+def is_memory_database(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def apply_sqlite_pragmas(engine, pragmas: dict[str, str | int]):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool recording checkouts and the time spent waiting for them."""
+
+    engine_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        finally:
+            db_pool_wait.observe(time.perf_counter() - start, self.engine_label)
+        db_pool_checkouts.inc(self.engine_label)
+        db_pool_checked_out.inc(self.engine_label)
+        return connection
+
+    def _do_return_conn(self, record):
+        db_pool_checked_out.dec(self.engine_label)
+        super()._do_return_conn(record)
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+
+def engine_options(url, pool_class=InstrumentedQueuePool, **kwargs) -> dict:
+    options = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+
+    # Pool sizing only applies to the default queue pool; in-memory SQLite
+    # and explicit pool classes (e.g. NullPool) do not accept it.
+    if not is_memory_database(url) and kwargs.get("poolclass") is None:
+        options.update(
+            poolclass=pool_class,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+
+    options.update(kwargs)
+    return options
+
+
+def configure_sqlite(sync_engine, url):
+    pragmas = sqlite_pragmas()
+    if is_memory_database(url):
+        pragmas.pop("journal_mode")
+        pragmas.pop("mmap_size")
+    apply_sqlite_pragmas(sync_engine, pragmas)
+
+
+def create_db_engine(url: str = DATABASE_URL, **kwargs):
+    """Create the engine for ``url`` with the configured pool settings.
+
+    SQLite connections get the pragmas from ``sqlite_pragmas()``. In-memory
+    SQLite keeps SQLAlchemy's default single-connection pool.
+    """
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        kwargs.setdefault("connect_args", {"check_same_thread": False})
+
+    engine = create_engine(url, **engine_options(url, **kwargs))
+
+    if backend == "sqlite":
+        configure_sqlite(engine, url)
+    if QUERY_PROFILER_ENABLED:
+        instrument_engine(engine)
+
+    return engine
+
+
+def async_url(url) -> str:
+    """Swap a sync driver in ``url`` for its asyncio counterpart."""
+    url = make_url(url)
+    if url.get_driver_name() in ("aiosqlite", "asyncpg", "aiomysql"):
+        return url.render_as_string(hide_password=False)
+    drivername = ASYNC_DRIVERS.get(url.get_backend_name())
+    if drivername is None:
+        raise ValueError(f"No async driver known for {url.get_backend_name()}")
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str = DATABASE_URL, **kwargs):
+    """Async counterpart of ``create_db_engine`` with the same settings."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = async_url(url)
+    async_engine = create_async_engine(
+        url, **engine_options(url, InstrumentedAsyncQueuePool, **kwargs)
+    )
+
+    if make_url(url).get_backend_name() == "sqlite":
+        configure_sqlite(async_engine.sync_engine, url)
+    if QUERY_PROFILER_ENABLED:
+        instrument_engine(async_engine)
+
+    return async_engine
+
+
+engine = create_db_engine()
+_async_engine = None
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_db_engine()
+    return _async_engine
+
+
+async def get_session():
+    if DB_ASYNC:
+        from sqlmodel.ext.asyncio.session import AsyncSession
+
+        # Responses are serialized after the handler returns, when an
+        # AsyncSession can no longer lazy-load expired attributes.
+        async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+            yield session
+    else:
+        with Session(engine) as session:
+            yield session
+
+
+async def dispose_engines():
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    engine.dispose()
@@ -1,120 +1,243 @@
-import random
+import argparse
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.engine import make_url
+from sqlmodel import Session, select
+
+from app.migrations import ensure_schema, migrate
 from app.model import Product
+from app.product_cache import bump_product_version
+from .logging_config import app_logger as logger
 
+SAMPLE_PRODUCTS = [
+    {
+        "name": "Blue Pen",
+        "category": "Stationery",
+        "unit_price": 1.50,
+        "quantity": 100,
+    },
+    {
+        "name": "Red Pen",
+        "category": "Stationery",
+        "unit_price": 1.50,
+        "quantity": 85,
+    },
+    {
+        "name": "A4 Notebook",
+        "category": "Stationery",
+        "unit_price": 4.99,
+        "quantity": 50,
+    },
+    {"name": "Stapler", "category": "Office", "unit_price": 12.99, "quantity": 25},
+    {
+        "name": "Paper Clips",
+        "category": "Office",
+        "unit_price": 2.25,
+        "quantity": 200,
+    },
+    {
+        "name": "Highlighter",
+        "category": "Stationery",
+        "unit_price": 2.75,
+        "quantity": 75,
+    },
+    {
+        "name": "Sticky Notes",
+        "category": "Office",
+        "unit_price": 3.50,
+        "quantity": 120,
+    },
+    {
+        "name": "Eraser",
+        "category": "Stationery",
+        "unit_price": 0.99,
+        "quantity": 150,
+    },
+    {
+        "name": "Black Marker",
+        "category": "Stationery",
+        "unit_price": 2.99,
+        "quantity": 60,
+    },
+    {
+        "name": "Ruler 12inch",
+        "category": "Stationery",
+        "unit_price": 1.25,
+        "quantity": 80,
+    },
+    {"name": "Scissors", "category": "Office", "unit_price": 8.75, "quantity": 35},
+    {
+        "name": "Hole Punch",
+        "category": "Office",
+        "unit_price": 15.50,
+        "quantity": 20,
+    },
+    {
+        "name": "Calculator",
+        "category": "Electronics",
+        "unit_price": 24.99,
+        "quantity": 30,
+    },
+    {
+        "name": "USB Drive 16GB",
+        "category": "Electronics",
+        "unit_price": 19.99,
+        "quantity": 45,
+    },
+    {
+        "name": "Desk Lamp",
+        "category": "Furniture",
+        "unit_price": 39.99,
+        "quantity": 15,
+    },
+    {
+        "name": "File Folder",
+        "category": "Office",
+        "unit_price": 1.99,
+        "quantity": 100,
+    },
+    {
+        "name": "Whiteboard Marker",
+        "category": "Stationery",
+        "unit_price": 3.25,
+        "quantity": 90,
+    },
+    {
+        "name": "Tape Dispenser",
+        "category": "Office",
+        "unit_price": 7.50,
+        "quantity": 40,
+    },
+]
 
-def seed_products(session):
-
-    sample_products = [
-        {
-            "name": "Blue Pen",
-            "category": "Stationery",
-            "unit_price": 1.50,
-            "quantity": 100,
-        },
-        {
-            "name": "Red Pen",
-            "category": "Stationery",
-            "unit_price": 1.50,
-            "quantity": 85,
-        },
-        {
-            "name": "A4 Notebook",
-            "category": "Stationery",
-            "unit_price": 4.99,
-            "quantity": 50,
-        },
-        {"name": "Stapler", "category": "Office", "unit_price": 12.99, "quantity": 25},
-        {
-            "name": "Paper Clips",
-            "category": "Office",
-            "unit_price": 2.25,
-            "quantity": 200,
-        },
-        {
-            "name": "Highlighter",
-            "category": "Stationery",
-            "unit_price": 2.75,
-            "quantity": 75,
-        },
-        {
-            "name": "Sticky Notes",
-            "category": "Office",
-            "unit_price": 3.50,
-            "quantity": 120,
-        },
-        {
-            "name": "Eraser",
-            "category": "Stationery",
-            "unit_price": 0.99,
-            "quantity": 150,
-        },
-        {
-            "name": "Black Marker",
-            "category": "Stationery",
-            "unit_price": 2.99,
-            "quantity": 60,
-        },
-        {
-            "name": "Ruler 12inch",
-            "category": "Stationery",
-            "unit_price": 1.25,
-            "quantity": 80,
-        },
-        {"name": "Scissors", "category": "Office", "unit_price": 8.75, "quantity": 35},
-        {
-            "name": "Hole Punch",
-            "category": "Office",
-            "unit_price": 15.50,
-            "quantity": 20,
-        },
-        {
-            "name": "Calculator",
-            "category": "Electronics",
-            "unit_price": 24.99,
-            "quantity": 30,
-        },
-        {
-            "name": "USB Drive 16GB",
-            "category": "Electronics",
-            "unit_price": 19.99,
-            "quantity": 45,
-        },
-        {
-            "name": "Desk Lamp",
-            "category": "Furniture",
-            "unit_price": 39.99,
-            "quantity": 15,
-        },
-        {
-            "name": "File Folder",
-            "category": "Office",
-            "unit_price": 1.99,
-            "quantity": 100,
-        },
-        {
-            "name": "Whiteboard Marker",
-            "category": "Stationery",
-            "unit_price": 3.25,
-            "quantity": 90,
-        },
-        {
-            "name": "Tape Dispenser",
-            "category": "Office",
-            "unit_price": 7.50,
-            "quantity": 40,
-        },
-    ]
 
-    for product_data in sample_products:
-        product = Product(
+def seed_products(session) -> int:
+    """Insert the sample products that are not in the database yet.
+
+    Safe to run against a populated database: products are matched by
+    name, and the missing ones go in with a single executemany INSERT.
+    """
+    names = [product["name"] for product in SAMPLE_PRODUCTS]
+    existing = set(
+        session.exec(select(Product.name).where(Product.name.in_(names))).all()
+    )
+    rows = [
+        Product(
             name=product_data["name"],
             category=product_data["category"],
             unit_price=product_data["unit_price"],
             stock_quantity=product_data["quantity"],
             out_of_stock=product_data["quantity"] == 0,
-        )
-        session.add(product)
+        ).model_dump(exclude={"id"})
+        for product_data in SAMPLE_PRODUCTS
+        if product_data["name"] not in existing
+    ]
+    if rows:
+        session.execute(insert(Product), rows)
+        bump_product_version(session)
+        session.commit()
+    logger.info("Seeded {} products into database", len(rows))
+    return len(rows)
+
+
+def sqlite_database_path(engine) -> Path | None:
+    url = make_url(engine.url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    return Path(url.database)
+
+
+def copy_template(template_path, database_path) -> bool:
+    """Copy the template database to ``database_path`` unless it exists.
+
+    The copy goes through SQLite's backup API into a temporary file that is
+    then hard-linked into place, so workers starting together cannot
+    clobber each other or see a half-written database.
+    """
+    database_path = Path(database_path)
+    if database_path.exists():
+        return False
+
+    partial = database_path.with_name(f"{database_path.name}.{os.getpid()}.partial")
+    source = sqlite3.connect(f"file:{template_path}?mode=ro", uri=True)
+    target = sqlite3.connect(partial)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    try:
+        os.link(partial, database_path)
+    except FileExistsError:
+        return False
+    finally:
+        partial.unlink()
+    return True
+
+
+def prepare_database(engine, template_path=None, seed: bool | None = None) -> int:
+    """Get the database ready to serve and return its schema version.
+
+    A missing SQLite file is first copied from ``template_path`` when one
+    is given. The schema is then migrated unless it is already at head, so
+    restarting against an existing database costs a single query. With
+    ``seed=None`` the sample products go only into a database whose schema
+    this call created; ``True`` adds the missing ones on every start and
+    ``False`` never does. Upgrading an existing database does not seed it.
+    """
+    start = time.perf_counter()
+    database_path = sqlite_database_path(engine)
+    if template_path and database_path is not None:
+        if copy_template(template_path, database_path):
+            logger.info("Bootstrapped {} from {}", database_path, template_path)
+
+    version, created = ensure_schema(engine)
+    if seed or (seed is None and created):
+        with Session(engine) as session:
+            seed_products(session)
+    logger.info(
+        "Database ready at schema version {} in {:.1f} ms",
+        version,
+        (time.perf_counter() - start) * 1000,
+    )
+    return version
+
+
+def build_template(path):
+    """Create a migrated, seeded and compacted SQLite database at ``path``."""
+    from app.database import create_db_engine
+
+    path = Path(path)
+    path.unlink(missing_ok=True)
+    engine = create_db_engine(f"sqlite:///{path}")
+    try:
+        version = migrate(engine)
+        with Session(engine) as session:
+            seed_products(session)
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            connection.exec_driver_sql("VACUUM")
+    finally:
+        engine.dispose()
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Database maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    template = subparsers.add_parser(
+        "build-template", help="build a template database for DB_TEMPLATE_PATH"
+    )
+    template.add_argument("path")
+    args = parser.parse_args(argv)
+
+    version = build_template(args.path)
+    print(f"Built template {args.path} at schema version {version}")
+
 
-    session.commit()
-    print(f"Seeded {len(sample_products)} products into database")
-    return
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import hashlib
+
+from fastapi import Request, Response
+from sqlmodel import select
+
+from app.model import Order, Product
+from app.product_cache import product_cache, read_product_version
+
+ETAG_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL}
+    )
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = ETAG_CACHE_CONTROL
+
+
+# The functions below only read the columns an ETag is derived from, so a
+# revalidation never loads or serializes the full rows. They take a sync
+# session; async handlers run them through ``run_db``.
+
+
+def product_etag(session, product_id: int) -> str | None:
+    product_cache.check_version(session)
+    generation = product_cache.generation
+    etag = product_cache.get_etag(product_id)
+    if etag is not None:
+        return etag
+
+    updated_at = session.exec(
+        select(Product.updated_at).where(Product.id == product_id)
+    ).first()
+    if updated_at is None:
+        return None
+    etag = make_etag("product", product_id, updated_at.isoformat())
+    product_cache.put_etag(product_id, etag, generation)
+    return etag
+
+
+def product_list_etag(session, offset: int, limit: int, cursor: str | None) -> str:
+    # Every product write bumps the shared product version, so it identifies
+    # the state of the whole table.
+    product_cache.check_version(session)
+    version = product_cache.version
+    if version is None:
+        version = read_product_version(session)
+    return make_etag("products", version, offset, limit, cursor)
+
+
+def order_etag(session, order_id: int) -> str | None:
+    updated_at = session.exec(
+        select(Order.updated_at).where(Order.id == order_id)
+    ).first()
+    if updated_at is None:
+        return None
+    return make_etag("order", order_id, updated_at.isoformat())
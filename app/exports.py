@@ -0,0 +1,215 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from enum import Enum
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.model import Order, OrderDetail, Product
+from app.model_operations_manager import is_async_session
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+
+class ExportFormat(Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+PRODUCT_COLUMNS = [
+    Product.id,
+    Product.name,
+    Product.category,
+    Product.unit_price,
+    Product.stock_quantity,
+    Product.out_of_stock,
+    Product.created_at,
+    Product.updated_at,
+]
+
+ORDER_COLUMNS = [
+    Order.id,
+    Order.customer_name,
+    Order.customer_email,
+    Order.status,
+    Order.order_date,
+    Order.updated_at,
+    Order.total_amount,
+    Order.order_batch_id,
+]
+
+DETAIL_COLUMNS = [
+    OrderDetail.id.label("detail_id"),
+    OrderDetail.product_id,
+    OrderDetail.quantity,
+    OrderDetail.unit_price.label("detail_unit_price"),
+    OrderDetail.subtotal,
+]
+
+
+def products_query(since: datetime | None = None):
+    statement = select(*PRODUCT_COLUMNS).order_by(Product.id)
+    if since is not None:
+        statement = statement.where(Product.updated_at >= since)
+    return statement
+
+
+def orders_query(since: datetime | None = None):
+    # One row per order detail, orders without details included, in order id
+    # order so rows of the same order arrive together.
+    statement = (
+        select(*ORDER_COLUMNS, *DETAIL_COLUMNS)
+        .outerjoin(OrderDetail, OrderDetail.order_id == Order.id)
+        .order_by(Order.id, OrderDetail.id)
+    )
+    if since is not None:
+        statement = statement.where(Order.updated_at >= since)
+    return statement
+
+
+def json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def ndjson_lines(records) -> bytes:
+    return b"".join(
+        json.dumps(record, default=json_default, separators=(",", ":")).encode() + b"\n"
+        for record in records
+    )
+
+
+def csv_lines(rows, header: list[str] | None = None) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    writer.writerows(
+        [value.isoformat() if hasattr(value, "isoformat") else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode()
+
+
+class OrderGrouper:
+    """Folds joined order/detail rows into one record per order.
+
+    Rows may be split across fetch chunks, so the order being assembled is
+    kept until a row for the next order (or the end of the stream) arrives.
+    """
+
+    def __init__(self):
+        self.current = None
+
+    def feed(self, rows) -> list[dict]:
+        completed = []
+        for row in rows:
+            row = row._mapping
+            if self.current is None or self.current["id"] != row["id"]:
+                if self.current is not None:
+                    completed.append(self.current)
+                self.current = {column.key: row[column.key] for column in ORDER_COLUMNS}
+                self.current["order_details"] = []
+            if row["detail_id"] is not None:
+                self.current["order_details"].append(
+                    {
+                        "id": row["detail_id"],
+                        "product_id": row["product_id"],
+                        "quantity": row["quantity"],
+                        "unit_price": row["detail_unit_price"],
+                        "subtotal": row["subtotal"],
+                    }
+                )
+        return completed
+
+    def finish(self) -> list[dict]:
+        completed = [self.current] if self.current is not None else []
+        self.current = None
+        return completed
+
+
+class Export:
+    """Encodes chunks of rows from ``products_query``/``orders_query``."""
+
+    def __init__(self, kind: str, export_format: ExportFormat):
+        self.kind = kind
+        self.format = export_format
+        self.grouper = OrderGrouper() if kind == "orders" else None
+        self.header_written = False
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.format]
+
+    @property
+    def filename(self) -> str:
+        return f"{self.kind}.{self.format.value}"
+
+    def encode(self, rows, keys) -> bytes:
+        if self.format is ExportFormat.CSV:
+            header = None if self.header_written else list(keys)
+            self.header_written = True
+            return csv_lines(rows, header)
+        if self.grouper is not None:
+            return ndjson_lines(self.grouper.feed(rows))
+        return ndjson_lines(dict(row._mapping) for row in rows)
+
+    def finish(self) -> bytes:
+        if self.format is ExportFormat.NDJSON and self.grouper is not None:
+            return ndjson_lines(self.grouper.finish())
+        return b""
+
+
+def stream_export(engine, statement, export: Export):
+    """Yield encoded chunks reading ``statement`` through a server-side cursor.
+
+    Opens its own connection: the request session is closed before a
+    streaming response body is sent.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=EXPORT_CHUNK_SIZE
+        ).execute(statement)
+        for rows in result.partitions():
+            chunk = export.encode(rows, result.keys())
+            if chunk:
+                yield chunk
+    tail = export.finish()
+    if tail:
+        yield tail
+
+
+async def stream_export_async(async_engine, statement, export: Export):
+    """``stream_export`` for an async engine."""
+    async with async_engine.connect() as conn:
+        result = await conn.stream(
+            statement.execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+        async for rows in result.partitions():
+            chunk = export.encode(rows, result.keys())
+            if chunk:
+                yield chunk
+    tail = export.finish()
+    if tail:
+        yield tail
+
+
+def export_response(session, statement, export: Export) -> StreamingResponse:
+    if is_async_session(session):
+        body = stream_export_async(session.bind, statement, export)
+    else:
+        body = stream_export(session.get_bind(), statement, export)
+    return StreamingResponse(
+        body,
+        media_type=export.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{export.filename}"'},
+    )
@@ -0,0 +1,99 @@
+import codecs
+import csv
+import json
+import os
+
+from fastapi import HTTPException, Request
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+
+
+async def iter_lines(request: Request):
+    """Yield decoded lines from the request body as it arrives."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_records(request: Request):
+    header = None
+    record = ""
+    row_number = 0
+    async for line in iter_lines(request):
+        record = f"{record}\n{line}" if record else line
+        # A quoted field may span lines; wait until the quotes balance.
+        if record.count('"') % 2:
+            continue
+        if not record.strip():
+            record = ""
+            continue
+        values = next(csv.reader([record]))
+        record = ""
+        if header is None:
+            header = values
+            continue
+        row_number += 1
+        yield row_number, dict(zip(header, values))
+
+
+async def iter_ndjson_records(request: Request):
+    row_number = 0
+    async for line in iter_lines(request):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError:
+            yield row_number, {}
+
+
+async def iter_json_records(request: Request):
+    try:
+        records = json.loads(await request.body())
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array")
+    for row_number, record in enumerate(records, start=1):
+        yield row_number, record
+
+
+def iter_import_records(request: Request):
+    """Pick the record parser for the request's content type.
+
+    JSON arrays are read whole; NDJSON and CSV are parsed while the upload
+    streams in.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in NDJSON_TYPES:
+        return iter_ndjson_records(request)
+    if content_type in CSV_TYPES:
+        return iter_csv_records(request)
+    if content_type in ("application/json", ""):
+        return iter_json_records(request)
+    raise HTTPException(
+        status_code=415, detail=f"Unsupported import content type: {content_type}"
+    )
+
+
+async def iter_chunks(records, size: int | None = None):
+    size = size or IMPORT_CHUNK_SIZE
+    chunk = []
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
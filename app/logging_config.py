@@ -1,26 +1,177 @@
+import json
 import sys
 import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 from loguru import logger
 from pathlib import Path
+from starlette.datastructures import Headers, MutableHeaders
 
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# "development" keeps the colourful console and daily files, "production"
+# writes JSON lines through a non-blocking queue.
+LOG_PROFILE = os.getenv("LOG_PROFILE", "development")
+LOG_JSON = os.getenv("LOG_JSON", str(LOG_PROFILE == "production")).lower() == "true"
+LOG_ENQUEUE = (
+    os.getenv("LOG_ENQUEUE", str(LOG_PROFILE == "production")).lower() == "true"
+)
+# Per-item log calls go through ``log_sampler``: the first call of a site is
+# logged, then every Nth, and never more than the rate limit per second.
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "10"))
 
-def setup_logging():
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+class LogSampler:
+    """Decides whether a high-volume call site may log.
+
+    Each site, identified by a key, logs its first call and then every
+    ``every``-th call, capped at ``per_second`` records per second. The
+    decision is a counter bump, so a suppressed call costs next to nothing
+    as long as the message is only formatted when ``allow`` returns True.
+    """
+
+    def __init__(self, every: int = 100, per_second: int = 10):
+        self.every = max(every, 1)
+        self.per_second = per_second
+        self._calls: dict[str, int] = {}
+        self._windows: dict[str, tuple[int, int]] = {}
+        self._suppressed: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        with self._lock:
+            calls = self._calls.get(key, 0)
+            self._calls[key] = calls + 1
+            allowed = calls % self.every == 0
+            if allowed and self.per_second > 0:
+                second = int(time.monotonic())
+                window, emitted = self._windows.get(key, (second, 0))
+                if window != second:
+                    window, emitted = second, 0
+                allowed = emitted < self.per_second
+                self._windows[key] = (window, emitted + allowed)
+            if not allowed:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return allowed
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._windows.clear()
+            self._suppressed.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                key: {"calls": calls, "suppressed": self._suppressed.get(key, 0)}
+                for key, calls in self._calls.items()
+            }
+
+
+def json_line(record) -> str:
+    """Render a loguru record as one JSON line."""
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+    }
+    extra = dict(record["extra"])
+    # Fields passed as ``extra={...}`` arrive nested under their own key.
+    extra.update(extra.pop("extra", None) or {})
+    entry.update(extra)
+    if record["exception"] is not None:
+        exc_type, exc_value, _ = record["exception"]
+        entry["exception"] = f"{exc_type.__name__}: {exc_value}"
+    return json.dumps(entry, default=str)
+
+
+def json_sink(stream):
+    """Sink writing JSON lines to ``stream``.
+
+    With ``enqueue=True`` the sink runs on loguru's worker thread, so the
+    serialization and the write both happen off the request path.
+    """
+
+    def write(message):
+        stream.write(json_line(message.record) + "\n")
+        stream.flush()
+
+    return write
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def request_context(request_id: str):
+    """Attach ``request_id`` to every record logged inside the block."""
+    with logger.contextualize(request_id=request_id):
+        yield
+
+
+class RequestIdMiddleware:
+    """Tag each request with an id, taken from ``X-Request-ID`` if present.
+
+    The id is bound to every record logged while the request is handled and
+    echoed on the response. Written as plain ASGI so it adds no extra task
+    or body buffering per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER) or new_request_id()
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        with request_context(request_id):
+            await self.app(scope, receive, send_with_request_id)
+
+
+def setup_logging(profile: str = LOG_PROFILE):
     """Configure application logging"""
 
     logger.remove()
 
+    if profile == "production":
+        # Non-blocking JSON lines on stdout for the log collector.
+        logger.add(
+            json_sink(sys.stdout) if LOG_JSON else sys.stdout,
+            level=LOG_LEVEL,
+            enqueue=LOG_ENQUEUE,
+        )
+        logger.info("Logging configuration complete", extra={"profile": profile})
+        return
+
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
 
     # Console logging (colorful for development)
     logger.add(
-        sys.stdout,
+        json_sink(sys.stdout) if LOG_JSON else sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
         "<level>{level: <8}</level> | "
         "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
         "<level>{message}</level>",
-        level=os.getenv("LOG_LEVEL", "INFO"),
-        colorize=True,
+        level=LOG_LEVEL,
+        colorize=not LOG_JSON,
+        enqueue=LOG_ENQUEUE,
     )
 
     # File logging (structured for production)
@@ -31,6 +182,7 @@ def setup_logging():
         rotation="1 day",  # New file each day
         retention="30 days",  # Keep logs for 30 days
         compression="zip",  # Compress old logs
+        enqueue=LOG_ENQUEUE,
     )
 
     # Error-only log file
@@ -40,9 +192,16 @@ def setup_logging():
         level="ERROR",
         rotation="1 day",
         retention="90 days",  # Keep error logs longer
+        enqueue=LOG_ENQUEUE,
     )
 
     logger.info("Logging configuration complete")
 
 
+async def shutdown_logging():
+    """Flush records still queued for enqueued sinks."""
+    await logger.complete()
+
+
 app_logger = logger
+log_sampler = LogSampler(every=LOG_SAMPLE_EVERY, per_second=LOG_RATE_LIMIT)
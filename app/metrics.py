@@ -0,0 +1,307 @@
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Metric(ABC):
+    """Base for metrics whose values are aggregated per thread.
+
+    Every thread updates its own shard, so recording never takes a lock or
+    contends with other threads; shards are only summed when the metrics
+    are rendered. Label values are passed positionally in the order of
+    ``labelnames``.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            # Once per thread; shards of finished threads are kept so their
+            # counts are not lost.
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _items(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            yield from list(shard.items())
+
+    def _labels(self, values, extra: str = "") -> str:
+        pairs = [
+            f'{name}="{escape_label(str(value))}"'
+            for name, value in zip(self.labelnames, values)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        """Exposition lines for every label combination recorded so far."""
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.help}\n# TYPE {self.name} {self.type}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+    def reset(self):
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return sum(value for key, value in self._items() if key == labels)
+
+    def totals(self) -> dict[tuple, float]:
+        totals = {}
+        for labels, value in self._items():
+            totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{self._labels(labels)} {format_value(value)}"
+            for labels, value in sorted(self.totals().items())
+        ]
+
+
+class Gauge(Counter):
+    """A counter that can go down, e.g. requests in flight.
+
+    Increments and decrements may happen on different threads; the sum over
+    all shards is still the current value.
+    """
+
+    type = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # One slot per bucket plus +Inf, then the running sum.
+            state = shard[labels] = [0] * (len(self.buckets) + 2)
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def totals(self) -> dict[tuple, list[float]]:
+        totals = {}
+        for labels, state in self._items():
+            total = totals.setdefault(labels, [0] * len(state))
+            for idx, value in enumerate(state):
+                total[idx] += value
+        return totals
+
+    def count(self, *labels) -> int:
+        state = self.totals().get(labels)
+        return int(sum(state[:-1])) if state else 0
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, state in sorted(self.totals().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else format_value(bound)
+                bucket_labels = self._labels(labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {state[-1]}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        return "".join(metric.render() for metric in self.metrics)
+
+    def reset(self):
+        for metric in self.metrics:
+            metric.reset()
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests handled.", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests.",
+    ("method", "route"),
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled."
+)
+operations = registry.counter(
+    "operations_total",
+    "Operations dispatched through operation_router.",
+    ("model_type", "operation", "status"),
+)
+operation_duration = registry.histogram(
+    "operation_duration_seconds",
+    "Time spent running operations.",
+    ("model_type", "operation"),
+)
+db_pool_checkouts = registry.counter(
+    "db_pool_checkouts_total", "Connections checked out of the pool.", ("engine",)
+)
+db_pool_checked_out = registry.gauge(
+    "db_pool_checked_out", "Connections currently checked out.", ("engine",)
+)
+db_pool_wait = registry.histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ("engine",),
+)
+auth_request_duration = registry.histogram(
+    "auth_request_duration_seconds",
+    "Latency of token verification calls to the auth service.",
+    ("status",),
+)
+order_batch_size = registry.histogram(
+    "order_batch_size",
+    "Number of orders per created order batch.",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+
+
+def route_label(scope) -> str:
+    # Route templates keep the label set bounded; paths that matched no
+    # route are folded together.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Count and time every HTTP request by method, route and status.
+
+    Plain ASGI, so the only per-request work is two clock reads and a few
+    dictionary updates on the current thread's shard.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_progress.dec()
+            route = route_label(scope)
+            http_requests.inc(scope["method"], route, str(status))
+            http_request_duration.observe(elapsed, scope["method"], route)
+
+
+def operation_status(error: BaseException | None) -> str:
+    if error is None:
+        return "ok"
+    return str(getattr(error, "status_code", "error"))
+
+
+def record_operation(labels, start: float, error: BaseException | None = None):
+    operation_duration.observe(time.perf_counter() - start, *labels)
+    operations.inc(*labels, operation_status(error))
+
+
+async def timed_operation(awaitable, labels, start: float):
+    try:
+        result = await awaitable
+    except BaseException as e:
+        record_operation(labels, start, e)
+        raise
+    record_operation(labels, start)
+    return result
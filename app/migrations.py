@@ -0,0 +1,309 @@
+import argparse
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlmodel import SQLModel
+
+from app.model import (
+    Order,
+    OrderDetail,
+    Product,
+    SalesRollup,
+    SchemaVersion,
+)
+from app.product_cache import add_product_version_row
+from app.sales import fill_sales_rollup
+from app.search import SEARCH_TABLE, SQLITE_SEARCH_DDL, rebuild_search_tables
+from .logging_config import app_logger as logger
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable
+
+
+def create_missing_tables(connection):
+    SQLModel.metadata.create_all(connection)
+
+
+def create_missing_indexes(connection, *tables):
+    """Create the indexes declared on the models for ``tables`` if absent."""
+    for table in tables:
+        names = {index["name"] for index in inspect(connection).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in names:
+                index.create(connection)
+                logger.info("Created index {} on {}", index.name, table.name)
+
+
+def add_column(connection, table, column_name: str):
+    """Add ``column_name`` of a model table in place if it is missing.
+
+    For schema changes that add a column: SQLite and PostgreSQL both add
+    it without rewriting the existing rows. A NOT NULL column needs a
+    ``server_default`` on the model so existing rows get a value.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    if column_name in columns:
+        return
+    column = table.c[column_name]
+    column_type = column.type.compile(dialect=connection.dialect)
+    preparer = connection.dialect.identifier_preparer
+    ddl = (
+        f"ALTER TABLE {preparer.format_table(table)} "
+        f"ADD COLUMN {preparer.format_column(column)} {column_type}"
+    )
+    if column.server_default is not None:
+        default = column.server_default.arg
+        if isinstance(default, str):
+            default = "'" + default.replace("'", "''") + "'"
+        ddl += f" DEFAULT {default}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    connection.execute(text(ddl))
+    logger.info("Added column {}.{}", table.name, column_name)
+
+
+def add_order_indexes(connection):
+    create_missing_indexes(connection, Order.__table__, OrderDetail.__table__)
+
+
+def add_product_search(connection):
+    create_missing_indexes(connection, Product.__table__)
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in SQLITE_SEARCH_DDL:
+        connection.execute(text(statement))
+    rebuild_search_tables(connection)
+
+
+def widen_product_search(connection):
+    """Recreate product_fts with the current prefix indexes and add the
+    name-only search table, then index every product in both."""
+    if connection.dialect.name != "sqlite":
+        return
+    connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+    for statement in SQLITE_SEARCH_DDL:
+        connection.execute(text(statement))
+    rebuild_search_tables(connection)
+
+
+def backfill_sales_rollup(connection):
+    fill_sales_rollup(connection)
+
+
+# Append new migrations at the end with the next version number and never
+# edit one that has shipped. Upgrades must be idempotent: a database
+# created before versioning replays all of them over whatever schema
+# create_all gave it at the time.
+MIGRATIONS = [
+    Migration(1, "baseline tables", create_missing_tables),
+    Migration(2, "order lookup indexes", add_order_indexes),
+    Migration(3, "product search index and filter indexes", add_product_search),
+    Migration(4, "backfill sales rollup", backfill_sales_rollup),
+    Migration(5, "product cache version row", add_product_version_row),
+    Migration(6, "name search index and wider prefixes", widen_product_search),
+]
+HEAD = MIGRATIONS[-1].version
+
+
+# Key of the PostgreSQL advisory lock serializing migrations across workers.
+MIGRATION_LOCK_KEY = 0x6D696772
+
+
+@contextmanager
+def migration_transaction(engine):
+    """Transaction that covers DDL and holds the migration lock throughout.
+
+    pysqlite only opens a transaction before DML on its own, which would
+    leave the DDL of a failed migration applied, so one is begun
+    explicitly. It is IMMEDIATE so that workers starting together queue on
+    the write lock (honouring busy_timeout) before reading the schema,
+    instead of failing with SQLITE_BUSY when upgrading a stale read.
+    """
+    with engine.begin() as connection:
+        if connection.dialect.name == "sqlite":
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        elif connection.dialect.name == "postgresql":
+            connection.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+            )
+        yield connection
+
+
+def current_version(connection) -> int | None:
+    """Applied schema version, ``None`` for a database without versioning."""
+    if not inspect(connection).has_table(SchemaVersion.__tablename__):
+        return None
+    version = connection.execute(
+        select(SchemaVersion.version).order_by(SchemaVersion.version.desc())
+    ).first()
+    return version[0] if version else 0
+
+
+def record_version(connection, migration: Migration):
+    connection.execute(
+        SchemaVersion.__table__.insert().values(
+            version=migration.version, name=migration.name
+        )
+    )
+
+
+def apply_migrations(engine, target: int = HEAD) -> tuple[int, bool]:
+    """Bring the database schema up to ``target`` in place.
+
+    An empty database gets the current schema from the models in one step
+    and is stamped with every version. Otherwise each pending migration runs
+    in its own transaction together with the row recording it, so a failed
+    migration leaves the database at the previous version. Workers may call
+    this concurrently: the version is re-read under the migration lock and
+    migrations another worker applied in the meantime are skipped.
+
+    Returns the schema version and whether this call created the schema in
+    an empty database; of workers starting together, only one sees it empty.
+    """
+    with migration_transaction(engine) as connection:
+        version = current_version(connection)
+        if version is None and not inspect(connection).get_table_names():
+            SQLModel.metadata.create_all(connection)
+            for migration in MIGRATIONS:
+                if migration.version <= target:
+                    record_version(connection, migration)
+            logger.info("Created schema at version {}", target)
+            return target, True
+        if version is None:
+            SchemaVersion.__table__.create(connection)
+            version = 0
+
+    for migration in MIGRATIONS:
+        if not version < migration.version <= target:
+            continue
+        try:
+            with migration_transaction(engine) as connection:
+                version = current_version(connection)
+                if migration.version <= version:
+                    continue
+                migration.upgrade(connection)
+                record_version(connection, migration)
+        except IntegrityError:
+            # Recorded by another worker between our read and our insert;
+            # its transaction applied the migration.
+            logger.info("Migration {} applied by another worker", migration.version)
+        else:
+            logger.info("Applied migration {} ({})", migration.version, migration.name)
+        version = migration.version
+    return version, False
+
+
+def migrate(engine, target: int = HEAD) -> int:
+    """Bring the database schema up to ``target`` and return its version."""
+    version, _ = apply_migrations(engine, target)
+    return version
+
+
+def stored_version(engine) -> int | None:
+    """Applied schema version read with a single query, without reflection.
+
+    ``None`` when the database has no ``schema_version`` table.
+    """
+    try:
+        with engine.connect() as connection:
+            return connection.execute(select(func.max(SchemaVersion.version))).scalar()
+    except (OperationalError, ProgrammingError):
+        return None
+
+
+def ensure_schema(engine) -> tuple[int, bool]:
+    """Migrate unless the stored schema version is already head.
+
+    Returns the schema version and whether this call created the schema in
+    an empty database. A restart against an up-to-date database costs one
+    query.
+    """
+    if stored_version(engine) == HEAD:
+        return HEAD, False
+    return apply_migrations(engine)
+
+
+# Statements the delete, lookup, search and reporting paths run most; each
+# should be answered from an index. Parameters are sample values.
+HOT_QUERIES = {
+    "order details by order": select(OrderDetail).where(
+        OrderDetail.order_id.in_([1, 2])
+    ),
+    "order details by product": select(OrderDetail.order_id).where(
+        OrderDetail.product_id == 1
+    ),
+    "orders by batch": select(Order).where(Order.order_batch_id == 1),
+    "orders by customer": select(Order).where(
+        Order.customer_email == "customer@example.com"
+    ),
+    "products by category and price": select(Product).where(
+        Product.category == "Office",
+        Product.out_of_stock.is_(False),
+        Product.unit_price.between(1, 10),
+    ),
+    "products by price": select(Product).where(Product.unit_price.between(1, 10)),
+    "sales rollup by day": select(SalesRollup).where(
+        SalesRollup.day >= date(2025, 1, 1)
+    ),
+}
+
+
+def explain(connection, statement) -> list[str]:
+    """The database's query plan for ``statement``, one line per step."""
+    sql = statement.compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    )
+    if connection.dialect.name == "sqlite":
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+        return [row[3] for row in rows]
+    if connection.dialect.name == "postgresql":
+        return [row[0] for row in connection.execute(text(f"EXPLAIN {sql}"))]
+    raise ValueError(f"Query plans are not available on {connection.dialect.name}")
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    """Plan steps that read a whole table rather than an index."""
+    return [
+        step
+        for step in plan
+        if (step.startswith("SCAN ") and " USING " not in step)
+        or step.lstrip(" ->").startswith("Seq Scan")
+    ]
+
+
+def query_plans(engine) -> dict[str, list[str]]:
+    with engine.connect() as connection:
+        return {name: explain(connection, query) for name, query in HOT_QUERIES.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    parser.add_argument("command", choices=["upgrade", "current", "plans"])
+    parser.add_argument("--target", type=int, default=HEAD)
+    args = parser.parse_args(argv)
+
+    from app.database import engine
+
+    if args.command == "upgrade":
+        print(f"Schema at version {migrate(engine, args.target)}")
+    elif args.command == "current":
+        with engine.connect() as connection:
+            print(f"Schema at version {current_version(connection)} (head {HEAD})")
+    else:
+        for name, plan in query_plans(engine).items():
+            flag = "FULL SCAN" if full_scans(plan) else "indexed"
+            print(f"{name}: {flag}")
+            for step in plan:
+                print(f"    {step}")
+
+
+if __name__ == "__main__":
+    main()
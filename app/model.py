@@ -1,4 +1,5 @@
 from datetime import datetime, date
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel, Relationship
 
 
@@ -13,6 +14,13 @@ class ProductBase(SQLModel):
 
 class Product(ProductBase, table=True):
     __tablename__ = "product"
+    # Search filters: category and stock equality, then the price range.
+    __table_args__ = (
+        Index(
+            "ix_product_category_stock_price", "category", "out_of_stock", "unit_price"
+        ),
+        Index("ix_product_unit_price", "unit_price"),
+    )
     id: int | None = Field(default=None, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -39,6 +47,86 @@ class ProductUpdate(ProductBase):
     out_of_stock: bool | None = None
 
 
+class ProductBulkUpdate(ProductUpdate):
+    id: int
+
+
+class ProductBulkUpdateRow(SQLModel):
+    id: int
+    status: str
+    error: str | None = None
+
+
+class ProductBulkUpdateReport(SQLModel):
+    updated: int = 0
+    missing: list[int] = []
+    failed: list[int] = []
+    rows: list[ProductBulkUpdateRow] = []
+
+
+class ProductSearch(SQLModel):
+    query: str | None = None
+    category: str | None = None
+    min_price: float | None = None
+    max_price: float | None = None
+    out_of_stock: bool | None = None
+    offset: int = 0
+    limit: int = 20
+    cursor: str | None = None
+
+
+class ProductImportRow(SQLModel):
+    row: int
+    status: str
+    name: str | None = None
+    id: int | None = None
+    error: str | None = None
+
+
+class ProductImportReport(SQLModel):
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    failed: int = 0
+    rows: list[ProductImportRow] = []
+
+
+class CacheVersion(SQLModel, table=True):
+    __tablename__ = "cache_version"
+    name: str = Field(primary_key=True, max_length=100)
+    version: int = 0
+
+
+class SchemaVersion(SQLModel, table=True):
+    __tablename__ = "schema_version"
+    version: int = Field(primary_key=True)
+    name: str = Field(max_length=255)
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class CategorySummary(SQLModel):
+    category: str
+    product_count: int
+    in_stock_count: int
+
+
+class SalesRollup(SQLModel, table=True):
+    __tablename__ = "sales_rollup"
+    day: date = Field(primary_key=True)
+    product_id: int = Field(primary_key=True)
+    status: str = Field(primary_key=True, max_length=100)
+    units: int = 0
+    revenue: float = 0
+    lines: int = 0
+
+
+class SalesReportRow(SQLModel):
+    key: str
+    units: int
+    revenue: float
+    lines: int
+
+
 class OrderBatchBase(SQLModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     type: str = "order_batch"
@@ -61,7 +149,7 @@ class OrderBatchResponse(OrderBatchBase):
 
 class OrderBase(SQLModel):
     customer_name: str = Field(max_length=100)
-    customer_email: str = Field(max_length=100)
+    customer_email: str = Field(max_length=100, index=True)
     status: str = Field(max_length=100, default="pending")
 
 
@@ -73,7 +161,7 @@ class Order(OrderBase, table=True):
     total_amount: float
     order_details: list["OrderDetail"] = Relationship(back_populates="order")
     order_batch: OrderBatch = Relationship(back_populates="orders")
-    order_batch_id: int = Field(foreign_key="order_batch.id")
+    order_batch_id: int = Field(foreign_key="order_batch.id", index=True)
 
 
 class OrderPublic(OrderBase):
@@ -96,6 +184,17 @@ class OrderUpdate(OrderBase):
     total_amount: float | None = None
 
 
+class OrderBulkDelete(SQLModel):
+    order_ids: list[int] = []
+    order_batch_id: int | None = None
+
+
+class OrderBulkDeleteResponse(SQLModel):
+    ok: bool
+    deleted: list[int]
+    missing: list[int]
+
+
 class OrderResponse(OrderBase):
     id: int
     customer_name: str
@@ -138,8 +237,8 @@ class OrderDetailResponse(OrderDetailBase):
 class OrderDetail(OrderDetailBase, table=True):
     __tablename__ = "order_details"
     id: int | None = Field(default=None, primary_key=True)
-    product_id: int = Field(foreign_key="product.id")
-    order_id: int = Field(foreign_key="order.id")
+    product_id: int = Field(foreign_key="product.id", index=True)
+    order_id: int = Field(foreign_key="order.id", index=True)
     product: Product = Relationship(back_populates="order_details")
     order: Order = Relationship(back_populates="order_details")
 
@@ -1,19 +1,11 @@
+import inspect
+import time
 from enum import Enum
 
-from .orders import (
-    create_order_batch,
-    delete_order,
-    get_order,
-    get_orders,
-    update_order,
-)
-from .products import (
-    create_product,
-    delete_product,
-    get_product,
-    list_products,
-    update_product,
-)
+from starlette.concurrency import run_in_threadpool
+
+from . import async_orders, async_products, orders, products
+from .metrics import record_operation, timed_operation
 
 
 class Operation(Enum):
@@ -22,6 +14,10 @@ class Operation(Enum):
     LIST = "list"
     DELETE = "delete"
     UPDATE = "update"
+    IMPORT = "import"
+    BULK_UPDATE = "bulk_update"
+    BULK_DELETE = "bulk_delete"
+    SEARCH = "search"
 
 
 class ModelType(Enum):
@@ -33,59 +29,124 @@ from fastapi import HTTPException
 from .logging_config import app_logger as logger
 
 
+def is_async_session(session) -> bool:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    return isinstance(session, AsyncSession)
+
+
 def operation_router(**current_model):
+    """Dispatch to the operation for the model type.
+
+    With an AsyncSession the async implementation is used and a coroutine is
+    returned; use ``run_operation`` to get the result either way. Every
+    operation is counted and timed by model type and operation.
+    """
+    labels = (current_model["model_type"].value, current_model["operation"].value)
+    start = time.perf_counter()
+    try:
+        result = dispatch_operation(current_model)
+    except Exception as e:
+        record_operation(labels, start, e)
+        raise
+
+    if inspect.isawaitable(result):
+        return timed_operation(result, labels, start)
+    record_operation(labels, start)
+    return result
+
+
+def dispatch_operation(current_model):
+    if is_async_session(current_model["session"]):
+        product_ops, order_ops = async_products, async_orders
+    else:
+        product_ops, order_ops = products, orders
 
     if current_model["model_type"].value == "product":
-        return product_manager(current_model)
+        return product_manager(current_model, product_ops)
     elif current_model["model_type"].value == "order":
-        return order_manager(current_model)
+        return order_manager(current_model, order_ops)
     else:
-        logger.warning(f"Model class type not found")
+        logger.warning("Model class type not found")
         raise HTTPException(status_code=404, detail="Model class not found ")
 
 
-def product_manager(current_model):
+def product_manager(current_model, ops=products):
 
     if current_model["operation"].value == "post":
-        return create_product(current_model)
+        return ops.create_product(current_model)
 
     elif current_model["operation"].value == "get":
-        return get_product(current_model)
+        return ops.get_product(current_model)
 
     elif current_model["operation"].value == "list":
-        return list_products(current_model)
+        return ops.list_products(current_model)
 
     elif current_model["operation"].value == "delete":
-        return delete_product(current_model)
+        return ops.delete_product(current_model)
 
     elif current_model["operation"].value == "update":
-        return update_product(current_model)
+        return ops.update_product(current_model)
+
+    elif current_model["operation"].value == "import":
+        return ops.import_products(current_model)
+
+    elif current_model["operation"].value == "bulk_update":
+        return ops.bulk_update_products(current_model)
+
+    elif current_model["operation"].value == "search":
+        return ops.search_products(current_model)
 
     else:
-        logger.warning(f"Operation not found")
+        logger.warning("Operation not found")
         raise ValueError(
             f"Invalid operation: {current_model['operation']},{current_model}. Supported operations are: {list(Operation)}"
         )
 
 
-def order_manager(current_model):
+def order_manager(current_model, ops=orders):
 
     if current_model["operation"].value == "post":
-        return create_order_batch(current_model)
+        return ops.create_order_batch(current_model)
 
     elif current_model["operation"].value == "list":
-        return get_orders(current_model)
+        return ops.get_orders(current_model)
 
     elif current_model["operation"].value == "delete":
-        return delete_order(current_model)
+        return ops.delete_order(current_model)
 
     elif current_model["operation"].value == "get":
-        return get_order(current_model)
+        return ops.get_order(current_model)
 
     elif current_model["operation"].value == "update":
-        return update_order(current_model)
+        return ops.update_order(current_model)
+
+    elif current_model["operation"].value == "bulk_delete":
+        return ops.delete_orders(current_model)
     else:
-        logger.warning(f"Operation not found")
+        logger.warning("Operation not found")
         raise ValueError(
             f"Invalid operation: {current_model['operation']},{current_model}. Supported operations are: {list(Operation)}"
         )
+
+
+async def run_operation(**current_model):
+    """Run an operation from an async handler without blocking the loop.
+
+    Sync sessions are driven from FastAPI's threadpool as sync handlers
+    would be; async sessions are awaited directly.
+    """
+    if is_async_session(current_model["session"]):
+        return await operation_router(**current_model)
+    return await run_in_threadpool(operation_router, **current_model)
+
+
+async def run_db(session, fn, *args):
+    """Call ``fn(sync_session, *args)`` from an async handler.
+
+    Async sessions hand their underlying sync session to ``fn``; sync
+    sessions are used from the threadpool.
+    """
+    if is_async_session(session):
+        return await session.run_sync(fn, *args)
+    return await run_in_threadpool(fn, session, *args)
@@ -1,103 +1,205 @@
+from collections import Counter
 from datetime import datetime
 from fastapi import HTTPException
+from sqlalchemy import bindparam, delete, func, insert, update
+from sqlalchemy.orm import selectinload
 from sqlmodel import select
+from app.categories import category_index, is_in_stock
 from app.model import Order, OrderBatch, OrderDetail, Product
-from .logging_config import app_logger as logger
+from app.metrics import order_batch_size
+from app.pagination import paginate
+from app.sales import change_order_status, record_order_batch, remove_orders
+from app.product_cache import bump_product_version, product_cache
+from .logging_config import app_logger as logger, log_sampler
+
+# Order responses serialize details and their products; load them with one
+# query per relationship instead of lazily per row.
+order_details_loader = selectinload(Order.order_details).selectinload(
+    OrderDetail.product
+)
+
+
+def batch_demand(orders_data, products):
+    """Total quantity requested per product over every order in the batch."""
+    demand = Counter()
+    for order_idx, order in enumerate(orders_data.order_list):
+        for item in order.items:
+            if item.product_id not in products:
+                logger.error(
+                    "Product {} not found in order {}", item.product_id, order_idx + 1
+                )
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Product with ID {item.product_id} not found",
+                )
+            demand[item.product_id] += item.quantity
+    return demand
+
+
+def reserve_stock(product_id, quantity, now):
+    """Conditional decrement that only matches when enough stock is left."""
+    return (
+        update(Product)
+        .where(Product.id == product_id, Product.stock_quantity >= quantity)
+        .values(
+            stock_quantity=Product.stock_quantity - quantity,
+            out_of_stock=Product.stock_quantity - quantity <= 0,
+            updated_at=now,
+        )
+        .execution_options(synchronize_session=False)
+    )
 
 
-def create_order_batch(orders):
+def sold_out_changes(products, demand):
+    """Category index changes for the products a reservation sells out.
 
-    orders_data = orders["orders_data"]
-    session = orders["session"]
+    Taken from the products as loaded for the batch, before the commit
+    expires them.
+    """
+    return [
+        (product.category, True, product.category, False)
+        for product_id, quantity in demand.items()
+        if is_in_stock(product := products[product_id])
+        and product.stock_quantity <= quantity
+    ]
 
-    order_batch = OrderBatch()
 
-    logger.info(f"Creating order batch with {len(orders_data.order_list)} orders")
+def insufficient_stock(product, product_id, quantity):
+    if not product:
+        return HTTPException(
+            status_code=404, detail=f"Product with ID {product_id} not found"
+        )
+    logger.error(
+        "Insufficient stock for {}: {} < {}",
+        product.name,
+        product.stock_quantity,
+        quantity,
+    )
+    return HTTPException(
+        status_code=400,
+        detail=f"Insufficient stock for {product.name}. Available: {product.stock_quantity}, Requested: {quantity}",
+    )
+
+
+def batch_order_rows(orders_data, products, order_batch_id, now):
+    return [
+        {
+            "customer_name": order.customer_name,
+            "customer_email": order.customer_email,
+            "status": "pending",
+            "total_amount": sum(
+                products[item.product_id].unit_price * item.quantity
+                for item in order.items
+            ),
+            "order_batch_id": order_batch_id,
+            "order_date": now.date(),
+            "updated_at": now,
+        }
+        for order in orders_data.order_list
+    ]
+
+
+def batch_detail_rows(orders_data, products, order_ids):
+    return [
+        {
+            "order_id": order_id,
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "unit_price": products[item.product_id].unit_price,
+            "subtotal": products[item.product_id].unit_price * item.quantity,
+        }
+        for order_id, order in zip(order_ids, orders_data.order_list)
+        for item in order.items
+    ]
+
+
+def batch_order_ids(order_batch_id):
+    # A plain executemany keeps the order insert a single round trip;
+    # RETURNING with guaranteed row order degrades to one INSERT per row on
+    # SQLite. Ids are read back instead, they increase in insertion order.
+    return (
+        select(Order.id)
+        .where(Order.order_batch_id == order_batch_id)
+        .order_by(Order.id)
+    )
+
+
+def order_batch_with_orders(order_batch_id):
+    return (
+        select(OrderBatch)
+        .where(OrderBatch.id == order_batch_id)
+        .options(selectinload(OrderBatch.orders).options(order_details_loader))
+        .execution_options(populate_existing=True)
+    )
 
-    session.add(order_batch)
-    session.flush()
 
-    created_orders = []
+def create_order_batch(orders):
 
-    try:
-        for order_idx, order in enumerate(orders_data.order_list):
-            logger.info(
-                f"Processing order {order_idx + 1}/{len(orders_data.order_list)} for {order.customer_email}"
-            )
+    orders_data = orders["orders_data"]
+    session = orders["session"]
 
-            total_amount = 0.0
-            order_items_data = []
-
-            for item in order.items:
-                product = session.get(Product, item.product_id)
-                if not product:
-                    logger.error(
-                        f"Product {item.product_id} not found in order {order_idx + 1}"
-                    )
-                    raise HTTPException(
-                        status_code=404,
-                        detail=f"Product with ID {item.product_id} not found",
-                    )
-
-                if product.stock_quantity < item.quantity:
-                    logger.error(
-                        f"Insufficient stock for {product.name}: {product.stock_quantity} < {item.quantity}"
-                    )
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Insufficient stock for {product.name}. Available: {product.stock_quantity}, Requested: {item.quantity}",
-                    )
-
-                subtotal = product.unit_price * item.quantity
-                total_amount += subtotal
-
-                order_items_data.append(
-                    {
-                        "product": product,
-                        "quantity": item.quantity,
-                        "unit_price": product.unit_price,
-                        "subtotal": subtotal,
-                    }
-                )
+    logger.info("Creating order batch with {} orders", len(orders_data.order_list))
+    order_batch_size.observe(len(orders_data.order_list))
 
-            new_order = Order(
-                customer_name=order.customer_name,
-                customer_email=order.customer_email,
-                status="pending",
-                total_amount=total_amount,
-                order_batch_id=order_batch.id,
-            )
-            session.add(new_order)
-            session.flush()
-
-            for item_data in order_items_data:
-                order_item = OrderDetail(
-                    order_id=new_order.id,
-                    product_id=item_data["product"].id,
-                    quantity=item_data["quantity"],
-                    unit_price=item_data["unit_price"],
-                    subtotal=item_data["subtotal"],
+    try:
+        # Load every product referenced by the batch in one query and reserve
+        # the demand of the whole batch, so two orders for the same product
+        # cannot oversell it between them.
+        product_ids = {
+            item.product_id for order in orders_data.order_list for item in order.items
+        }
+        products = {
+            product.id: product
+            for product in session.exec(
+                select(Product).where(Product.id.in_(product_ids))
+            ).all()
+        }
+        demand = batch_demand(orders_data, products)
+
+        now = datetime.utcnow()
+
+        # Reserve stock with conditional decrements instead of a read-check-
+        # write in Python, so concurrent workers cannot oversell. Products
+        # are updated in id order to keep lock acquisition consistent.
+        for product_id in sorted(demand):
+            quantity = demand[product_id]
+            reserved = session.execute(reserve_stock(product_id, quantity, now))
+            if reserved.rowcount != 1:
+                session.rollback()
+                product = session.get(Product, product_id, populate_existing=True)
+                raise insufficient_stock(product, product_id, quantity)
+
+        order_batch = OrderBatch(created_at=now)
+        session.add(order_batch)
+        session.flush()
+
+        order_rows = batch_order_rows(orders_data, products, order_batch.id, now)
+        if order_rows:
+            session.execute(insert(Order), order_rows)
+        order_ids = session.exec(batch_order_ids(order_batch.id)).all()
+
+        detail_rows = batch_detail_rows(orders_data, products, order_ids)
+        for order_id, order in zip(order_ids, orders_data.order_list):
+            if log_sampler.allow("orders.create_order_batch.order"):
+                logger.debug(
+                    "Order {} created for {} with {} items",
+                    order_id,
+                    order.customer_email,
+                    len(order.items),
                 )
-                session.add(order_item)
-
-            for item_data in order_items_data:
-                product = item_data["product"]
-                product.stock_quantity -= item_data["quantity"]
-                product.updated_at = datetime.utcnow()
-
-            created_orders.append(new_order)
-            logger.info(
-                f"Order created for {order.customer_email} with total ${total_amount}"
-            )
+        if detail_rows:
+            session.execute(insert(OrderDetail), detail_rows)
+        record_order_batch(session, order_batch.id)
+        sold_out = sold_out_changes(products, demand)
 
+        version = bump_product_version(session)
         session.commit()
-
-        session.refresh(order_batch)
-        for order in created_orders:
-            session.refresh(order)
+        product_cache.written(version, demand)
+        category_index.products_changed(sold_out, version)
+        order_batch = session.exec(order_batch_with_orders(order_batch.id)).one()
 
         logger.success(
-            f"Order batch created successfully with {len(created_orders)} orders"
+            "Order batch created successfully with {} orders", len(order_ids)
         )
         return order_batch
 
@@ -108,7 +210,7 @@ def create_order_batch(orders):
 
     except Exception as e:
         session.rollback()
-        logger.error(f"Unexpected error creating order batch: {str(e)}")
+        logger.error("Unexpected error creating order batch: {}", e)
         raise HTTPException(status_code=500, detail="Failed to create order batch")
 
 
@@ -117,17 +219,35 @@ def get_orders(orders):
     session = orders["session"]
     offset = orders["offset"]
     limit = orders["limit"]
+    cursor = orders.get("cursor")
 
     try:
-        orders = session.exec(select(Order).offset(offset).limit(limit)).all()
+        orders = session.exec(
+            paginate(
+                select(Order).options(order_details_loader),
+                Order.id,
+                offset,
+                limit,
+                cursor,
+            )
+        ).all()
         logger.info(
-            f"Retrieved {len(orders)} orders",
-            extra={"count": len(orders), "offset": offset, "limit": limit},
+            "Retrieved {} orders",
+            len(orders),
+            extra={
+                "count": len(orders),
+                "offset": offset,
+                "limit": limit,
+                "cursor": cursor,
+            },
         )
         return orders
 
+    except HTTPException:
+        raise
+
     except Exception as e:
-        logger.error(f"Database error retrieving orders: {str(e)}")
+        logger.error("Database error retrieving orders: {}", e)
         raise HTTPException(status_code=500, detail="Failed to retrieve orders")
 
 
@@ -136,50 +256,153 @@ def get_order(order):
     session = order["session"]
     order_id = order["order_id"]
 
-    order = session.get(Order, order_id)
+    order = session.get(Order, order_id, options=[order_details_loader])
     if not order:
-        logger.warning(f"Order {order_id} not found")
+        logger.warning("Order {} not found", order_id)
         raise HTTPException(status_code=404, detail="Order not found")
 
-    logger.info(f"Order {order_id} retrieved successfully")
+    logger.info("Order {} retrieved successfully", order_id)
     return order
 
 
+def delete_order_rows(session, order_ids, order_batch_id=None):
+    """Delete orders and their details, putting their quantities back in stock.
+
+    Restocking aggregates the quantities per product and applies them with
+    one executemany UPDATE; details and orders go with one DELETE each, all
+    in a single transaction, which is retried if a concurrent delete takes
+    some of the orders first. Passing ``order_batch_id`` deletes the whole
+    batch including its row. Returns the ids that existed and were deleted;
+    product caches are only invalidated when stock was put back.
+    """
+    if order_batch_id is not None:
+        order_ids = session.exec(
+            select(Order.id).where(Order.order_batch_id == order_batch_id)
+        ).all()
+    else:
+        order_ids = session.exec(
+            select(Order.id).where(Order.id.in_(set(order_ids)))
+        ).all()
+    if not order_ids:
+        return []
+
+    now = datetime.utcnow()
+    restock = session.exec(
+        select(
+            Product.id,
+            func.sum(OrderDetail.quantity),
+            Product.category,
+            Product.stock_quantity,
+            Product.out_of_stock,
+        )
+        .join(Product, Product.id == OrderDetail.product_id)
+        .where(OrderDetail.order_id.in_(order_ids))
+        .group_by(Product.id)
+        .order_by(Product.id)
+    ).all()
+
+    if restock:
+        product = Product.__table__
+        session.connection().execute(
+            update(product)
+            .where(product.c.id == bindparam("restock_id"))
+            .values(
+                stock_quantity=product.c.stock_quantity + bindparam("restock_quantity"),
+                out_of_stock=product.c.stock_quantity + bindparam("restock_quantity")
+                <= 0,
+                updated_at=now,
+            ),
+            [
+                {"restock_id": product_id, "restock_quantity": quantity}
+                for product_id, quantity, *_ in restock
+            ],
+        )
+
+    remove_orders(session, order_ids)
+    session.execute(
+        delete(OrderDetail)
+        .where(OrderDetail.order_id.in_(order_ids))
+        .execution_options(synchronize_session=False)
+    )
+    deleted = session.execute(
+        delete(Order)
+        .where(Order.id.in_(order_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if deleted != len(order_ids):
+        # A concurrent delete won some of these orders after they were
+        # read, and has already restocked them. Start over from what is
+        # left rather than restock them twice.
+        session.rollback()
+        logger.warning(
+            "Orders {} changed while being deleted, retrying", list(order_ids)
+        )
+        return delete_order_rows(session, order_ids, order_batch_id)
+    if order_batch_id is not None:
+        session.execute(
+            delete(OrderBatch)
+            .where(OrderBatch.id == order_batch_id)
+            .execution_options(synchronize_session=False)
+        )
+
+    if restock:
+        version = bump_product_version(session)
+    session.commit()
+    if restock:
+        product_cache.written(version, [product_id for product_id, *_ in restock])
+        category_index.products_changed(
+            [
+                (category, False, category, True)
+                for _, quantity, category, stock, out_of_stock in restock
+                if (out_of_stock or stock <= 0) and stock + quantity > 0
+            ],
+            version,
+        )
+    return list(order_ids)
+
+
 def delete_order(order):
 
     session = order["session"]
     order_id = order["order_id"]
 
-    order = session.get(Order, order_id)
+    try:
+        deleted = delete_order_rows(session, [order_id])
 
-    if not order:
-        logger.warning(f"Order {order_id} not found for deletion")
+    except Exception as e:
+        session.rollback()
+        logger.error("Failed to delete order {}: {}", order_id, e)
+        raise HTTPException(status_code=500, detail="Failed to delete order")
+
+    if not deleted:
+        logger.warning("Order {} not found for deletion", order_id)
         raise HTTPException(status_code=404, detail="Order not found")
 
-    try:
-        order_details = session.exec(
-            select(OrderDetail).where(OrderDetail.order_id == order_id)
-        ).all()
+    logger.success("Order {} deleted successfully", order_id)
+    return {"ok": True}
 
-        for detail in order_details:
-            product = session.get(Product, detail.product_id)
-            if product:
-                product.stock_quantity += detail.quantity
 
-            session.delete(detail)
+def delete_orders(orders):
 
-        session.delete(order)
-        session.commit()
+    session = orders["session"]
+    order_ids = orders["order_ids"]
+    order_batch_id = orders.get("order_batch_id")
 
-        logger.success(
-            f"Order {order_id} and {len(order_details)} details deleted successfully"
-        )
-        return {"ok": True}
+    try:
+        deleted = delete_order_rows(session, order_ids, order_batch_id)
 
     except Exception as e:
         session.rollback()
-        logger.error(f"Failed to delete order {order_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to delete order")
+        logger.error("Failed to delete orders: {}", e)
+        raise HTTPException(status_code=500, detail="Failed to delete orders")
+
+    if order_batch_id is not None and not deleted:
+        logger.warning("Order batch {} not found for deletion", order_batch_id)
+        raise HTTPException(status_code=404, detail="Order batch not found")
+
+    missing = sorted(set(order_ids) - set(deleted))
+    logger.success("Deleted {} orders", len(deleted), extra={"missing": len(missing)})
+    return {"ok": True, "deleted": sorted(deleted), "missing": missing}
 
 
 def update_order(order):
@@ -191,25 +414,28 @@ def update_order(order):
     order_data = order_to_update.model_dump(exclude_unset=True)
     if not order_data:
         logger.warning(
-            f"No data provided for order update", extra={"order_id": order_id}
+            "No data provided for order update", extra={"order_id": order_id}
         )
         raise HTTPException(status_code=422, detail="Unprocessable Entity")
 
     order_db = session.get(Order, order_id)
     if not order_db:
-        logger.warning(f"Order {order_id} not found for update")
+        logger.warning("Order {} not found for update", order_id)
         raise HTTPException(status_code=404, detail="Order not found")
 
     try:
+        if order_data.get("status") not in (None, order_db.status):
+            change_order_status(session, order_id, order_data["status"])
+        order_data.setdefault("updated_at", datetime.utcnow())
         order_db.sqlmodel_update(order_data)
         session.commit()
         session.refresh(order_db)
         logger.success(
-            f"Order {order_id} updated successfully", extra={"order_id": order_id}
+            "Order {} updated successfully", order_id, extra={"order_id": order_id}
         )
         return order_db
 
     except Exception as e:
         session.rollback()
-        logger.error(f"Failed to update order {order_id}: {str(e)}")
+        logger.error("Failed to update order {}: {}", order_id, e)
         raise HTTPException(status_code=500, detail=f"Failed to update order: {str(e)}")
@@ -0,0 +1,56 @@
+import base64
+import json
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int, **position) -> str:
+    """Opaque cursor for the row after ``last_id``.
+
+    ``position`` carries the other sort keys of orderings that are not by
+    id alone, such as ranked search results.
+    """
+    payload = json.dumps({"id": last_id, **position}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor_payload(cursor: str, **types) -> dict:
+    """Decode ``cursor`` and check its ``id`` and every key in ``types``."""
+    types = {"id": int, **types}
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        valid = all(
+            isinstance(payload[key], expected) and not isinstance(payload[key], bool)
+            for key, expected in types.items()
+        )
+    except (ValueError, KeyError, TypeError):
+        valid = False
+
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return payload
+
+
+def decode_cursor(cursor: str) -> int:
+    return decode_cursor_payload(cursor)["id"]
+
+
+def paginate(statement, id_column, offset: int, limit: int, cursor: str | None):
+    """Apply keyset pagination when a cursor is given, OFFSET/LIMIT otherwise.
+
+    Rows are always ordered by id so both modes walk the table the same way
+    and a cursor taken from an offset page continues where it left off.
+    """
+    statement = statement.order_by(id_column)
+    if cursor is not None:
+        return statement.where(id_column > decode_cursor(cursor)).limit(limit)
+    return statement.offset(offset).limit(limit)
+
+
+def set_next_cursor(response: Response, rows: list, limit: int):
+    """Point the client at the next page when this one came back full."""
+    if rows and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, insert, update
+from sqlmodel import select
+
+from app.model import CacheVersion, ProductPublic
+from .logging_config import app_logger as logger
+
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "10000"))
+# How long a worker trusts its cache before checking whether another worker
+# wrote products in the meantime.
+PRODUCT_CACHE_VERSION_CHECK_INTERVAL = float(
+    os.getenv("PRODUCT_CACHE_VERSION_CHECK_INTERVAL", "1")
+)
+PRODUCT_VERSION_KEY = "product"
+
+
+def add_product_version_row(connection):
+    """Insert the shared product version row unless it exists.
+
+    Part of the schema: it is added when ``cache_version`` is created and by
+    a migration for older databases, so writers only ever UPDATE it.
+    """
+    exists = connection.execute(
+        select(CacheVersion.name).where(CacheVersion.name == PRODUCT_VERSION_KEY)
+    ).first()
+    if exists is None:
+        connection.execute(
+            insert(CacheVersion).values(name=PRODUCT_VERSION_KEY, version=0)
+        )
+
+
+event.listen(
+    CacheVersion.__table__,
+    "after_create",
+    lambda table, connection, **kw: add_product_version_row(connection),
+)
+
+
+def bump_product_version(session) -> int:
+    """Increment the shared product version inside the current transaction.
+
+    Every product write calls this before committing so other workers can
+    tell their cached products are out of date.
+    """
+    session.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == PRODUCT_VERSION_KEY)
+        .values(version=CacheVersion.version + 1)
+    )
+    return read_product_version(session)
+
+
+def read_product_version(session) -> int:
+    version = session.exec(
+        select(CacheVersion.version).where(CacheVersion.name == PRODUCT_VERSION_KEY)
+    ).first()
+    return version or 0
+
+
+class ProductCache:
+    """Bounded LRU of product snapshots by id and of product list pages.
+
+    Local writes invalidate exactly the entries they touch. Writes from
+    other workers are detected through the shared version in the
+    ``cache_version`` table, checked at most once per ``check_interval``,
+    and drop the whole cache.
+    """
+
+    def __init__(
+        self,
+        max_size: int = PRODUCT_CACHE_SIZE,
+        check_interval: float = PRODUCT_CACHE_VERSION_CHECK_INTERVAL,
+    ):
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, object] = OrderedDict()
+        self._pages_by_product: dict[int, set[tuple]] = {}
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Changes on every invalidation; used to drop racing fills."""
+        return self._generation
+
+    def check_version(self, session):
+        """Drop the cache when another worker has written products."""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+
+        version = read_product_version(session)
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    logger.info("Product cache cleared after an external write")
+                self._clear()
+                self._version = version
+            self._checked_at = time.monotonic()
+
+    def _get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _put(self, key, value, generation: int, product_ids):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            for product_id in product_ids:
+                self._pages_by_product.setdefault(product_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                if evicted_key[0] == "page":
+                    for product in evicted:
+                        self._pages_by_product.get(product.id, set()).discard(
+                            evicted_key
+                        )
+                self.evictions += 1
+
+    @property
+    def version(self) -> int | None:
+        """Shared product version this cache is known to be current with."""
+        return self._version
+
+    def get_etag(self, product_id: int) -> str | None:
+        with self._lock:
+            return self._entries.get(("etag", product_id))
+
+    def put_etag(self, product_id: int, etag: str, generation: int):
+        self._put(("etag", product_id), etag, generation, ())
+
+    def get_product(self, product_id: int) -> ProductPublic | None:
+        return self._get(("product", product_id))
+
+    def put_product(self, product, generation: int):
+        snapshot = ProductPublic.model_validate(product)
+        self._put(("product", product.id), snapshot, generation, ())
+        return snapshot
+
+    def get_page(self, offset: int, limit: int, cursor: str | None):
+        return self._get(("page", offset, limit, cursor))
+
+    def put_page(self, offset, limit, cursor, products, generation: int):
+        snapshots = [ProductPublic.model_validate(p) for p in products]
+        self._put(
+            ("page", offset, limit, cursor),
+            snapshots,
+            generation,
+            [p.id for p in snapshots],
+        )
+        return snapshots
+
+    def written(self, version: int, product_ids, membership_changed: bool = False):
+        """Invalidate after a committed local write.
+
+        ``membership_changed`` is set when products were added or removed,
+        which shifts every list page rather than just the ones holding the
+        written products.
+        """
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if self._version is None or version != self._version + 1:
+                # Another worker wrote in between; nothing cached is certain.
+                self._clear()
+                self._version = None
+                self._checked_at = 0.0
+                return
+
+            self._version = version
+            for product_id in product_ids:
+                self._entries.pop(("product", product_id), None)
+                self._entries.pop(("etag", product_id), None)
+                for key in self._pages_by_product.pop(product_id, ()):
+                    self._entries.pop(key, None)
+            if membership_changed:
+                for key in [k for k in self._entries if k[0] == "page"]:
+                    del self._entries[key]
+                self._pages_by_product.clear()
+
+    def _clear(self):
+        self._generation += 1
+        self._entries.clear()
+        self._pages_by_product.clear()
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+            self._version = None
+            self._checked_at = 0.0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+product_cache = ProductCache()
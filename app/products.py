@@ -1,7 +1,20 @@
+from datetime import datetime
 from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, update
 from sqlmodel import select
-from app.model import Product
-from .logging_config import app_logger as logger
+from app.categories import category_index, is_in_stock
+from app.model import (
+    Product,
+    ProductBulkUpdateReport,
+    ProductBulkUpdateRow,
+    ProductCreate,
+    ProductImportRow,
+)
+from app.pagination import paginate
+from app.search import search_page, search_statement
+from app.product_cache import bump_product_version, product_cache
+from .logging_config import app_logger as logger, log_sampler
 
 
 def create_product(new_product):
@@ -17,24 +30,30 @@ def create_product(new_product):
     ).first()
 
     if existing_product:
-        logger.warning(f"Product '{product.name}' already exists")
+        logger.warning("Product '{}' already exists", product.name)
         raise HTTPException(
             status_code=409, detail=f"Product '{product.name}' already exists"
         )
 
     try:
         session.add(product)
+        session.flush()
+        version = bump_product_version(session)
         session.commit()
         session.refresh(product)
+        product_cache.written(version, [product.id], membership_changed=True)
+        category_index.product_added(product, version)
         logger.success(
-            f"Product '{product.name}' created by {current_user.email}",
+            "Product '{}' created by {}",
+            product.name,
+            current_user.email,
             extra={"product_id": product.id, "user_email": current_user.email},
         )
         return product
 
     except Exception as e:
         session.rollback()
-        logger.error(f"Database error creating product: {str(e)}")
+        logger.error("Database error creating product: {}", e)
         raise HTTPException(status_code=500, detail="Failed to create product")
 
 
@@ -42,23 +61,60 @@ def list_products(products):
     session = products["session"]
     offset = products["offset"]
     limit = products["limit"]
-    products = session.exec(select(Product).offset(offset).limit(limit)).all()
+    cursor = products.get("cursor")
+
+    product_cache.check_version(session)
+    generation = product_cache.generation
+    cached = product_cache.get_page(offset, limit, cursor)
+    if cached is not None:
+        return cached
+
+    products = session.exec(
+        paginate(select(Product), Product.id, offset, limit, cursor)
+    ).all()
+    products = product_cache.put_page(offset, limit, cursor, products, generation)
     logger.info(
-        f"Retrieved {len(products)} products",
-        extra={"count": len(products), "offset": offset, "limit": limit},
+        "Retrieved {} products",
+        len(products),
+        extra={
+            "count": len(products),
+            "offset": offset,
+            "limit": limit,
+            "cursor": cursor,
+        },
     )
     return products
 
 
+def search_products(product_search):
+    session = product_search["session"]
+    search = product_search["search"]
+
+    rows = session.exec(search_statement(session, **search.model_dump())).all()
+    products, next_cursor = search_page(rows, search.limit)
+    logger.info(
+        "Search matched {} products",
+        len(products),
+        extra={"count": len(products), **search.model_dump(exclude_none=True)},
+    )
+    return products, next_cursor
+
+
 def get_product(current_product):
     session = current_product["session"]
     product_id = current_product["product_id"]
 
+    product_cache.check_version(session)
+    generation = product_cache.generation
+    cached = product_cache.get_product(product_id)
+    if cached is not None:
+        return cached
+
     product = session.get(Product, product_id)
     if not product:
-        logger.warning(f"Product {product_id} not found")
+        logger.warning("Product {} not found", product_id)
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return product_cache.put_product(product, generation)
 
 
 def delete_product(product):
@@ -66,22 +122,29 @@ def delete_product(product):
     product_id = product["product_id"]
     product = session.get(Product, product_id)
     if not product:
-        logger.warning(f"Product {product_id} not found for deletion")
+        logger.warning("Product {} not found for deletion", product_id)
         raise HTTPException(status_code=404, detail="Product not found")
 
     try:
         product_name = product.name
+        category = product.category
+        in_stock = is_in_stock(product)
         session.delete(product)
+        session.flush()
+        version = bump_product_version(session)
         session.commit()
+        product_cache.written(version, [product_id], membership_changed=True)
+        category_index.product_removed(category, in_stock, version)
         logger.success(
-            f"Product '{product_name}' deleted successfully",
+            "Product '{}' deleted successfully",
+            product_name,
             extra={"product_id": product_id},
         )
         return {"ok": True}
 
     except Exception as e:
         session.rollback()
-        logger.error(f"Failed to delete product: {str(e)}")
+        logger.error("Failed to delete product: {}", e)
         raise HTTPException(
             status_code=500, detail=f"Failed to delete product: {str(e)}"
         )
@@ -96,27 +159,271 @@ def update_product(product_for_update):
     product_data = product.model_dump(exclude_unset=True)
     if not product_data:
         logger.warning(
-            f"No data provided for product update", extra={"product_id": product_id}
+            "No data provided for product update", extra={"product_id": product_id}
         )
         raise HTTPException(status_code=422, detail="Unprocessable Entity")
 
     product_db = session.get(Product, product_id)
     if not product_db:
-        logger.warning(f"Product {product_id} not found for update")
+        logger.warning("Product {} not found for update", product_id)
         raise HTTPException(status_code=404, detail="Product not found")
 
     try:
+        old_category = product_db.category
+        old_in_stock = is_in_stock(product_db)
+        product_data.setdefault("updated_at", datetime.utcnow())
         product_db.sqlmodel_update(product_data)
+        version = bump_product_version(session)
         session.commit()
         session.refresh(product_db)
+        product_cache.written(version, [product_id])
+        category_index.product_changed(old_category, old_in_stock, product_db, version)
         logger.success(
-            f"Updated product successfully", extra={"product_id": product_db.id}
+            "Updated product successfully", extra={"product_id": product_db.id}
         )
         return product_db
 
     except Exception as e:
         session.rollback()
-        logger.error(f"Failed to update product: {str(e)}")
+        logger.error("Failed to update product: {}", e)
         raise HTTPException(
             status_code=500, detail=f"Failed to update product: {str(e)}"
         )
+
+
+def import_product_chunk(session, records, seen_names):
+    """Validate, de-duplicate and insert one chunk of imported products.
+
+    ``records`` are ``(row_number, data)`` pairs; ``seen_names`` holds the
+    names accepted by earlier chunks of the same import. Duplicates are
+    checked with one IN query per chunk and new products go in with a
+    single multi-row INSERT, committed per chunk.
+    """
+    results = []
+    candidates = []
+    for row_number, data in records:
+        try:
+            product = ProductCreate.model_validate(data)
+        except ValidationError as e:
+            if log_sampler.allow("products.import.invalid"):
+                logger.warning("Import row {} is invalid: {}", row_number, e)
+            results.append(
+                ProductImportRow(
+                    row=row_number,
+                    status="invalid",
+                    name=data.get("name") if isinstance(data, dict) else None,
+                    error=str(e.errors(include_url=False)),
+                )
+            )
+            continue
+        candidates.append((row_number, product))
+
+    names = [product.name for _, product in candidates]
+    existing = set(
+        session.exec(select(Product.name).where(Product.name.in_(names))).all()
+    )
+
+    now = datetime.utcnow()
+    rows = []
+    pending = []
+    for row_number, product in candidates:
+        if product.name in existing or product.name in seen_names:
+            if log_sampler.allow("products.import.duplicate"):
+                logger.warning(
+                    "Import row {} duplicates product '{}'", row_number, product.name
+                )
+            results.append(
+                ProductImportRow(
+                    row=row_number,
+                    status="duplicate",
+                    name=product.name,
+                    error=f"Product '{product.name}' already exists",
+                )
+            )
+            continue
+        seen_names.add(product.name)
+        rows.append({**product.model_dump(), "created_at": now, "updated_at": now})
+        pending.append((row_number, product.name))
+
+    if rows:
+        try:
+            inserted = session.execute(
+                insert(Product).returning(Product.id, Product.name), rows
+            )
+            ids = {name: product_id for product_id, name in inserted}
+            version = bump_product_version(session)
+            session.commit()
+            product_cache.written(version, ids.values(), membership_changed=True)
+            category_index.invalidate()
+        except Exception as e:
+            session.rollback()
+            logger.error("Failed to import {} products: {}", len(rows), e)
+            for row_number, name in pending:
+                seen_names.discard(name)
+                results.append(
+                    ProductImportRow(
+                        row=row_number,
+                        status="failed",
+                        name=name,
+                        error="Failed to insert product",
+                    )
+                )
+        else:
+            results.extend(
+                ProductImportRow(
+                    row=row_number, status="created", name=name, id=ids[name]
+                )
+                for row_number, name in pending
+            )
+
+    results.sort(key=lambda result: result.row)
+    created = sum(result.status == "created" for result in results)
+    logger.info("Imported chunk of {} products, {} created", len(records), created)
+    return results
+
+
+def import_products(import_request):
+    session = import_request["session"]
+    records = import_request["records"]
+    seen_names = import_request["seen_names"]
+    return import_product_chunk(session, records, seen_names)
+
+
+def category_change(old, data: dict):
+    """Category index change of a product row ``old`` updated with ``data``."""
+    stock = data.get("stock_quantity", old.stock_quantity)
+    out_of_stock = data.get("out_of_stock", old.out_of_stock)
+    return (
+        old.category,
+        not old.out_of_stock and old.stock_quantity > 0,
+        data.get("category", old.category),
+        not out_of_stock and stock > 0,
+    )
+
+
+def bulk_update_product_rows(session, updates, partial):
+    """Apply many product updates as grouped UPDATE statements.
+
+    Updates setting the same columns are sent as one executemany UPDATE,
+    all inside one transaction. Without ``partial`` any missing id or failed
+    group rolls everything back; with it the rest is still applied and the
+    report lists what was skipped.
+    """
+    now = datetime.utcnow()
+
+    # Later entries for the same id win, as separate PATCH calls would.
+    changes = {}
+    for product_update in updates:
+        data = product_update.model_dump(exclude_unset=True, exclude={"id"})
+        changes.setdefault(product_update.id, {}).update(data)
+
+    # Every product column is NOT NULL; an explicit null can never apply.
+    nulls = {}
+    for product_id, data in changes.items():
+        columns = [column for column, value in data.items() if value is None]
+        if columns:
+            nulls[product_id] = columns
+    if nulls and not partial:
+        logger.warning("Bulk update rejected, null values for products {}", nulls)
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "Columns cannot be null", "invalid": sorted(nulls)},
+        )
+
+    # Current category and stock, to move the category index counts.
+    current = {
+        row.id: row
+        for row in session.exec(
+            select(
+                Product.id,
+                Product.category,
+                Product.stock_quantity,
+                Product.out_of_stock,
+            ).where(Product.id.in_(changes))
+        ).all()
+    }
+    existing = set(current)
+    report = ProductBulkUpdateReport()
+    report.missing = sorted(set(changes) - existing)
+    if report.missing and not partial:
+        logger.warning("Bulk update rejected, missing products {}", report.missing)
+        raise HTTPException(
+            status_code=404,
+            detail={"message": "Products not found", "missing": report.missing},
+        )
+    report.failed.extend(product_id for product_id in nulls if product_id in existing)
+
+    groups = {}
+    for product_id in sorted(existing - set(nulls)):
+        data = changes[product_id]
+        if not data:
+            continue
+        data.setdefault("updated_at", now)
+        if "stock_quantity" in data and "out_of_stock" not in data:
+            data["out_of_stock"] = data["stock_quantity"] <= 0
+        groups.setdefault(frozenset(data), []).append({"id": product_id, **data})
+
+    updated = []
+    try:
+        for rows in groups.values():
+            try:
+                with session.begin_nested():
+                    session.execute(update(Product), rows)
+            except Exception as e:
+                if not partial:
+                    raise
+                logger.error("Bulk update of {} products failed: {}", len(rows), e)
+                report.failed.extend(row["id"] for row in rows)
+            else:
+                updated.extend(row["id"] for row in rows)
+
+        version = bump_product_version(session)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error("Failed to bulk update products: {}", e)
+        raise HTTPException(status_code=500, detail="Failed to update products")
+
+    product_cache.written(version, updated)
+    category_index.products_changed(
+        [
+            category_change(current[product_id], changes[product_id])
+            for product_id in updated
+        ],
+        version,
+    )
+
+    statuses = {product_id: "updated" for product_id in updated}
+    statuses.update({product_id: "missing" for product_id in report.missing})
+    statuses.update({product_id: "failed" for product_id in report.failed})
+    errors = {product_id: "Product not found" for product_id in report.missing}
+    errors.update(
+        {
+            product_id: f"{', '.join(columns)} cannot be null"
+            for product_id, columns in nulls.items()
+            if product_id in existing
+        }
+    )
+    report.updated = len(updated)
+    report.failed.sort()
+    report.rows = [
+        ProductBulkUpdateRow(
+            id=product_id,
+            status=statuses.get(product_id, "unchanged"),
+            error=errors.get(product_id),
+        )
+        for product_id in changes
+    ]
+    logger.success(
+        "Bulk updated {} products",
+        report.updated,
+        extra={"missing": len(report.missing), "failed": len(report.failed)},
+    )
+    return report
+
+
+def bulk_update_products(bulk_update):
+    session = bulk_update["session"]
+    updates = bulk_update["bulk_update"]
+    partial = bulk_update["partial"]
+    return bulk_update_product_rows(session, updates, partial)
@@ -0,0 +1,195 @@
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from .logging_config import app_logger as logger
+
+# Opt-in: engines are only instrumented and responses only carry the
+# summary header when this is set.
+QUERY_PROFILER_ENABLED = os.getenv("QUERY_PROFILER_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# A statement shape executed this many times in one request is reported as
+# a likely N+1.
+QUERY_PROFILER_REPEAT_THRESHOLD = int(os.getenv("QUERY_PROFILER_REPEAT_THRESHOLD", "5"))
+QUERY_PROFILER_SLOWEST = int(os.getenv("QUERY_PROFILER_SLOWEST", "3"))
+
+QUERY_PROFILE_HEADER = "X-Query-Profile"
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_POSTCOMPILE = re.compile(r"\(\s*__\[POSTCOMPILE_\w+\]\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize ``statement`` so repeated queries compare equal.
+
+    Whitespace is collapsed and expanded IN lists are folded to a single
+    placeholder, so ``IN (?, ?)`` and ``IN (?, ?, ?)`` are the same shape.
+    """
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _POSTCOMPILE.sub("(?)", shape)
+    return _IN_LIST.sub("(?)", shape)
+
+
+class QueryProfile:
+    """Queries executed while handling one request (or one test)."""
+
+    def __init__(
+        self,
+        repeat_threshold: int = QUERY_PROFILER_REPEAT_THRESHOLD,
+        slowest: int = QUERY_PROFILER_SLOWEST,
+    ):
+        self.repeat_threshold = repeat_threshold
+        self.slowest_count = slowest
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter[str] = Counter()
+        self.slowest: list[tuple[float, str]] = []
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.total_time += duration
+        self.shapes[statement_shape(statement)] += 1
+        if self.slowest_count:
+            self.slowest.append((duration, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[self.slowest_count :]
+
+    def repeated(self) -> dict[str, int]:
+        """Statement shapes executed at least ``repeat_threshold`` times."""
+        return {
+            shape: count
+            for shape, count in self.shapes.most_common()
+            if count >= self.repeat_threshold
+        }
+
+    def summary(self) -> dict:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.total_time * 1000, 2),
+            "repeated": self.repeated(),
+            "slowest": [
+                {"ms": round(duration * 1000, 2), "statement": statement}
+                for duration, statement in self.slowest
+            ],
+        }
+
+    def header_value(self) -> str:
+        repeated = self.repeated()
+        return (
+            f"queries={self.count}; db_ms={self.total_time * 1000:.2f}; "
+            f"repeated={len(repeated)}; max_repeat={max(repeated.values(), default=0)}"
+        )
+
+
+_current_profile: ContextVar[QueryProfile | None] = ContextVar(
+    "query_profile", default=None
+)
+
+
+def current_profile() -> QueryProfile | None:
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_queries(**kwargs):
+    """Collect the queries run in this context (and its threadpool calls)."""
+    profile = QueryProfile(**kwargs)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+class EngineInstrumentation:
+    """Cursor event listeners timing every statement on a sync engine.
+
+    Statements go to ``profile`` when one is given, otherwise to the profile
+    of the current context, if any. Use ``remove`` to detach.
+    """
+
+    def __init__(self, engine, profile: QueryProfile | None = None):
+        self.engine = engine
+        self.profile = profile
+        self._listeners = [
+            ("before_cursor_execute", self.before_cursor_execute),
+            ("after_cursor_execute", self.after_cursor_execute),
+            ("handle_error", self.handle_error),
+        ]
+        for name, listener in self._listeners:
+            event.listen(engine, name, listener)
+
+    def remove(self):
+        for name, listener in self._listeners:
+            event.remove(self.engine, name, listener)
+
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_profiler_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        duration = time.perf_counter() - conn.info["query_profiler_start"].pop()
+        profile = self.profile or current_profile()
+        if profile is not None:
+            profile.record(statement, duration)
+
+    def handle_error(self, exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_profiler_start"):
+            conn.info["query_profiler_start"].pop()
+
+
+def instrument_engine(engine, profile: QueryProfile | None = None):
+    """Time statements on ``engine``; accepts sync or async engines."""
+    return EngineInstrumentation(getattr(engine, "sync_engine", engine), profile)
+
+
+class QueryProfilerMiddleware:
+    """Profile the queries of each request.
+
+    The response gets an ``X-Query-Profile`` summary header covering the
+    queries run before the response started (streamed bodies query later),
+    and requests repeating a statement shape past the threshold log a
+    warning with the offending statements.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile_queries() as profile:
+
+            async def send_with_profile(message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers[QUERY_PROFILE_HEADER] = profile.header_value()
+                await send(message)
+
+            await self.app(scope, receive, send_with_profile)
+
+        repeated = profile.repeated()
+        if repeated:
+            logger.warning(
+                "Possible N+1 in {} {}: {} queries, repeated {}",
+                scope["method"],
+                scope["path"],
+                profile.count,
+                repeated,
+            )
@@ -0,0 +1,202 @@
+import argparse
+import importlib
+from datetime import date
+from enum import Enum
+
+from sqlalchemy import delete, func, insert, literal, true, update
+from sqlmodel import Session, select
+
+from app.model import Order, OrderDetail, Product, SalesReportRow, SalesRollup
+from .logging_config import app_logger as logger
+
+# Statuses left out of reports unless asked for explicitly.
+EXCLUDED_STATUSES = ("cancelled",)
+
+# Dialect modules providing an upserting ``insert()``: ``on_conflict_do_update``
+# on SQLite and PostgreSQL, ``on_duplicate_key_update`` on MySQL. Imported on
+# first use: loading the PostgreSQL dialect adds ~40 ms to every worker start.
+UPSERT_DIALECTS = {
+    "sqlite": "sqlalchemy.dialects.sqlite",
+    "postgresql": "sqlalchemy.dialects.postgresql",
+    "mysql": "sqlalchemy.dialects.mysql",
+}
+ROLLUP_KEY = ["day", "product_id", "status"]
+ROLLUP_TOTALS = ["units", "revenue", "lines"]
+
+
+class SalesGrouping(Enum):
+    DAY = "day"
+    PRODUCT = "product"
+    CATEGORY = "category"
+
+
+def rollup_rows(where, sign: int = 1, status=None):
+    """Per (day, product, status) totals of the order details matching ``where``.
+
+    ``sign=-1`` negates the totals, to take orders back out of the rollup;
+    ``status`` overrides the orders' own status.
+    """
+    return (
+        select(
+            Order.order_date.label("day"),
+            OrderDetail.product_id,
+            (Order.status if status is None else literal(status)).label("status"),
+            (func.sum(OrderDetail.quantity) * sign).label("units"),
+            (func.sum(OrderDetail.subtotal) * sign).label("revenue"),
+            (func.count() * sign).label("lines"),
+        )
+        .join(Order, Order.id == OrderDetail.order_id)
+        .where(where)
+        .group_by(Order.order_date, OrderDetail.product_id, Order.status)
+    )
+
+
+def added_totals(new) -> dict:
+    """SET clause adding the totals in ``new`` to the stored row."""
+    return {name: SalesRollup.__table__.c[name] + new[name] for name in ROLLUP_TOTALS}
+
+
+def merge_rollup_rows(session, rows):
+    """Upsert ``rows`` one at a time, for backends without an upsert.
+
+    Runs inside the caller's transaction like the upsert it replaces.
+    """
+    table = SalesRollup.__table__
+    for row in session.execute(rows).mappings().all():
+        key = [table.c[name] == row[name] for name in ROLLUP_KEY]
+        updated = session.execute(
+            update(table).where(*key).values(added_totals(row))
+        ).rowcount
+        if not updated:
+            session.execute(insert(table).values(**row))
+
+
+def add_to_rollup(session, where, sign: int = 1, status=None):
+    """Fold the details matching ``where`` into ``sales_rollup``.
+
+    One INSERT ... SELECT with the dialect's upsert clause, run in the
+    caller's transaction so the rollup commits or rolls back with the order
+    write. Other backends update, then insert, one rollup row at a time.
+    """
+    rows = rollup_rows(where, sign, status)
+    name = session.get_bind().dialect.name
+    dialect = UPSERT_DIALECTS.get(name)
+    if dialect is None:
+        merge_rollup_rows(session, rows)
+    else:
+        statement = (
+            importlib.import_module(dialect)
+            .insert(SalesRollup)
+            .from_select(ROLLUP_KEY + ROLLUP_TOTALS, rows)
+        )
+        if name == "mysql":
+            statement = statement.on_duplicate_key_update(
+                added_totals(statement.inserted)
+            )
+        else:
+            statement = statement.on_conflict_do_update(
+                index_elements=ROLLUP_KEY, set_=added_totals(statement.excluded)
+            )
+        session.execute(statement)
+    if sign < 0:
+        session.execute(delete(SalesRollup).where(SalesRollup.lines <= 0))
+
+
+def record_order_batch(session, order_batch_id: int):
+    add_to_rollup(session, Order.order_batch_id == order_batch_id)
+
+
+def remove_orders(session, order_ids):
+    add_to_rollup(session, Order.id.in_(order_ids), sign=-1)
+
+
+def change_order_status(session, order_id: int, new_status: str):
+    """Move an order's totals from its current status to ``new_status``.
+
+    Call before the new status is set on the order, so the totals are
+    taken out under the status they were recorded with.
+    """
+    add_to_rollup(session, Order.id == order_id, sign=-1)
+    add_to_rollup(session, Order.id == order_id, status=new_status)
+
+
+def fill_sales_rollup(connection):
+    """Replace ``sales_rollup`` with totals recomputed from ``order_details``.
+
+    Takes a session or a connection and leaves committing to the caller.
+    """
+    connection.execute(delete(SalesRollup))
+    connection.execute(
+        SalesRollup.__table__.insert().from_select(
+            ROLLUP_KEY + ROLLUP_TOTALS, rollup_rows(true())
+        )
+    )
+
+
+def rebuild_sales_rollup(session) -> int:
+    """Recompute ``sales_rollup`` from ``order_details`` with set-based SQL."""
+    fill_sales_rollup(session)
+    session.commit()
+    rows = session.exec(select(func.count()).select_from(SalesRollup)).one()
+    logger.info("Sales rollup rebuilt with {} rows", rows)
+    return rows
+
+
+def sales_report(
+    session,
+    group_by: SalesGrouping = SalesGrouping.DAY,
+    start: date | None = None,
+    end: date | None = None,
+    statuses: list[str] | None = None,
+) -> list[SalesReportRow]:
+    """Units, revenue and order lines per day, product or category."""
+    if group_by == SalesGrouping.CATEGORY:
+        key = Product.category
+    elif group_by == SalesGrouping.PRODUCT:
+        key = SalesRollup.product_id
+    else:
+        key = SalesRollup.day
+
+    statement = select(
+        key,
+        func.sum(SalesRollup.units),
+        func.sum(SalesRollup.revenue),
+        func.sum(SalesRollup.lines),
+    )
+    if group_by == SalesGrouping.CATEGORY:
+        statement = statement.join(Product, Product.id == SalesRollup.product_id)
+    if start is not None:
+        statement = statement.where(SalesRollup.day >= start)
+    if end is not None:
+        statement = statement.where(SalesRollup.day <= end)
+    if statuses:
+        statement = statement.where(SalesRollup.status.in_(statuses))
+    else:
+        statement = statement.where(SalesRollup.status.not_in(EXCLUDED_STATUSES))
+
+    rows = session.exec(statement.group_by(key).order_by(key)).all()
+    return [
+        SalesReportRow(
+            key=str(value),
+            units=units,
+            revenue=round(revenue, 2),
+            lines=lines,
+        )
+        for value, units, revenue, lines in rows
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sales rollup maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+
+    from app.database import engine
+
+    with Session(engine) as session:
+        rows = rebuild_sales_rollup(session)
+    print(f"Rebuilt sales_rollup: {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
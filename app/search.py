@@ -0,0 +1,280 @@
+import os
+import re
+
+from sqlalchemy import DDL, Column, Integer, MetaData, String, Table, event
+from sqlalchemy import case, func, literal, null, or_, text, tuple_, union_all
+from sqlmodel import select
+
+from app.model import Product
+from app.pagination import decode_cursor_payload, encode_cursor, paginate
+from .logging_config import app_logger as logger
+
+SEARCH_TABLE = "product_fts"
+NAME_SEARCH_TABLE = "product_name_fts"
+# Indexed columns of each FTS5 table. The name-only table serves the name
+# match tier without walking products that only match on category.
+SEARCH_INDEXES = {
+    SEARCH_TABLE: ["name", "category"],
+    NAME_SEARCH_TABLE: ["name"],
+}
+# Prefix indexes up to 10 characters: a prefix term longer than the
+# longest one is expanded by merging the doclist of every matching term.
+SEARCH_PREFIXES = "2 3 4 5 6 7 8 9 10"
+# Each tier of a text search considers only its newest SEARCH_RANK_WINDOW
+# matches (after filters), so the work per search is bounded however many
+# products match a broad term like "pen".
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "100"))
+
+
+def search_index_ddl(table: str, columns: list[str]) -> list[str]:
+    """External-content FTS5 table over ``columns`` of product.
+
+    The triggers keep it in step with every write path, including the
+    executemany imports and bulk updates; stock and price updates do not
+    touch it.
+    """
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+            {names},
+            content='product', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='{SEARCH_PREFIXES}'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON product
+        BEGIN
+            INSERT INTO {table}(rowid, {names}) VALUES (new.id, {new});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON product
+        BEGIN
+            INSERT INTO {table}({table}, rowid, {names})
+            VALUES ('delete', old.id, {old});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_update
+        AFTER UPDATE OF {names} ON product
+        BEGIN
+            INSERT INTO {table}({table}, rowid, {names})
+            VALUES ('delete', old.id, {old});
+            INSERT INTO {table}(rowid, {names}) VALUES (new.id, {new});
+        END
+        """,
+    ]
+
+
+SQLITE_SEARCH_DDL = [
+    statement
+    for table, columns in SEARCH_INDEXES.items()
+    for statement in search_index_ddl(table, columns)
+]
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(
+        Product.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite"),
+    )
+for table in SEARCH_INDEXES:
+    event.listen(
+        Product.__table__,
+        "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {table}").execute_if(dialect="sqlite"),
+    )
+
+
+def search_table(table: str) -> Table:
+    """Query-side handle on an FTS table.
+
+    Kept out of SQLModel.metadata so create_all does not try to create it
+    as a regular table.
+    """
+    return Table(
+        table,
+        MetaData(),
+        Column("rowid", Integer, primary_key=True),
+        *(Column(column, String) for column in SEARCH_INDEXES[table]),
+        # Hidden column named after the table, the left-hand side of MATCH.
+        Column(table),
+    )
+
+
+product_fts = search_table(SEARCH_TABLE)
+product_name_fts = search_table(NAME_SEARCH_TABLE)
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def search_terms(query: str) -> list[str]:
+    return TOKEN_PATTERN.findall(query or "")
+
+
+def match_expression(terms: list[str]) -> str:
+    """FTS5 query matching every term, the last one as a prefix.
+
+    Terms are quoted so user input is never parsed as FTS5 syntax, and the
+    trailing prefix match lets the endpoint serve search-as-you-type.
+    """
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def has_search_index(session) -> bool:
+    return session.get_bind().dialect.name == "sqlite"
+
+
+def filter_products(
+    statement,
+    category: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    out_of_stock: bool | None = None,
+):
+    """Apply the indexed product filters.
+
+    Served by the (category, out_of_stock, unit_price) index: equality
+    columns first, the price range last.
+    """
+    if category is not None:
+        statement = statement.where(Product.category == category)
+    if out_of_stock is not None:
+        statement = statement.where(Product.out_of_stock == out_of_stock)
+    if min_price is not None:
+        statement = statement.where(Product.unit_price >= min_price)
+    if max_price is not None:
+        statement = statement.where(Product.unit_price <= max_price)
+    return statement
+
+
+def newest_matches(index, match: str, filters: dict, window: int):
+    """Ids of the newest ``window`` filtered products ``index`` matches.
+
+    FTS5 walks the matches newest first and the LIMIT stops it. Filters
+    are checked per match through the product primary key, so the index
+    drives the plan even when a filter column is indexed.
+    """
+    statement = select(index.c.rowid.label("id")).where(
+        index.c[index.name].op("MATCH")(match)
+    )
+    if any(value is not None for value in filters.values()):
+        statement = statement.where(
+            filter_products(
+                select(Product.id).where(Product.id == index.c.rowid), **filters
+            ).exists()
+        )
+    return statement.order_by(index.c.rowid.desc()).limit(window)
+
+
+def search_page(rows, limit: int) -> tuple[list[Product], str | None]:
+    """Products of a page of search rows and the cursor of the next page.
+
+    The cursor is ``None`` unless the page came back full.
+    """
+    products = [product for product, _, _ in rows]
+    if not rows or len(rows) < limit:
+        return products, None
+    product, tier, rank = rows[-1]
+    if tier is None:
+        return products, encode_cursor(product.id)
+    return products, encode_cursor(product.id, tier=tier, rank=rank)
+
+
+def search_statement(
+    session,
+    query: str | None = None,
+    category: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    out_of_stock: bool | None = None,
+    offset: int = 0,
+    limit: int = 20,
+    cursor: str | None = None,
+):
+    """SELECT for one page of ``(product, tier, rank)`` rows.
+
+    Text matches come in two tiers: the newest ``SEARCH_RANK_WINDOW``
+    filtered name matches, then those of the newest ``SEARCH_RANK_WINDOW``
+    filtered matches that match on category alone or across both fields.
+    Every term hits a field once in practice, where bm25 orders by field
+    length alone, so a tier is ranked by the length of its field without
+    bm25's pass over each term's full doclist. The candidates do not
+    depend on the page, which is taken by offset or after a (tier, rank,
+    id) cursor. Without a query the filtered products are listed by id and
+    can be paged with a cursor, as ``GET /products/`` is; tier and rank
+    are then ``None``. Backends without FTS5 fall back to a
+    case-insensitive LIKE per term, ordered by id.
+    """
+    filters = {
+        "category": category,
+        "min_price": min_price,
+        "max_price": max_price,
+        "out_of_stock": out_of_stock,
+    }
+    terms = search_terms(query)
+    unranked = filter_products(
+        select(Product, null().label("tier"), null().label("rank")), **filters
+    )
+    if not terms:
+        return paginate(unranked, Product.id, offset, limit, cursor)
+
+    if not has_search_index(session):
+        for term in terms:
+            pattern = f"%{term}%"
+            unranked = unranked.where(
+                or_(Product.name.ilike(pattern), Product.category.ilike(pattern))
+            )
+        return paginate(unranked, Product.id, offset, limit, cursor)
+
+    match = match_expression(terms)
+    name_matches = newest_matches(
+        product_name_fts, match, filters, SEARCH_RANK_WINDOW
+    ).subquery("name_matches")
+    matches = newest_matches(product_fts, match, filters, SEARCH_RANK_WINDOW).cte(
+        "matches"
+    )
+    # Name matches among the candidates: no older than the oldest of them.
+    names_in_window = select(product_name_fts.c.rowid).where(
+        product_name_fts.c[NAME_SEARCH_TABLE].op("MATCH")(match),
+        product_name_fts.c.rowid >= select(func.min(matches.c.id)).scalar_subquery(),
+    )
+    hits = union_all(
+        select(name_matches.c.id, literal(0).label("tier")),
+        select(matches.c.id, literal(1)).where(matches.c.id.not_in(names_in_window)),
+    ).subquery("hits")
+    rank = case(
+        (hits.c.tier == 0, func.length(Product.name)),
+        else_=func.length(Product.category),
+    )
+    statement = (
+        select(Product, hits.c.tier, rank.label("rank"))
+        .join(hits, hits.c.id == Product.id)
+        .order_by(hits.c.tier, rank, Product.id)
+    )
+    if cursor is not None:
+        position = decode_cursor_payload(cursor, tier=int, rank=int)
+        after = tuple_(position["tier"], position["rank"], position["id"])
+        return statement.where(tuple_(hits.c.tier, rank, Product.id) > after).limit(
+            limit
+        )
+    return statement.offset(offset).limit(limit)
+
+
+def rebuild_search_tables(connection):
+    for table in SEARCH_INDEXES:
+        connection.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+
+
+def rebuild_search_index(session):
+    """Re-index every product, e.g. after loading rows with triggers off."""
+    if not has_search_index(session):
+        return
+    rebuild_search_tables(session.connection())
+    session.commit()
+    logger.info("Product search index rebuilt")
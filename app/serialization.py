@@ -0,0 +1,136 @@
+import json
+import os
+import types
+import typing
+from datetime import date
+from functools import lru_cache
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised without the ``fast`` extra
+    orjson = None
+
+# Render list and batch responses straight from ORM rows instead of letting
+# FastAPI validate them against the response model and encode them with the
+# stdlib encoder. The wire format is the same either way.
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Response headers set by the JSON response itself.
+_BODY_HEADERS = {b"content-length", b"content-type"}
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """Encode ``content`` as compact UTF-8 JSON, as FastAPI's JSONResponse does."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        default=_json_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _identity(value):
+    return value
+
+
+def _to_float(value):
+    return value if value is None else float(value)
+
+
+def _render_any(value):
+    # Untyped fields (e.g. ``OrderPublic.order_details: list``) are encoded
+    # by pydantic from the runtime type of each item; defer to it so the
+    # output stays identical.
+    return to_jsonable_python(value)
+
+
+def _converter(annotation):
+    origin = typing.get_origin(annotation)
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+
+    if origin in (list, tuple) or annotation in (list, tuple):
+        if not args or args[0] is typing.Any:
+            return _render_any
+        item = _converter(args[0])
+        if item is _identity:
+            return list
+        return lambda values: [item(value) for value in values]
+    if origin in (typing.Union, types.UnionType):
+        if len(args) == 1:
+            convert = _converter(args[0])
+            return lambda value: value if value is None else convert(value)
+        return _render_any
+    if annotation is float:
+        return _to_float
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return renderer(annotation)
+    if annotation is typing.Any:
+        return _render_any
+    return _identity
+
+
+@lru_cache(maxsize=None)
+def renderer(model: type[BaseModel]):
+    """Return a function turning an object into the JSON-ready dict of ``model``.
+
+    Attributes are read in the model's field order and converted the way
+    the model's serializer would (floats as floats, nested models
+    recursively, dates left to the encoder), without building and
+    validating an instance of ``model``.
+    """
+    # Resolves string annotations such as ``list["OrderResponse"]``.
+    hints = typing.get_type_hints(model)
+    converters = [
+        (
+            name,
+            field.serialization_alias or field.alias or name,
+            _converter(hints.get(name, field.annotation)),
+        )
+        for name, field in model.model_fields.items()
+        if not field.exclude
+    ]
+
+    def render(obj):
+        return {key: convert(getattr(obj, name)) for name, key, convert in converters}
+
+    return render
+
+
+def render_json(content, response_model, response: Response | None = None):
+    """Render ``content`` as ``response_model`` when fast serialization is on.
+
+    Returns a ready JSON ``Response`` carrying any headers already set on
+    ``response``; with fast serialization off ``content`` is returned
+    unchanged for FastAPI to validate and encode.
+    """
+    if not FAST_SERIALIZATION:
+        return content
+
+    body = dumps(_converter(response_model)(content))
+    rendered = Response(body, media_type="application/json")
+    if response is not None:
+        rendered.raw_headers.extend(
+            (key, value)
+            for key, value in response.raw_headers
+            if key not in _BODY_HEADERS
+        )
+        if response.status_code is not None:
+            rendered.status_code = response.status_code
+    return rendered
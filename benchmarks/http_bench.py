@@ -0,0 +1,373 @@
+"""HTTP load benchmark.
+
+Replays a mixed workload (order batches built from ``sample_requests.json``,
+product reads, listings and categories) at a fixed concurrency and reports
+throughput and p50/p95/p99 latency per route as JSON, so runs can be diffed
+between commits::
+
+    python -m benchmarks.http_bench --requests 2000 --concurrency 16
+    python -m benchmarks.http_bench --target uvicorn --output bench.json
+    python -m benchmarks.http_bench --url http://localhost:8000 --token ...
+
+The default in-process target drives the ASGI app directly; ``uvicorn``
+starts a local server. Both use a fresh SQLite database and a stub auth
+service, and give every product enough stock that order batches never fail
+for lack of it.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_ORDERS = ROOT / "sample_requests.json"
+BENCH_TOKEN = "bench-token"
+PRODUCT_COUNT = 18
+
+WORKLOADS = {
+    "mixed": {
+        "order_batch": 1,
+        "product_read": 6,
+        "product_list": 3,
+        "order_list": 1,
+        "categories": 1,
+    },
+    "reads": {"product_read": 6, "product_list": 3, "order_list": 1, "categories": 1},
+    "orders": {"order_batch": 1},
+}
+
+
+@dataclass
+class Call:
+    route: str
+    method: str
+    url: str
+    json: object = None
+
+
+@dataclass
+class Result:
+    route: str
+    status: int
+    latency: float
+
+
+class Workload:
+    """Random stream of calls drawn with the given weights."""
+
+    def __init__(self, weights: dict[str, int], orders: list[dict], batch_size: int):
+        self.weights = weights
+        self.orders = orders
+        self.batch_size = batch_size
+
+    def calls(self, rng: random.Random):
+        names = list(self.weights)
+        weights = [self.weights[name] for name in names]
+        while True:
+            yield getattr(self, rng.choices(names, weights)[0])(rng)
+
+    def order_batch(self, rng):
+        size = rng.randint(1, self.batch_size)
+        orders = [rng.choice(self.orders) for _ in range(size)]
+        return Call("POST /orders/", "POST", "/orders/", {"order_list": orders})
+
+    def product_read(self, rng):
+        product_id = rng.randint(1, PRODUCT_COUNT)
+        return Call("GET /products/{product_id}", "GET", f"/products/{product_id}")
+
+    def product_list(self, rng):
+        offset = rng.randrange(0, PRODUCT_COUNT, 5)
+        return Call("GET /products/", "GET", f"/products/?offset={offset}&limit=5")
+
+    def order_list(self, rng):
+        return Call("GET /orders/", "GET", "/orders/?limit=20")
+
+    def categories(self, rng):
+        return Call("GET /categories/", "GET", "/categories/?with_counts=true")
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    if value in WORKLOADS:
+        return WORKLOADS[value]
+    weights = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(Workload, name.strip()):
+            raise argparse.ArgumentTypeError(f"Unknown call type: {name}")
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+def load_orders(path: Path = SAMPLE_ORDERS) -> list[dict]:
+    return json.loads(path.read_text())
+
+
+async def run_calls(client, calls, total: int, concurrency: int, headers):
+    results = []
+
+    async def worker():
+        while len(results) < total:
+            call = next(calls)
+            start = time.perf_counter()
+            response = await client.request(
+                call.method, call.url, json=call.json, headers=headers
+            )
+            await response.aread()
+            results.append(
+                Result(call.route, response.status_code, time.perf_counter() - start)
+            )
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results[:total]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(values)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def summarize(results: list[Result], elapsed: float) -> dict:
+    def stats(group):
+        latencies = sorted(result.latency for result in group)
+        return {
+            "requests": len(group),
+            "errors": sum(result.status >= 400 for result in group),
+            "rps": round(len(group) / elapsed, 1) if elapsed else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+
+    routes = {}
+    for result in results:
+        routes.setdefault(result.route, []).append(result)
+
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "total": stats(results) if results else {},
+        "routes": {route: stats(group) for route, group in sorted(routes.items())},
+    }
+
+
+async def benchmark(client, workload, args, headers) -> dict:
+    rng = random.Random(args.seed)
+    calls = workload.calls(rng)
+    if args.warmup:
+        await run_calls(client, calls, args.warmup, args.concurrency, headers)
+
+    start = time.perf_counter()
+    results = await run_calls(client, calls, args.requests, args.concurrency, headers)
+    return summarize(results, time.perf_counter() - start)
+
+
+class StubAuthHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.headers.get("Authorization") == f"Bearer {BENCH_TOKEN}":
+            status, payload = 200, {
+                "id": 1,
+                "email": "bench@example.com",
+                "is_superuser": True,
+            }
+        else:
+            status, payload = 401, {"detail": "Invalid token"}
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@asynccontextmanager
+async def stub_auth_service():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAuthHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def bench_env(database_url: str, auth_url: str) -> dict[str, str]:
+    return {
+        "DATABASE_URL": database_url,
+        "AUTH_SERVICE_URL": auth_url,
+        "LOG_PROFILE": os.getenv("LOG_PROFILE", "production"),
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    }
+
+
+def restock(database_url: str):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE product SET stock_quantity = :stock, out_of_stock = 0"),
+            {"stock": 10**9},
+        )
+    engine.dispose()
+
+
+@asynccontextmanager
+async def in_process_client(env: dict[str, str]):
+    # The app reads its configuration at import time.
+    os.environ.update(env)
+    from app.app import app
+
+    async with app.router.lifespan_context(app):
+        restock(env["DATABASE_URL"])
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            yield client
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def uvicorn_client(env: dict[str, str], workers: int):
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.app:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env={**os.environ, **env},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/metrics")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            restock(env["DATABASE_URL"])
+            yield client
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main_async(args) -> dict:
+    workload = Workload(args.mix, load_orders(args.orders), args.batch_size)
+    headers = {"Authorization": f"Bearer {args.token}"}
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+            report = await benchmark(client, workload, args, headers)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = f"sqlite:///{tmp}/bench.db"
+            async with stub_auth_service() as auth_url:
+                env = bench_env(database_url, auth_url)
+                if args.target == "uvicorn":
+                    client_context = uvicorn_client(env, args.workers)
+                else:
+                    client_context = in_process_client(env)
+                async with client_context as client:
+                    report = await benchmark(client, workload, args, headers)
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "target": args.url or args.target,
+            "mix": args.mix,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "batch_size": args.batch_size,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        **report,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--target", choices=["inprocess", "uvicorn"], default="inprocess"
+    )
+    parser.add_argument("--url", help="benchmark a running server instead")
+    parser.add_argument("--token", default=BENCH_TOKEN)
+    parser.add_argument("--mix", type=parse_mix, default="mixed")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--orders", type=Path, default=SAMPLE_ORDERS)
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
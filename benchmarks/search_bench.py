@@ -0,0 +1,109 @@
+"""Product search benchmark.
+
+Loads a synthetic catalog into a temporary SQLite database and times
+``search_statement`` for a set of text and filter queries, printing the
+median and p95 latency per query as JSON. Exits non-zero when a query's
+median misses ``--target-ms``::
+
+    python -m benchmarks.search_bench --products 300000 --repeat 50 --target-ms 10
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel
+
+from app.database import create_db_engine
+from app.model import Product
+from app.search import search_statement
+
+ADJECTIVES = ["Blue", "Red", "Green", "Black", "Large", "Small", "Premium", "Basic"]
+ITEMS = ["Pen", "Pencil", "Notebook", "Stapler", "Folder", "Lamp", "Chair", "Desk"]
+CATEGORIES = ["Stationery", "Office", "Furniture", "Electronics", "Art", "Storage"]
+
+QUERIES = [
+    {"query": "pen"},
+    {"query": "blue note"},
+    {"query": "premium lamp", "category": "Furniture"},
+    {"query": "chair", "min_price": 10, "max_price": 50, "out_of_stock": False},
+    {"query": "12345"},
+    {"query": "pen", "offset": 980},
+    {"category": "Office", "min_price": 5, "max_price": 6},
+]
+
+
+def catalog_rows(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    for idx in range(count):
+        stock = rng.randint(0, 200)
+        yield {
+            "name": f"{rng.choice(ADJECTIVES)} {rng.choice(ITEMS)} {idx}",
+            "category": rng.choice(CATEGORIES),
+            "unit_price": round(rng.uniform(0.5, 200), 2),
+            "stock_quantity": stock,
+            "out_of_stock": stock == 0,
+        }
+
+
+def load_catalog(session, count: int, chunk_size: int = 10_000):
+    rows = list(catalog_rows(count))
+    for start in range(0, count, chunk_size):
+        session.execute(insert(Product), rows[start : start + chunk_size])
+    session.commit()
+
+
+def time_query(session, params: dict, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = session.exec(search_statement(session, limit=20, **params)).all()
+        timings.append(time.perf_counter() - start)
+        session.expunge_all()
+    timings.sort()
+    return {
+        "params": params,
+        "rows": len(rows),
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def missed_targets(results: list[dict], target_ms: float) -> list[dict]:
+    return [result["params"] for result in results if result["median_ms"] > target_ms]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=300_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--target-ms", type=float, default=10.0, help="median latency allowed"
+    )
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{tmp}/bench.db")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            load_catalog(session, args.products)
+            results = [time_query(session, params, args.repeat) for params in QUERIES]
+        engine.dispose()
+
+    failed = missed_targets(results, args.target_ms)
+    print(
+        json.dumps(
+            {"queries": results, "target_ms": args.target_ms, "failed": failed},
+            indent=2,
+        )
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Response serialization benchmark.
+
+Times FastAPI's validate-then-encode path against ``render_json`` for a
+page of orders with their details and for an order batch, on the same ORM
+objects, and prints the results as JSON::
+
+    python -m benchmarks.serialization_bench --orders 100 --repeat 50
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlmodel import Session, SQLModel, select
+
+from app.database import create_db_engine
+from app.db_tools import seed_products
+from app.model import (
+    Order,
+    OrderBatchCreate,
+    OrderBatchResponse,
+    OrderCreate,
+    OrderDetailRequest,
+    OrderPublic,
+    Product,
+)
+from app.orders import create_order_batch, order_details_loader
+from app.serialization import render_json
+
+
+def fastapi_render(content, field) -> bytes:
+    serialized = asyncio.run(serialize_response(field=field, response_content=content))
+    return JSONResponse(serialized).body
+
+
+def fast_render(content, response_model) -> bytes:
+    return render_json(content, response_model).body
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def make_batch(order_count: int, items_per_order: int) -> OrderBatchCreate:
+    return OrderBatchCreate(
+        order_list=[
+            OrderCreate(
+                customer_name=f"Customer {idx}",
+                customer_email=f"customer{idx}@example.com",
+                items=[
+                    OrderDetailRequest(product_id=(idx + item) % 18 + 1, quantity=1)
+                    for item in range(items_per_order)
+                ],
+            )
+            for idx in range(order_count)
+        ]
+    )
+
+
+def compare(name, content, response_model, repeat: int) -> dict:
+    field = create_model_field("Response", response_model, mode="serialization")
+    assert fast_render(content, response_model) == fastapi_render(content, field)
+
+    fastapi_s = best_of(lambda: fastapi_render(content, field), repeat)
+    fast_s = best_of(lambda: fast_render(content, response_model), repeat)
+    return {
+        "case": name,
+        "fastapi_ms": round(fastapi_s * 1000, 3),
+        "fast_ms": round(fast_s * 1000, 3),
+        "speedup": round(fastapi_s / fast_s, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{tmp}/bench.db")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            seed_products(session)
+            for product in session.exec(select(Product)).all():
+                product.stock_quantity = 10**9
+            session.commit()
+
+            batch = create_order_batch(
+                {
+                    "orders_data": make_batch(args.orders, args.items),
+                    "session": session,
+                }
+            )
+            orders = session.exec(
+                select(Order).options(order_details_loader).limit(args.orders)
+            ).all()
+
+            results = [
+                compare("order page", orders, list[OrderPublic], args.repeat),
+                compare("order batch", batch, OrderBatchResponse, args.repeat),
+            ]
+        engine.dispose()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Worker cold start benchmark.
+
+Starts fresh worker processes that import the app and run its lifespan
+startup against a new database, a database bootstrapped from a template
+and an existing database already at the current schema version. Prints
+the median timings per scenario as JSON and exits non-zero when a warm
+scenario misses ``--target-ms``::
+
+    python -m benchmarks.startup_bench --runs 5 --target-ms 1500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.http_bench import bench_env
+
+SCENARIOS = ["new", "template", "persistent"]
+# Scenarios held to the target; creating a new schema is measured only.
+TARGET_SCENARIOS = ["template", "persistent"]
+
+
+def worker():
+    """Import the app and run its startup and shutdown, reporting timings."""
+    start = time.perf_counter()
+    from app.app import app
+
+    imported = time.perf_counter()
+
+    async def run_lifespan():
+        async with app.router.lifespan_context(app):
+            started = time.perf_counter()
+        return started
+
+    started = asyncio.run(run_lifespan())
+    print(
+        json.dumps(
+            {
+                "import_ms": (imported - start) * 1000,
+                "startup_ms": (started - imported) * 1000,
+            }
+        )
+    )
+
+
+def run_worker(env: dict[str, str]) -> dict:
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup_bench", "--worker"],
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings["process_ms"] = (time.perf_counter() - start) * 1000
+    timings["cold_start_ms"] = timings["import_ms"] + timings["startup_ms"]
+    return timings
+
+
+def scenario_env(scenario: str, tmp: Path, run: int, template: Path) -> dict:
+    database = tmp / f"{scenario}-{run}.db"
+    env = bench_env(f"sqlite:///{database}", "http://127.0.0.1:9")
+    if scenario == "template":
+        env["DB_TEMPLATE_PATH"] = str(template)
+    if scenario == "persistent":
+        # Left behind by a previous worker, as after a restart.
+        run_worker({**env, "DB_TEMPLATE_PATH": str(template)})
+    return env
+
+
+def summarize(runs: list[dict]) -> dict:
+    return {
+        key: round(statistics.median(run[key] for run in runs), 1)
+        for key in ["import_ms", "startup_ms", "cold_start_ms", "process_ms"]
+    }
+
+
+def missed_targets(report: dict, target_ms: float) -> list[str]:
+    return [
+        scenario
+        for scenario in TARGET_SCENARIOS
+        if report[scenario]["cold_start_ms"] > target_ms
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=1500.0,
+        help="median cold start (import + lifespan startup) allowed",
+    )
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        worker()
+        return 0
+
+    from app.db_tools import build_template
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        template = tmp / "template.db"
+        build_template(template)
+
+        report = {}
+        for scenario in SCENARIOS:
+            runs = [
+                run_worker(scenario_env(scenario, tmp, run, template))
+                for run in range(args.runs)
+            ]
+            report[scenario] = summarize(runs)
+
+    failed = missed_targets(report, args.target_ms)
+    report["target_ms"] = args.target_ms
+    report["failed"] = failed
+    print(json.dumps(report, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,84 @@
+// Reference diagram of the schema defined in app/model.py. The database is
+// created and upgraded by app/migrations.py (schema_version records the
+// applied migration).
+
 Table product {
   id serial [pk, increment]
   name varchar(255) [not null]
   category varchar(255) [not null]
-  created_at timestamp [default: `CURRENT_TIMESTAMP`]
-  updated_at timestamp [default: `CURRENT_TIMESTAMP`]
+  unit_price real [not null]
+  stock_quantity integer [not null]
+  out_of_stock boolean [not null]
+  type varchar [not null]
+  created_at timestamp [not null]
+  updated_at timestamp [not null]
+
+  indexes {
+    name [name: 'ix_product_name']
+    category [name: 'ix_product_category']
+    (category, out_of_stock, unit_price) [name: 'ix_product_category_stock_price']
+    unit_price [name: 'ix_product_unit_price']
+  }
+
+  Note: 'On SQLite, the FTS5 tables product_fts (name, category) and product_name_fts (name) are kept in sync by triggers'
 }
 
 Table order_batch {
   id serial [pk, increment]
-  created_at timestamp [default: `CURRENT_TIMESTAMP`]
+  created_at timestamp [not null]
+  type varchar [not null]
 }
 
 Table order {
   id serial [pk, increment]
   customer_name varchar(100) [not null]
   customer_email varchar(100) [not null]
-  order_date date
   status varchar(100) [not null]
-  created_at timestamp [default: `CURRENT_TIMESTAMP`]
+  order_date date [not null]
+  updated_at timestamp [not null]
+  total_amount real [not null]
+  order_batch_id integer [not null, ref: > order_batch.id]
+
+  indexes {
+    customer_email [name: 'ix_order_customer_email']
+    order_batch_id [name: 'ix_order_order_batch_id']
+  }
 }
 
 Table order_details {
   id serial [pk, increment]
-  product_id integer [ref: > product.id]
-  order_id integer [ref: > order.id]
-  quantity smallint [not null]
+  quantity integer [not null]
   unit_price real [not null]
   subtotal real [not null]
+  product_id integer [not null, ref: > product.id]
+  order_id integer [not null, ref: > order.id]
+
+  indexes {
+    order_id [name: 'ix_order_details_order_id']
+    product_id [name: 'ix_order_details_product_id']
+  }
 }
 
+Table cache_version {
+  name varchar(100) [pk]
+  version integer [not null]
+}
 
+Table sales_rollup {
+  day date [not null]
+  product_id integer [not null]
+  status varchar(100) [not null]
+  units integer [not null]
+  revenue real [not null]
+  lines integer [not null]
 
+  indexes {
+    (day, product_id, status) [pk]
+  }
+}
 
+Table schema_version {
+  version integer [pk]
+  name varchar(255) [not null]
+  applied_at timestamp [not null]
+}
@@ -15,6 +15,7 @@ setup(
         "sqlmodel>=0.0.24",
         "pydantic>=2.11.0,<3.0",
         "python-dotenv>=1.0.0",
+        "httpx>=0.28.0",
     ],
     # Optional dependencies
     extras_require={
@@ -23,11 +24,19 @@ setup(
             "black",
             "flake8",
             "selenium>=4.35.0",
-            "httpx>=0.28.0",
         ],
         "monitoring": [
             "sentry-sdk>=2.33.0",
         ],
+        "async": [
+            "aiosqlite>=0.20.0",
+        ],
+        "jwt": [
+            "PyJWT[crypto]>=2.8.0",
+        ],
+        "fast": [
+            "orjson>=3.8.0",
+        ],
     },
     python_requires=">=3.8",
 )
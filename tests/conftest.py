@@ -0,0 +1,187 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.app import app, get_session
+from app.auth_client import User, get_current_user
+from app.categories import category_index
+from app.database import create_async_db_engine, create_db_engine
+from app.db_tools import seed_products
+from app.migrations import migrate
+from app.model import OrderBatchCreate, OrderCreate, OrderDetailRequest
+from app.orders import create_order_batch
+from app.product_cache import product_cache
+from app.query_profiler import QueryProfile, instrument_engine
+
+STUB_USERS = {
+    "valid-token": {"id": 1, "email": "user@example.com", "is_superuser": False},
+    "admin-token": {"id": 2, "email": "admin@example.com", "is_superuser": True},
+}
+# Tokens the stub answers with an upstream failure instead of a verdict.
+STUB_FAILURES = {"error-token": 500, "throttled-token": 429}
+
+
+class StubAuthHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.request_count += 1
+        self.server.peers.add(self.client_address)
+
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        user = STUB_USERS.get(token)
+        if token in STUB_FAILURES:
+            self._send(STUB_FAILURES[token], {"detail": "Upstream failure"})
+        elif self.path != "/users/me" or user is None:
+            self._send(401, {"detail": "Invalid token"})
+        else:
+            self._send(200, user)
+
+    def _send(self, status_code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_auth_server():
+    """Local auth service answering ``/users/me`` for the tokens in STUB_USERS."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAuthHandler)
+    server.request_count = 0
+    server.peers = set()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture
+def engine(database_url):
+    """SQLite engine on a fresh database file with the schema created."""
+    engine = create_db_engine(database_url)
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def async_engine(engine, database_url):
+    """Async engine on the same database file as ``engine``.
+
+    NullPool keeps connections from outliving the event loop of the
+    TestClient request that opened them.
+    """
+    pytest.importorskip("aiosqlite")
+    return create_async_db_engine(database_url, poolclass=NullPool)
+
+
+@pytest.fixture
+def session(engine):
+    """Session on the test database, seeded with the sample products."""
+    with Session(engine) as session:
+        seed_products(session)
+        category_index.invalidate()
+        product_cache.clear()
+        yield session
+
+
+@pytest.fixture
+def create_batch():
+    """Factory creating an order batch through ``create_order_batch``.
+
+    Takes one list of ``(product_id, quantity)`` items per order; customers
+    are numbered unless ``customer_name`` is given.
+    """
+
+    def create(session, *orders, customer_name=None):
+        orders_data = OrderBatchCreate(
+            order_list=[
+                OrderCreate(
+                    customer_name=customer_name or f"Customer {idx}",
+                    customer_email=f"customer{idx}@example.com",
+                    items=[
+                        OrderDetailRequest(product_id=product_id, quantity=quantity)
+                        for product_id, quantity in items
+                    ],
+                )
+                for idx, items in enumerate(orders)
+            ]
+        )
+        return create_order_batch({"orders_data": orders_data, "session": session})
+
+    return create
+
+
+@pytest.fixture(params=["sync", "async"])
+def client(request, session):
+    """TestClient for the app on the seeded test database.
+
+    Runs once with the sync session and once with an AsyncSession.
+    Authentication is replaced by a fixed user and the lifespan is not run.
+    """
+    if request.param == "async":
+        async_engine = request.getfixturevalue("async_engine")
+
+        async def get_async_session():
+            async with AsyncSession(async_engine, expire_on_commit=False) as s:
+                yield s
+
+        app.dependency_overrides[get_session] = get_async_session
+    else:
+        app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_current_user] = lambda: User(STUB_USERS["admin-token"])
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def query_counter(request, engine):
+    """List collecting every SQL statement executed on the test database."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = [engine]
+    if "async_engine" in request.fixturenames:
+        engines.append(request.getfixturevalue("async_engine").sync_engine)
+
+    for target in engines:
+        event.listen(target, "before_cursor_execute", record)
+    yield statements
+    for target in engines:
+        event.remove(target, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def query_profile(request, engine):
+    """QueryProfile recording every statement run on the test database."""
+    profile = QueryProfile()
+    targets = [engine]
+    if "async_engine" in request.fixturenames:
+        targets.append(request.getfixturevalue("async_engine"))
+
+    instrumentations = [instrument_engine(target, profile) for target in targets]
+    yield profile
+    for instrumentation in instrumentations:
+        instrumentation.remove()
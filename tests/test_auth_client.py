@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth_client import AuthClient, TokenCache, User
+
+
+def test_fetch_user_reuses_pooled_connection(stub_auth_server):
+    client = AuthClient(base_url=stub_auth_server.url, pool_size=2)
+
+    async def run():
+        client.start()
+        try:
+            return [await client.fetch_user("valid-token") for _ in range(5)]
+        finally:
+            await client.close()
+
+    users = asyncio.run(run())
+
+    assert [user.email for user in users] == ["user@example.com"] * 5
+    assert stub_auth_server.request_count == 5
+    # Keep-alive: every sequential call went over the same TCP connection.
+    assert len(stub_auth_server.peers) == 1
+
+
+def test_fetch_user_invalid_token(stub_auth_server):
+    client = AuthClient(base_url=stub_auth_server.url)
+
+    async def run():
+        try:
+            await client.fetch_user("bad-token")
+        finally:
+            await client.close()
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(run())
+    assert exc.value.status_code == 401
+
+
+def test_fetch_user_service_unavailable():
+    client = AuthClient(base_url="http://127.0.0.1:9", connect_timeout=0.5)
+
+    async def run():
+        try:
+            await client.fetch_user("valid-token")
+        finally:
+            await client.close()
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(run())
+    assert exc.value.status_code == 503
+
+
+def test_verify_token_serves_repeats_from_cache(stub_auth_server):
+    client = AuthClient(base_url=stub_auth_server.url)
+
+    async def run():
+        try:
+            return [await client.verify_token("valid-token") for _ in range(10)]
+        finally:
+            await client.close()
+
+    users = asyncio.run(run())
+
+    assert all(user is users[0] for user in users)
+    assert stub_auth_server.request_count == 1
+    assert client.cache.stats()["hits"] == 9
+    assert client.cache.stats()["misses"] == 1
+
+
+def test_verify_token_coalesces_concurrent_misses(stub_auth_server):
+    client = AuthClient(base_url=stub_auth_server.url)
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                *(client.verify_token("admin-token") for _ in range(20))
+            )
+        finally:
+            await client.close()
+
+    users = asyncio.run(run())
+
+    assert {user.email for user in users} == {"admin@example.com"}
+    assert stub_auth_server.request_count == 1
+
+
+def test_cancelled_caller_does_not_cancel_shared_lookup():
+    client = AuthClient()
+    calls = []
+    release = asyncio.Event()
+
+    async def fetch_user(token):
+        calls.append(token)
+        await release.wait()
+        return User({"email": "user@example.com"})
+
+    client.fetch_user = fetch_user
+
+    async def run():
+        leader = asyncio.create_task(client.verify_token("valid-token"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(client.verify_token("valid-token"))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    user = asyncio.run(run())
+
+    assert user.email == "user@example.com"
+    assert calls == ["valid-token"]
+    assert client.cache.stats()["size"] == 1
+
+
+def test_verify_token_caches_rejections(stub_auth_server):
+    client = AuthClient(base_url=stub_auth_server.url)
+
+    async def run():
+        try:
+            for _ in range(3):
+                with pytest.raises(HTTPException) as exc:
+                    await client.verify_token("bad-token")
+                assert exc.value.status_code == 401
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+    assert stub_auth_server.request_count == 1
+
+
+@pytest.mark.parametrize("token", ["error-token", "throttled-token"])
+def test_verify_token_does_not_cache_upstream_failures(stub_auth_server, token):
+    client = AuthClient(base_url=stub_auth_server.url)
+
+    async def run():
+        try:
+            for _ in range(3):
+                with pytest.raises(HTTPException) as exc:
+                    await client.verify_token(token)
+                assert exc.value.status_code == 503
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+    assert stub_auth_server.request_count == 3
+    assert client.cache.stats()["size"] == 0
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(max_size=2)
+    users = {name: User({"email": name}) for name in ("a", "b", "c")}
+
+    cache.set("a", users["a"])
+    cache.set("b", users["b"])
+    cache.get("a")
+    cache.set("c", users["c"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is users["a"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_token_cache_expires_entries():
+    cache = TokenCache(ttl=0)
+    cache.set("a", User({"email": "a"}))
+
+    assert cache.get("a") is None
@@ -0,0 +1,105 @@
+def test_bulk_update_products(client, query_counter):
+    query_counter.clear()
+
+    response = client.patch(
+        "/products/",
+        json=[
+            {"id": 1, "unit_price": 1.75},
+            {"id": 2, "unit_price": 1.80},
+            {"id": 3, "stock_quantity": 0},
+            {"id": 4, "stock_quantity": 40},
+            {"id": 5, "stock_quantity": 0},
+        ],
+    )
+
+    report = response.json()
+    assert report["updated"] == 5
+    assert report["missing"] == []
+    # One executemany UPDATE per distinct set of columns.
+    updates = [s for s in query_counter if s.startswith("UPDATE product")]
+    assert len(updates) == 2
+
+    pen = client.get("/products/2").json()
+    notebook = client.get("/products/3").json()
+    assert pen["unit_price"] == 1.80
+    assert (notebook["stock_quantity"], notebook["out_of_stock"]) == (0, True)
+    assert client.get("/products/4").json()["out_of_stock"] is False
+
+
+def test_bulk_update_bumps_updated_at(client):
+    etag = client.get("/products/6").headers["ETag"]
+
+    client.patch("/products/", json=[{"id": 6, "unit_price": 3.10}])
+
+    assert client.get("/products/6").headers["ETag"] != etag
+
+
+def test_bulk_update_rejects_missing_ids(client):
+    response = client.patch(
+        "/products/",
+        json=[{"id": 7, "unit_price": 9.99}, {"id": 999, "unit_price": 1.00}],
+    )
+
+    assert response.status_code == 404
+    assert response.json()["detail"]["missing"] == [999]
+    assert client.get("/products/7").json()["unit_price"] == 3.50
+
+
+def test_bulk_update_partial_mode_reports_missing_ids(client):
+    response = client.patch(
+        "/products/?partial=true",
+        json=[{"id": 7, "unit_price": 9.99}, {"id": 999, "unit_price": 1.00}],
+    )
+
+    report = response.json()
+    assert report["updated"] == 1
+    assert report["missing"] == [999]
+    assert report["rows"] == [
+        {"id": 7, "status": "updated", "error": None},
+        {"id": 999, "status": "missing", "error": "Product not found"},
+    ]
+    assert client.get("/products/7").json()["unit_price"] == 9.99
+
+
+def test_bulk_update_rejects_null_columns(client):
+    response = client.patch(
+        "/products/",
+        json=[{"id": 7, "unit_price": 9.99}, {"id": 8, "stock_quantity": None}],
+    )
+
+    assert response.status_code == 422
+    assert response.json()["detail"]["invalid"] == [8]
+    assert client.get("/products/7").json()["unit_price"] == 3.50
+
+
+def test_bulk_update_partial_mode_applies_groups_that_succeed(client, session):
+    session.connection().exec_driver_sql("""
+        CREATE TRIGGER reject_negative_price BEFORE UPDATE OF unit_price ON product
+        WHEN new.unit_price < 0
+        BEGIN
+            SELECT RAISE(ABORT, 'negative price');
+        END
+        """)
+    session.commit()
+
+    response = client.patch(
+        "/products/?partial=true",
+        json=[
+            {"id": 1, "unit_price": -1},
+            {"id": 2, "unit_price": 2.50},
+            {"id": 3, "stock_quantity": 7},
+            {"id": 4, "stock_quantity": None},
+        ],
+    )
+
+    report = response.json()
+    assert response.status_code == 200
+    assert report["updated"] == 1
+    assert report["failed"] == [1, 2, 4]
+    assert report["rows"][3] == {
+        "id": 4,
+        "status": "failed",
+        "error": "stock_quantity cannot be null",
+    }
+    assert client.get("/products/3").json()["stock_quantity"] == 7
+    assert client.get("/products/2").json()["unit_price"] != 2.50
@@ -0,0 +1,119 @@
+from app.categories import CategoryIndex
+from app.model import Product
+from app.product_cache import bump_product_version
+
+
+def get_summary(client):
+    response = client.get("/categories/?with_counts=true")
+    assert response.status_code == 200
+    return {entry["category"]: entry for entry in response.json()}
+
+
+def test_categories(client):
+    response = client.get("/categories/")
+
+    assert response.json() == ["Electronics", "Furniture", "Office", "Stationery"]
+
+
+def test_categories_with_counts(client):
+    summary = get_summary(client)
+
+    assert summary["Office"] == {
+        "category": "Office",
+        "product_count": 7,
+        "in_stock_count": 7,
+    }
+    assert summary["Furniture"]["product_count"] == 1
+
+
+def test_categories_served_from_index(client, query_counter):
+    get_summary(client)
+    query_counter.clear()
+
+    get_summary(client)
+    client.get("/categories/")
+
+    assert query_counter == []
+
+
+def test_categories_follow_product_writes(client):
+    get_summary(client)
+
+    client.post(
+        "/products/",
+        json={
+            "name": "Monitor",
+            "category": "Electronics",
+            "unit_price": 199.0,
+            "stock_quantity": 0,
+            "out_of_stock": True,
+        },
+    )
+    client.patch("/products/15", json={"category": "Lighting"})
+    client.delete("/products/4")
+
+    summary = get_summary(client)
+    assert summary["Electronics"]["product_count"] == 3
+    assert summary["Electronics"]["in_stock_count"] == 2
+    assert "Furniture" not in summary
+    assert summary["Lighting"]["product_count"] == 1
+    assert summary["Office"]["product_count"] == 6
+
+
+def test_categories_follow_stock_reservations(client, query_counter):
+    get_summary(client)
+    query_counter.clear()
+
+    batch = client.post(
+        "/orders/",
+        json={
+            "order_list": [
+                {
+                    "customer_name": "Jane",
+                    "customer_email": "jane@example.com",
+                    "items": [{"product_id": 15, "quantity": 15}],
+                }
+            ]
+        },
+    )
+
+    assert get_summary(client)["Furniture"]["in_stock_count"] == 0
+
+    client.post("/orders/cancel", json={"order_ids": [batch.json()["orders"][0]["id"]]})
+    assert get_summary(client)["Furniture"]["in_stock_count"] == 1
+    # Applied as deltas, the summary was never rebuilt.
+    assert not [s for s in query_counter if "GROUP BY product.category" in s]
+
+
+def test_categories_follow_bulk_updates(client, query_counter):
+    get_summary(client)
+    query_counter.clear()
+
+    client.patch(
+        "/products/",
+        json=[{"id": 15, "stock_quantity": 0}, {"id": 4, "category": "Furniture"}],
+    )
+
+    summary = get_summary(client)
+    assert summary["Furniture"]["product_count"] == 2
+    assert summary["Furniture"]["in_stock_count"] == 1
+    assert summary["Office"]["product_count"] == 6
+    assert not [s for s in query_counter if "GROUP BY product.category" in s]
+
+
+def test_rebuild_skips_deltas_it_already_counted(session):
+    index = CategoryIndex()
+    monitor = Product(name="Monitor", category="Electronics", unit_price=199)
+    session.add(monitor)
+    session.flush()
+    version = bump_product_version(session)
+    session.commit()
+
+    # A rebuild that ran between the commit and the write's delta.
+    summary = {entry["category"]: entry for entry in index.summary(session)}
+    index.product_added(monitor, version)
+    index.product_added(Product(category="Electronics", stock_quantity=1), version + 1)
+
+    counts = {entry["category"]: entry for entry in index.summary(session)}
+    assert summary["Electronics"]["product_count"] == 3
+    assert counts["Electronics"]["product_count"] == 4
@@ -0,0 +1,25 @@
+from app.database import create_db_engine
+
+
+def pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_file_engine_applies_sqlite_pragmas(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}", pool_size=3)
+
+    assert pragma(engine, "journal_mode") == "wal"
+    assert pragma(engine, "synchronous") == 1  # NORMAL
+    assert pragma(engine, "busy_timeout") == 5000
+    assert pragma(engine, "cache_size") == -65536
+    assert engine.pool.size() == 3
+    engine.dispose()
+
+
+def test_memory_engine_skips_pool_settings():
+    engine = create_db_engine("sqlite://")
+
+    assert pragma(engine, "busy_timeout") == 5000
+    assert pragma(engine, "journal_mode") == "memory"
+    engine.dispose()
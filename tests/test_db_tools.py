@@ -0,0 +1,95 @@
+from sqlalchemy import event, func, text
+from sqlmodel import Session, select
+
+from app.database import create_db_engine
+from app.db_tools import (
+    SAMPLE_PRODUCTS,
+    build_template,
+    copy_template,
+    prepare_database,
+    seed_products,
+)
+from app.migrations import HEAD, migrate
+from app.model import Product
+from benchmarks.startup_bench import missed_targets, summarize
+
+
+def product_count(engine):
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(Product)).one()
+
+
+def test_seed_products_is_idempotent(session):
+    session.delete(session.get(Product, 18))
+    session.commit()
+
+    assert seed_products(session) == 1
+    assert seed_products(session) == 0
+    assert len(session.exec(select(Product)).all()) == len(SAMPLE_PRODUCTS)
+
+
+def test_restart_skips_schema_work_and_seeding(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    assert prepare_database(engine) == HEAD
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    assert prepare_database(engine) == HEAD
+
+    assert len(statements) == 1
+    assert product_count(engine) == len(SAMPLE_PRODUCTS)
+    engine.dispose()
+
+
+def test_upgrade_seeds_only_when_asked(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    migrate(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM schema_version WHERE version > 1"))
+
+    assert prepare_database(engine) == HEAD
+    assert product_count(engine) == 0
+
+    assert prepare_database(engine, seed=True) == HEAD
+    assert product_count(engine) == len(SAMPLE_PRODUCTS)
+    engine.dispose()
+
+
+def test_database_bootstraps_from_template(tmp_path):
+    template = tmp_path / "template.db"
+    assert build_template(template) == HEAD
+    database = tmp_path / "app.db"
+    engine = create_db_engine(f"sqlite:///{database}")
+
+    assert prepare_database(engine, template_path=template, seed=False) == HEAD
+
+    assert product_count(engine) == len(SAMPLE_PRODUCTS)
+    assert not copy_template(template, database)
+    assert [path.name for path in tmp_path.glob("*.partial")] == []
+    engine.dispose()
+
+
+def test_startup_bench_checks_warm_scenarios_against_target():
+    runs = [
+        {"import_ms": 500, "startup_ms": 100, "cold_start_ms": 600, "process_ms": 900},
+        {
+            "import_ms": 700,
+            "startup_ms": 300,
+            "cold_start_ms": 1000,
+            "process_ms": 1300,
+        },
+        {"import_ms": 600, "startup_ms": 200, "cold_start_ms": 800, "process_ms": 1100},
+    ]
+    report = {
+        "new": {"cold_start_ms": 2000},
+        "template": {"cold_start_ms": 900},
+        "persistent": summarize(runs),
+    }
+
+    assert report["persistent"]["cold_start_ms"] == 800
+    assert missed_targets(report, 1000) == []
+    assert missed_targets(report, 850) == ["template"]
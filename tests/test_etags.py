@@ -0,0 +1,95 @@
+def test_product_etag_revalidation(client, query_counter):
+    first = client.get("/products/5")
+    etag = first.headers["ETag"]
+
+    query_counter.clear()
+    revalidated = client.get("/products/5", headers={"If-None-Match": etag})
+
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+    assert revalidated.content == b""
+    assert not any("product.name" in statement for statement in query_counter)
+
+
+def test_product_etag_changes_on_update(client):
+    etag = client.get("/products/5").headers["ETag"]
+
+    client.patch("/products/5", json={"unit_price": 2.50})
+    response = client.get("/products/5", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["unit_price"] == 2.50
+    assert response.headers["ETag"] != etag
+
+
+def test_product_list_etag_changes_on_any_product_write(client):
+    etag = client.get("/products/?limit=5").headers["ETag"]
+    assert (
+        client.get("/products/?limit=5", headers={"If-None-Match": etag}).status_code
+        == 304
+    )
+    assert (
+        client.get("/products/?limit=6", headers={"If-None-Match": etag}).status_code
+        == 200
+    )
+
+    client.patch("/products/17", json={"stock_quantity": 5})
+
+    assert (
+        client.get("/products/?limit=5", headers={"If-None-Match": etag}).status_code
+        == 200
+    )
+
+
+def test_order_etag_revalidation(client):
+    client.post(
+        "/orders/",
+        json={
+            "order_list": [
+                {
+                    "customer_name": "Jane",
+                    "customer_email": "jane@example.com",
+                    "items": [{"product_id": 1, "quantity": 1}],
+                }
+            ]
+        },
+    )
+    etag = client.get("/orders/1").headers["ETag"]
+
+    assert client.get("/orders/1", headers={"If-None-Match": etag}).status_code == 304
+
+    client.patch("/orders/1", json={"status": "shipped"})
+    response = client.get("/orders/1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "shipped"
+
+
+def test_product_etag_changes_when_order_deletion_restocks(client):
+    client.post(
+        "/orders/",
+        json={
+            "order_list": [
+                {
+                    "customer_name": "Jane",
+                    "customer_email": "jane@example.com",
+                    "items": [{"product_id": 3, "quantity": 4}],
+                }
+            ]
+        },
+    )
+    etag = client.get("/products/3").headers["ETag"]
+
+    assert client.delete("/orders/1").status_code == 200
+    response = client.get("/products/3", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["stock_quantity"] == 50
+    assert response.headers["ETag"] != etag
+
+
+def test_missing_product_has_no_etag(client):
+    response = client.get("/products/999", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
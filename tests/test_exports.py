@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app import exports
+
+
+def post_batch(client, *orders):
+    response = client.post(
+        "/orders/",
+        json={
+            "order_list": [
+                {
+                    "customer_name": f"Customer {idx}",
+                    "customer_email": f"customer{idx}@example.com",
+                    "items": [
+                        {"product_id": product_id, "quantity": quantity}
+                        for product_id, quantity in items
+                    ],
+                }
+                for idx, items in enumerate(orders)
+            ]
+        },
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Force orders to straddle fetch chunks.
+    monkeypatch.setattr(exports, "EXPORT_CHUNK_SIZE", 2)
+
+
+def test_export_products_ndjson(client, small_chunks):
+    response = client.get("/export/products")
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 18
+    assert rows[0]["name"] == "Blue Pen"
+    assert [row["id"] for row in rows] == list(range(1, 19))
+
+
+def test_export_products_csv(client, small_chunks):
+    response = client.get("/export/products?format=csv")
+
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 18
+    assert rows[3]["name"] == "Stapler"
+
+
+def test_export_orders_ndjson_groups_details(client, small_chunks):
+    post_batch(client, [(1, 1), (2, 2), (3, 3)], [(4, 1)], [(5, 2), (6, 1)])
+
+    response = client.get("/export/orders")
+
+    orders = [json.loads(line) for line in response.text.splitlines()]
+    assert [len(order["order_details"]) for order in orders] == [3, 1, 2]
+    assert orders[0]["order_details"][1] == {
+        "id": 2,
+        "product_id": 2,
+        "quantity": 2,
+        "unit_price": 1.5,
+        "subtotal": 3.0,
+    }
+
+
+def test_export_orders_csv_has_row_per_detail(client):
+    post_batch(client, [(1, 1), (2, 2)], [(4, 1)])
+
+    response = client.get("/export/orders?format=csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["id"], row["product_id"]) for row in rows] == [
+        ("1", "1"),
+        ("1", "2"),
+        ("2", "4"),
+    ]
+
+
+def test_export_since_filters_on_updated_at(client):
+    post_batch(client, [(1, 1)], [(2, 1)])
+    client.patch("/orders/2", json={"status": "shipped"})
+    exported = [
+        json.loads(line) for line in client.get("/export/orders").text.splitlines()
+    ]
+
+    response = client.get("/export/orders", params={"since": exported[1]["updated_at"]})
+
+    orders = [json.loads(line) for line in response.text.splitlines()]
+    assert [(order["id"], order["status"]) for order in orders] == [(2, "shipped")]
@@ -0,0 +1,69 @@
+import asyncio
+
+import httpx
+
+from app.app import app
+from benchmarks.http_bench import (
+    Result,
+    Workload,
+    benchmark,
+    load_orders,
+    parse_args,
+    percentile,
+    summarize,
+)
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0
+
+
+def test_summarize_groups_by_route():
+    results = [
+        Result("GET /products/", 200, 0.010),
+        Result("GET /products/", 200, 0.030),
+        Result("POST /orders/", 400, 0.050),
+    ]
+
+    report = summarize(results, elapsed=2.0)
+
+    assert report["total"]["requests"] == 3
+    assert report["total"]["errors"] == 1
+    assert report["routes"]["GET /products/"]["rps"] == 1.0
+    assert report["routes"]["GET /products/"]["p50_ms"] == 10.0
+    assert report["routes"]["POST /orders/"]["p99_ms"] == 50.0
+
+
+def test_parse_args_accepts_named_and_custom_mixes():
+    assert parse_args([]).mix["product_read"] == 6
+    assert parse_args(["--mix", "categories=2,order_batch"]).mix == {
+        "categories": 2,
+        "order_batch": 1,
+    }
+
+
+def test_benchmark_replays_mixed_workload(client, session):
+    args = parse_args(["--requests", "40", "--warmup", "0", "--concurrency", "4"])
+    workload = Workload(args.mix, load_orders(), batch_size=1)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+            return await benchmark(c, workload, args, headers={})
+
+    report = asyncio.run(run())
+
+    assert report["total"]["requests"] == 40
+    assert set(report["routes"]) <= {
+        "GET /categories/",
+        "GET /orders/",
+        "GET /products/",
+        "GET /products/{product_id}",
+        "POST /orders/",
+    }
+    assert report["routes"]["GET /products/{product_id}"]["errors"] == 0
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from app import imports
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(imports, "IMPORT_CHUNK_SIZE", 2)
+
+
+def product(name, **fields):
+    return {
+        "name": name,
+        "category": "Garden",
+        "unit_price": 9.99,
+        "stock_quantity": 10,
+        **fields,
+    }
+
+
+def test_import_json_array(client, small_chunks):
+    response = client.post(
+        "/products/import",
+        json=[
+            product("Shovel"),
+            product("Rake"),
+            product("Blue Pen"),
+            product("Shovel"),
+            {"name": "Hose"},
+        ],
+    )
+
+    report = response.json()
+    assert (report["created"], report["duplicates"], report["invalid"]) == (2, 2, 1)
+    assert [row["status"] for row in report["rows"]] == [
+        "created",
+        "created",
+        "duplicate",
+        "duplicate",
+        "invalid",
+    ]
+    created = client.get(f"/products/{report['rows'][1]['id']}").json()
+    assert created["name"] == "Rake"
+    assert client.get("/categories/").json().count("Garden") == 1
+
+
+def test_import_ndjson_stream(client, small_chunks):
+    body = "\n".join(json.dumps(product(f"Seed pack {i}")) for i in range(5))
+
+    response = client.post(
+        "/products/import",
+        content=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.json()["created"] == 5
+    assert len(client.get("/products/").json()) == 23
+
+
+def test_import_csv_stream(client):
+    body = (
+        "name,category,unit_price,stock_quantity\n"
+        'Trowel,Garden,4.50,12\n"Gloves, leather",Garden,7.25,30\n'
+        "Bad row,Garden,not-a-price,1\n"
+    )
+
+    response = client.post(
+        "/products/import",
+        content=body.encode(),
+        headers={"Content-Type": "text/csv"},
+    )
+
+    report = response.json()
+    assert (report["created"], report["invalid"]) == (2, 1)
+    assert report["rows"][1]["name"] == "Gloves, leather"
+    gloves = client.get(f"/products/{report['rows'][1]['id']}").json()
+    assert gloves["unit_price"] == 7.25
+
+
+def test_import_uses_set_based_statements(client, query_counter):
+    query_counter.clear()
+
+    client.post("/products/import", json=[product(f"Bulb {i}") for i in range(50)])
+
+    product_statements = [s for s in query_counter if "product" in s]
+    assert sum(s.startswith("INSERT INTO product") for s in product_statements) == 1
+    assert sum(s.startswith("SELECT product.name") for s in product_statements) == 1
+
+
+def test_import_rejects_unknown_content_type(client):
+    response = client.post(
+        "/products/import", content=b"x", headers={"Content-Type": "text/plain"}
+    )
+
+    assert response.status_code == 415
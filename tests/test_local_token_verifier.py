@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth_client import AuthClient, LocalTokenVerifier
+
+jwt = pytest.importorskip("jwt")
+rsa = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.rsa")
+serialization = pytest.importorskip("cryptography.hazmat.primitives.serialization")
+
+
+@pytest.fixture(scope="module")
+def private_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(scope="module")
+def public_pem(private_key):
+    return (
+        private_key.public_key()
+        .public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        .decode()
+    )
+
+
+def make_token(private_key, **overrides):
+    claims = {
+        "sub": "7",
+        "email": "local@example.com",
+        "is_superuser": True,
+        "aud": "inventory-api",
+        "iss": "https://auth.example.com",
+        "exp": int(time.time()) + 60,
+    }
+    claims.update(overrides)
+    headers = {"kid": "main"}
+    return jwt.encode(claims, private_key, algorithm="RS256", headers=headers)
+
+
+def make_verifier(public_pem, **kwargs):
+    return LocalTokenVerifier(
+        public_key=public_pem,
+        audience="inventory-api",
+        issuer="https://auth.example.com",
+        **kwargs,
+    )
+
+
+def test_verify_builds_user_from_claims(private_key, public_pem):
+    user = make_verifier(public_pem).verify(make_token(private_key))
+
+    assert user.id == 7
+    assert user.email == "local@example.com"
+    assert user.is_superuser is True
+
+
+def test_verify_with_jwk_set(private_key):
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": "main", "alg": "RS256", "use": "sig"})
+    verifier = LocalTokenVerifier(jwks={"keys": [jwk]}, audience="inventory-api")
+
+    assert verifier.verify(make_token(private_key)).email == "local@example.com"
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"exp": int(time.time()) - 60},
+        {"aud": "another-api"},
+        {"iss": "https://evil.example.com"},
+    ],
+)
+def test_verify_rejects_invalid_claims(private_key, public_pem, overrides):
+    verifier = make_verifier(public_pem, remote_fallback=True)
+
+    with pytest.raises(HTTPException) as exc:
+        verifier.verify(make_token(private_key, **overrides))
+    assert exc.value.status_code == 401
+
+
+def test_verify_rejects_unverifiable_token_without_fallback(public_pem):
+    with pytest.raises(HTTPException) as exc:
+        make_verifier(public_pem).verify("valid-token")
+    assert exc.value.status_code == 401
+
+
+def test_auth_client_falls_back_to_remote(private_key, public_pem, stub_auth_server):
+    client = AuthClient(
+        base_url=stub_auth_server.url,
+        verifier=make_verifier(public_pem, remote_fallback=True),
+    )
+
+    async def run():
+        try:
+            local = await client.verify_token(make_token(private_key))
+            remote = await client.verify_token("valid-token")
+            return local, remote
+        finally:
+            await client.close()
+
+    local, remote = asyncio.run(run())
+
+    assert local.email == "local@example.com"
+    assert remote.email == "user@example.com"
+    assert stub_auth_server.request_count == 1
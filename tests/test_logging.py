@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from loguru import logger
+
+from app.logging_config import (
+    REQUEST_ID_HEADER,
+    LogSampler,
+    json_sink,
+    log_sampler,
+    request_context,
+)
+from app.model import Product
+
+
+class Lines(list):
+    def write(self, text):
+        self.append(text)
+
+    def flush(self):
+        pass
+
+
+@pytest.fixture
+def records():
+    captured = []
+    handler_id = logger.add(captured.append, level="DEBUG", format="{message}")
+    log_sampler.reset()
+    yield captured
+    logger.remove(handler_id)
+
+
+def test_log_sampler_logs_first_then_every_nth_call():
+    sampler = LogSampler(every=10, per_second=0)
+
+    allowed = [sampler.allow("site") for _ in range(25)]
+
+    assert [i for i, ok in enumerate(allowed) if ok] == [0, 10, 20]
+    assert sampler.allow("other")
+    assert sampler.stats()["site"] == {"calls": 25, "suppressed": 22}
+
+
+def test_log_sampler_rate_limits_per_second():
+    sampler = LogSampler(every=1, per_second=3)
+
+    assert sum(sampler.allow("site") for _ in range(100)) <= 6
+
+
+def test_json_sink_writes_structured_lines():
+    lines = Lines()
+    handler_id = logger.add(json_sink(lines), level="INFO")
+    try:
+        with request_context("req-1"):
+            logger.info("Retrieved {} orders", 3, extra={"count": 3})
+    finally:
+        logger.remove(handler_id)
+
+    entry = json.loads(lines[0])
+    assert entry["message"] == "Retrieved 3 orders"
+    assert entry["level"] == "INFO"
+    assert entry["request_id"] == "req-1"
+    assert entry["count"] == 3
+
+
+def test_requests_carry_a_request_id(client, records):
+    response = client.get("/orders/999", headers={REQUEST_ID_HEADER: "abc123"})
+
+    assert response.headers[REQUEST_ID_HEADER] == "abc123"
+    assert any(
+        record.record["extra"].get("request_id") == "abc123" for record in records
+    )
+    assert len(client.get("/orders/999").headers[REQUEST_ID_HEADER]) == 32
+
+
+def test_large_batch_logs_a_bounded_number_of_records(session, records, create_batch):
+    session.get(Product, 1).stock_quantity = 1000
+    session.commit()
+    create_batch(session, *[[(1, 1)]] * 1000)
+
+    per_order = [r for r in records if r.record["function"] == "create_order_batch"]
+    assert len(per_order) <= 2 + 1000 // log_sampler.every
+    assert log_sampler.stats()["orders.create_order_batch.order"]["calls"] == 1000
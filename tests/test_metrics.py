@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+from sqlalchemy import text
+
+from app.auth_client import AuthClient
+from app.database import create_db_engine
+from app.metrics import (
+    Counter,
+    Histogram,
+    auth_request_duration,
+    db_pool_checked_out,
+    db_pool_checkouts,
+    db_pool_wait,
+    http_requests,
+    operations,
+    order_batch_size,
+)
+
+
+def test_counter_sums_per_thread_shards():
+    counter = Counter("jobs_total", "Jobs.", ("kind",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc("a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc("b", amount=2)
+
+    assert counter.value("a") == 4000
+    assert counter.render().splitlines() == [
+        "# HELP jobs_total Jobs.",
+        "# TYPE jobs_total counter",
+        'jobs_total{kind="a"} 4000',
+        'jobs_total{kind="b"} 2',
+    ]
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("size", "Sizes.", buckets=(1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+
+    assert histogram.render().splitlines()[2:] == [
+        'size_bucket{le="1"} 2',
+        'size_bucket{le="10"} 3',
+        'size_bucket{le="+Inf"} 4',
+        "size_sum 56.5",
+        "size_count 4",
+    ]
+
+
+def test_metrics_endpoint_reports_routes_and_operations(client):
+    labels = ("GET", "/products/{product_id}", "200")
+    requests = http_requests.value(*labels)
+    gets = operations.value("product", "get", "ok")
+    misses = operations.value("order", "get", "404")
+
+    client.get("/products/3")
+    client.get("/orders/999")
+    body = client.get("/metrics").text
+
+    assert http_requests.value(*labels) == requests + 1
+    assert operations.value("product", "get", "ok") == gets + 1
+    assert operations.value("order", "get", "404") == misses + 1
+    assert (
+        'http_requests_total{method="GET",route="/products/{product_id}",'
+        'status="200"}' in body
+    )
+    assert 'operation_duration_seconds_count{model_type="product",operation="get"}' in (
+        body
+    )
+    assert "http_requests_in_progress 1" in body
+
+
+def test_order_batch_sizes_are_recorded(client):
+    batches = order_batch_size.count()
+    order = {
+        "customer_name": "Jane",
+        "customer_email": "jane@example.com",
+        "items": [{"product_id": 1, "quantity": 1}],
+    }
+
+    client.post("/orders/", json={"order_list": [order] * 3})
+
+    assert order_batch_size.count() == batches + 1
+    assert order_batch_size.totals()[()][-1] >= 3
+
+
+def test_pool_checkouts_and_wait_time_are_recorded(database_url):
+    engine = create_db_engine(database_url)
+    checkouts = db_pool_checkouts.value("sync")
+    waits = db_pool_wait.count("sync")
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert db_pool_checked_out.value("sync") >= 1
+    engine.dispose()
+
+    assert db_pool_checkouts.value("sync") == checkouts + 1
+    assert db_pool_wait.count("sync") == waits + 1
+
+
+def test_auth_calls_are_timed(stub_auth_server):
+    client = AuthClient(base_url=stub_auth_server.url)
+    calls = auth_request_duration.count("200")
+
+    async def run():
+        try:
+            await client.fetch_user("valid-token")
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+    assert auth_request_duration.count("200") == calls + 1
@@ -0,0 +1,179 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, text
+from sqlmodel import Session, SQLModel
+
+import app.migrations as migrations
+from app.database import create_db_engine
+from app.db_tools import seed_products
+from app.migrations import (
+    HEAD,
+    HOT_QUERIES,
+    Migration,
+    add_column,
+    apply_migrations,
+    current_version,
+    explain,
+    full_scans,
+    migrate,
+    query_plans,
+)
+from app.search import search_statement
+
+# Schema objects added after databases were first created with create_all.
+LEGACY_DROPS = [
+    "DROP TABLE schema_version",
+    "DROP TABLE sales_rollup",
+    "DROP TABLE product_fts",
+    "DROP TABLE product_name_fts",
+    "DROP INDEX ix_order_details_order_id",
+    "DROP INDEX ix_order_details_product_id",
+    "DROP INDEX ix_order_order_batch_id",
+    "DROP INDEX ix_order_customer_email",
+    "DROP INDEX ix_product_category_stock_price",
+    "DROP INDEX ix_product_unit_price",
+]
+
+
+@pytest.fixture
+def legacy_engine(tmp_path, create_batch):
+    """Database created before versioning, holding products and an order."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed_products(session)
+        create_batch(session, [(1, 2)], customer_name="Legacy")
+    with engine.begin() as connection:
+        for statement in LEGACY_DROPS:
+            connection.execute(text(statement))
+    yield engine
+    engine.dispose()
+
+
+def versions(engine):
+    with engine.connect() as connection:
+        return [
+            row[0]
+            for row in connection.execute(
+                text("SELECT version FROM schema_version ORDER BY version")
+            )
+        ]
+
+
+def test_new_database_is_created_at_head(engine):
+    assert versions(engine) == list(range(1, HEAD + 1))
+    assert migrate(engine) == HEAD
+    assert versions(engine) == list(range(1, HEAD + 1))
+
+
+def test_legacy_database_is_upgraded_in_place(legacy_engine):
+    with legacy_engine.connect() as connection:
+        plan = explain(connection, HOT_QUERIES["order details by order"])
+    assert full_scans(plan)
+
+    assert migrate(legacy_engine) == HEAD
+
+    assert versions(legacy_engine) == list(range(1, HEAD + 1))
+    indexes = {
+        index["name"] for index in inspect(legacy_engine).get_indexes("order_details")
+    }
+    assert {"ix_order_details_order_id", "ix_order_details_product_id"} <= indexes
+    with Session(legacy_engine) as session:
+        rows = session.exec(search_statement(session, "pen")).all()
+        rollup = session.execute(text("SELECT units, lines FROM sales_rollup")).all()
+    assert [product.name for product, _, _ in rows] == ["Red Pen", "Blue Pen"]
+    assert rollup == [(2, 1)]
+
+
+def test_migrations_run_up_to_target(legacy_engine):
+    assert migrate(legacy_engine, target=2) == 2
+    with legacy_engine.connect() as connection:
+        assert current_version(connection) == 2
+        assert not inspect(connection).has_table("product_fts")
+
+    assert migrate(legacy_engine) == HEAD
+
+
+@pytest.mark.parametrize("database", ["new", "legacy"])
+def test_workers_migrate_concurrently(tmp_path, request, database):
+    if database == "legacy":
+        url = str(request.getfixturevalue("legacy_engine").url)
+    else:
+        url = f"sqlite:///{tmp_path / 'new.db'}"
+    engines = [create_db_engine(url) for _ in range(4)]
+    barrier = threading.Barrier(len(engines))
+
+    def start_worker(engine):
+        barrier.wait()
+        return apply_migrations(engine)
+
+    with ThreadPoolExecutor(len(engines)) as pool:
+        results = list(pool.map(start_worker, engines))
+
+    assert [version for version, _ in results] == [HEAD] * len(engines)
+    # Only a worker that found the database empty may seed it.
+    assert sum(created for _, created in results) == (database == "new")
+    assert versions(engines[0]) == list(range(1, HEAD + 1))
+    for engine in engines:
+        engine.dispose()
+
+
+def test_failed_migration_keeps_previous_version(engine, monkeypatch):
+    def broken(connection):
+        connection.execute(text("CREATE TABLE half_done (id INTEGER)"))
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(
+        migrations,
+        "MIGRATIONS",
+        [*migrations.MIGRATIONS, Migration(HEAD + 1, "broken", broken)],
+    )
+
+    with pytest.raises(RuntimeError):
+        migrate(engine, target=HEAD + 1)
+
+    assert versions(engine)[-1] == HEAD
+    assert not inspect(engine).has_table("half_done")
+
+
+def test_add_column_keeps_existing_rows(engine):
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE note (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO note (id) VALUES (1)"))
+
+    note = Table(
+        "note",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("priority", Integer, nullable=False, server_default="3"),
+    )
+    with engine.begin() as connection:
+        add_column(connection, note, "priority")
+        add_column(connection, note, "priority")
+        rows = connection.execute(text("SELECT id, priority FROM note")).all()
+
+    assert rows == [(1, 3)]
+
+
+def test_hot_queries_use_indexes(engine):
+    plans = query_plans(engine)
+
+    assert {name: full_scans(plan) for name, plan in plans.items()} == {
+        name: [] for name in HOT_QUERIES
+    }
+
+
+def test_schema_reference_matches_models():
+    reference = (Path(__file__).parents[1] / "db" / "schema" / "schema.sql").read_text()
+    tables = {}
+    for name, body in re.findall(r"^Table (\w+) \{\n(.*?)^\}", reference, re.M | re.S):
+        tables[name] = set(re.findall(r"^  (\w+) \w+", body.split("indexes")[0], re.M))
+
+    assert tables == {
+        table.name: set(table.columns.keys())
+        for table in SQLModel.metadata.sorted_tables
+    }
@@ -0,0 +1,225 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.model import (
+    OrderDetail,
+    Order,
+    OrderBatch,
+    Product,
+)
+from app.orders import delete_orders
+from app.product_cache import read_product_version
+
+
+def test_create_order_batch(session, create_batch):
+    batch = create_batch(session, [(1, 10), (3, 2)], [(1, 5)])
+
+    assert [order.total_amount for order in batch.orders] == [
+        1.50 * 10 + 4.99 * 2,
+        1.50 * 5,
+    ]
+    details = session.exec(select(OrderDetail)).all()
+    assert [(d.product_id, d.quantity, d.subtotal) for d in details] == [
+        (1, 10, 15.0),
+        (3, 2, 4.99 * 2),
+        (1, 5, 7.5),
+    ]
+    assert session.get(Product, 1).stock_quantity == 100 - 15
+    assert session.get(Product, 3).stock_quantity == 50 - 2
+
+
+def test_create_order_batch_checks_aggregated_demand(session, create_batch):
+    # Each order fits the stock of 25 on its own, together they do not.
+    with pytest.raises(HTTPException) as exc:
+        create_batch(session, [(4, 20)], [(4, 10)])
+
+    assert exc.value.status_code == 400
+    assert "Requested: 30" in exc.value.detail
+    assert session.get(Product, 4).stock_quantity == 25
+    assert session.exec(select(OrderDetail)).all() == []
+
+
+def test_create_order_batch_unknown_product(session, create_batch):
+    with pytest.raises(HTTPException) as exc:
+        create_batch(session, [(1, 1), (999, 1)])
+
+    assert exc.value.status_code == 404
+    assert session.get(Product, 1).stock_quantity == 100
+
+
+def test_create_order_batch_marks_sold_out_products(session, create_batch):
+    create_batch(session, [(15, 10)], [(15, 5)])
+
+    product = session.get(Product, 15)
+    assert product.stock_quantity == 0
+    assert product.out_of_stock is True
+
+
+def test_create_order_batch_reserves_against_current_stock(
+    session, engine, create_batch
+):
+    # Stock changed by another writer after this session loaded the product.
+    stale = session.get(Product, 4)
+    assert stale.stock_quantity == 25
+    session.expire_on_commit = False
+    session.commit()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE product SET stock_quantity = 3 WHERE id = 4")
+
+    with pytest.raises(HTTPException) as exc:
+        create_batch(session, [(4, 5)])
+
+    assert exc.value.status_code == 400
+    assert "Available: 3" in exc.value.detail
+
+
+def count_queries(client, query_counter, url):
+    query_counter.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    return len(query_counter)
+
+
+def test_order_reads_use_constant_number_of_queries(
+    client, session, query_counter, create_batch
+):
+    for _ in range(10):
+        create_batch(session, [(1, 1), (2, 1)], [(3, 1)])
+    session.expunge_all()
+
+    small_page = count_queries(client, query_counter, "/orders/?limit=2")
+    session.expunge_all()
+    large_page = count_queries(client, query_counter, "/orders/?limit=20")
+
+    assert large_page == small_page
+    assert large_page <= 3
+
+
+def test_create_empty_order_batch(client):
+    response = client.post("/orders/", json={"order_list": []})
+
+    assert response.status_code == 200
+    assert response.json()["orders"] == []
+
+
+def test_order_batch_response_uses_constant_number_of_queries(client, query_counter):
+    def post_batch(orders):
+        query_counter.clear()
+        response = client.post("/orders/", json={"order_list": orders})
+        assert response.status_code == 200
+        return response.json(), len(query_counter)
+
+    order = {
+        "customer_name": "Jane",
+        "customer_email": "jane@example.com",
+        "items": [{"product_id": 1, "quantity": 1}, {"product_id": 2, "quantity": 1}],
+    }
+    small_batch, small_queries = post_batch([order])
+    large_batch, large_queries = post_batch([order] * 20)
+
+    assert len(large_batch["orders"]) == 20
+    assert large_batch["orders"][0]["order_details"][0]["product"]["name"] == (
+        "Blue Pen"
+    )
+    assert large_queries == small_queries
+
+
+def test_delete_orders_restocks_aggregated_quantities(session, create_batch):
+    batch = create_batch(session, [(4, 20)], [(4, 5), (1, 3)], [(1, 7)])
+    assert session.get(Product, 4).out_of_stock
+    order_ids = [order.id for order in batch.orders]
+
+    result = delete_orders({"order_ids": order_ids[:2] + [999], "session": session})
+
+    assert result == {"ok": True, "deleted": order_ids[:2], "missing": [999]}
+    session.expire_all()
+    assert session.get(Product, 4).stock_quantity == 25
+    assert not session.get(Product, 4).out_of_stock
+    assert session.get(Product, 1).stock_quantity == 100 - 7
+    assert [o.id for o in session.exec(select(Order)).all()] == order_ids[2:]
+    details = session.exec(select(OrderDetail)).all()
+    assert [(d.product_id, d.quantity) for d in details] == [(1, 7)]
+
+
+def test_delete_orders_by_batch(session, create_batch):
+    batch = create_batch(session, [(1, 10)], [(3, 2)])
+    batch_id, order_ids = batch.id, [order.id for order in batch.orders]
+
+    result = delete_orders(
+        {"order_ids": [], "order_batch_id": batch_id, "session": session}
+    )
+
+    assert result["deleted"] == order_ids
+    session.expunge_all()
+    assert session.get(OrderBatch, batch_id) is None
+    assert session.exec(select(OrderDetail)).all() == []
+    assert session.get(Product, 1).stock_quantity == 100
+    assert session.get(Product, 3).stock_quantity == 50
+
+    with pytest.raises(HTTPException) as exc:
+        delete_orders({"order_ids": [], "order_batch_id": batch_id, "session": session})
+    assert exc.value.status_code == 404
+
+
+def test_delete_orders_does_not_restock_orders_deleted_concurrently(
+    session, engine, create_batch
+):
+    batch = create_batch(session, [(4, 20)], [(4, 5)])
+    order_ids = [order.id for order in batch.orders]
+    raced = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def delete_first_order(conn, cursor, statement, *args):
+        # Another worker cancels the first order between the reads and
+        # the restock of this delete.
+        if statement.startswith("UPDATE product") and not raced:
+            raced.append(True)
+            with Session(engine) as other:
+                delete_orders({"order_ids": order_ids[:1], "session": other})
+
+    try:
+        result = delete_orders({"order_ids": order_ids, "session": session})
+    finally:
+        event.remove(engine, "before_cursor_execute", delete_first_order)
+
+    assert result["deleted"] == order_ids[1:]
+    session.expire_all()
+    assert session.get(Product, 4).stock_quantity == 25
+    assert session.exec(select(Order)).all() == []
+
+
+def test_delete_missing_orders_leaves_product_version(session):
+    version = read_product_version(session)
+
+    result = delete_orders({"order_ids": [998, 999], "session": session})
+
+    assert result == {"ok": True, "deleted": [], "missing": [998, 999]}
+    assert read_product_version(session) == version
+
+
+def test_cancel_orders_uses_constant_number_of_queries(
+    client, session, query_counter, create_batch
+):
+    def cancel(count):
+        batch = create_batch(
+            session, *[[(product_id, 1)] for product_id in range(1, count + 1)]
+        )
+        session.expunge_all()
+        query_counter.clear()
+        response = client.post(
+            "/orders/cancel",
+            json={"order_ids": [order.id for order in batch.orders]},
+        )
+        assert response.status_code == 200
+        assert len(response.json()["deleted"]) == count
+        return len(query_counter)
+
+    assert cancel(2) == cancel(12)
+
+
+def test_cancel_orders_requires_ids_or_batch(client):
+    response = client.post("/orders/cancel", json={})
+
+    assert response.status_code == 422
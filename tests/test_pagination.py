@@ -0,0 +1,52 @@
+import pytest
+from fastapi import HTTPException, Response
+
+from app.pagination import (
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    set_next_cursor,
+)
+from app.products import list_products
+
+
+def list_page(session, limit, offset=0, cursor=None):
+    return list_products(
+        {"session": session, "offset": offset, "limit": limit, "cursor": cursor}
+    )
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(12345)) == 12345
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor("7")])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_cursor_pages_match_offset_pages(session):
+    by_offset = [p.id for p in list_page(session, limit=100)]
+
+    by_cursor = []
+    cursor = None
+    while True:
+        page = list_page(session, limit=5, cursor=cursor)
+        by_cursor.extend(p.id for p in page)
+        response = Response()
+        set_next_cursor(response, page, 5)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert by_cursor == by_offset
+    assert len(by_cursor) == 18
+
+
+def test_cursor_continues_after_offset_page(session):
+    first = list_page(session, limit=4, offset=2)
+    rest = list_page(session, limit=4, cursor=encode_cursor(first[-1].id))
+
+    assert [p.id for p in rest] == [7, 8, 9, 10]
@@ -0,0 +1,108 @@
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.migrations import migrate
+from app.product_cache import (
+    bump_product_version,
+    product_cache,
+    read_product_version,
+)
+
+
+def test_product_reads_are_served_from_cache(client, query_counter):
+    client.get("/products/3")
+    client.get("/products/?limit=5")
+    hits = product_cache.hits
+    query_counter.clear()
+
+    product = client.get("/products/3").json()
+    page = client.get("/products/?limit=5").json()
+
+    assert product["name"] == "A4 Notebook"
+    assert [p["id"] for p in page] == [1, 2, 3, 4, 5]
+    assert query_counter == []
+    assert product_cache.hits == hits + 2
+
+
+def test_update_invalidates_product_and_its_pages(client):
+    client.get("/products/3")
+    client.get("/products/?limit=5")
+    client.get("/products/?offset=10&limit=5")
+
+    invalidations = product_cache.invalidations
+    client.patch("/products/3", json={"unit_price": 5.49})
+
+    assert client.get("/products/3").json()["unit_price"] == 5.49
+    assert client.get("/products/?limit=5").json()[2]["unit_price"] == 5.49
+    assert product_cache.invalidations == invalidations + 1
+    # The page without product 3 survived the update.
+    hits = product_cache.hits
+    client.get("/products/?offset=10&limit=5")
+    assert product_cache.hits == hits + 1
+
+
+def test_cache_stats(client):
+    client.get("/products/1")
+
+    stats = client.get("/products/cache/stats").json()
+
+    assert stats["size"] > 0
+    assert set(stats) >= {"hits", "misses", "evictions", "hit_ratio"}
+
+
+def test_create_and_delete_invalidate_pages(client):
+    assert len(client.get("/products/").json()) == 18
+
+    client.delete("/products/18")
+    assert len(client.get("/products/").json()) == 17
+    assert client.get("/products/18").status_code == 404
+
+
+def test_order_batch_invalidates_reserved_products(client):
+    assert client.get("/products/1").json()["stock_quantity"] == 100
+
+    client.post(
+        "/orders/",
+        json={
+            "order_list": [
+                {
+                    "customer_name": "Jane",
+                    "customer_email": "jane@example.com",
+                    "items": [{"product_id": 1, "quantity": 10}],
+                }
+            ]
+        },
+    )
+
+    assert client.get("/products/1").json()["stock_quantity"] == 90
+
+
+def test_write_from_another_worker_clears_cache(client, engine, monkeypatch):
+    monkeypatch.setattr(product_cache, "check_interval", 0)
+    assert client.get("/products/2").json()["unit_price"] == 1.50
+
+    # Another process updates the product and bumps the shared version.
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE product SET unit_price = 1.75 WHERE id = 2")
+    with Session(engine) as other:
+        bump_product_version(other)
+        other.commit()
+
+    assert client.get("/products/2").json()["unit_price"] == 1.75
+
+
+def test_product_version_row_is_part_of_the_schema(engine):
+    with Session(engine) as session:
+        assert session.execute(text("SELECT version FROM cache_version")).all() == [
+            (0,)
+        ]
+        assert bump_product_version(session) == 1
+        session.commit()
+
+    # A database from before the row was part of the schema gets it added.
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM cache_version"))
+        connection.execute(text("DELETE FROM schema_version WHERE version >= 5"))
+    migrate(engine)
+    with Session(engine) as session:
+        assert read_product_version(session) == 0
@@ -0,0 +1,82 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.app import app
+from app.query_profiler import (
+    QUERY_PROFILE_HEADER,
+    QueryProfilerMiddleware,
+    instrument_engine,
+    profile_queries,
+    statement_shape,
+)
+
+
+def test_statement_shape_folds_in_lists_and_whitespace():
+    assert statement_shape("SELECT *\n  FROM t WHERE id IN (?, ?, ?)") == (
+        statement_shape("SELECT * FROM t WHERE id IN (?)")
+    )
+
+
+def test_profile_flags_repeated_statements(engine):
+    instrumentation = instrument_engine(engine)
+    try:
+        with profile_queries(repeat_threshold=3, slowest=2) as profile:
+            with engine.connect() as conn:
+                for product_id in range(1, 5):
+                    conn.execute(
+                        text("SELECT name FROM product WHERE id = :id"),
+                        {"id": product_id},
+                    )
+                conn.execute(text("SELECT count(*) FROM product"))
+    finally:
+        instrumentation.remove()
+
+    summary = profile.summary()
+    assert summary["queries"] == 5
+    assert summary["repeated"] == {"SELECT name FROM product WHERE id = ?": 4}
+    assert len(summary["slowest"]) == 2
+    assert profile.header_value().startswith("queries=5; db_ms=")
+    assert profile.header_value().endswith("repeated=1; max_repeat=4")
+
+
+def test_queries_outside_a_profile_are_ignored(engine):
+    instrumentation = instrument_engine(engine)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        with profile_queries() as profile:
+            pass
+    finally:
+        instrumentation.remove()
+
+    assert profile.count == 0
+
+
+def test_order_batch_has_no_repeated_statements(client, query_profile):
+    order = {
+        "customer_name": "Jane",
+        "customer_email": "jane@example.com",
+        "items": [{"product_id": 1, "quantity": 1}, {"product_id": 3, "quantity": 1}],
+    }
+
+    response = client.post("/orders/", json={"order_list": [order] * 20})
+
+    assert response.status_code == 200
+    assert query_profile.repeated() == {}
+    assert query_profile.count < 20
+
+
+def test_response_carries_query_profile_header(client, engine, async_engine):
+    instrumentations = [instrument_engine(engine), instrument_engine(async_engine)]
+    try:
+        profiled = TestClient(QueryProfilerMiddleware(app))
+        response = profiled.get("/orders/?limit=5")
+    finally:
+        for instrumentation in instrumentations:
+            instrumentation.remove()
+
+    fields = dict(
+        field.split("=") for field in response.headers[QUERY_PROFILE_HEADER].split("; ")
+    )
+    assert 1 <= int(fields["queries"]) <= 3
+    assert fields["repeated"] == "0"
@@ -0,0 +1,161 @@
+from datetime import date, datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import select
+
+import app.sales as sales
+from app.model import (
+    Order,
+    OrderUpdate,
+    SalesRollup,
+)
+from app.orders import delete_order, update_order
+from app.sales import SalesGrouping, rebuild_sales_rollup, sales_report
+
+
+def rollup(session):
+    return [
+        (
+            row.day,
+            row.product_id,
+            row.status,
+            row.units,
+            round(row.revenue, 2),
+            row.lines,
+        )
+        for row in session.exec(
+            select(SalesRollup).order_by(
+                SalesRollup.day, SalesRollup.product_id, SalesRollup.status
+            )
+        ).all()
+    ]
+
+
+def report(session, group_by, **kwargs):
+    return {
+        row.key: (row.units, row.revenue, row.lines)
+        for row in sales_report(session, group_by, **kwargs)
+    }
+
+
+def test_order_batch_updates_rollup(session, create_batch):
+    create_batch(session, [(1, 10), (3, 2)], [(1, 5)])
+
+    assert report(session, SalesGrouping.PRODUCT) == {
+        "1": (15, 22.5, 2),
+        "3": (2, 9.98, 1),
+    }
+    assert report(session, SalesGrouping.CATEGORY) == {"Stationery": (17, 32.48, 3)}
+
+
+def test_failed_batch_leaves_rollup_untouched(session, create_batch):
+    create_batch(session, [(4, 5)])
+    before = rollup(session)
+
+    with pytest.raises(HTTPException):
+        create_batch(session, [(4, 5)], [(4, 100)])
+
+    assert rollup(session) == before
+
+
+def test_status_change_moves_totals(session, create_batch):
+    batch = create_batch(session, [(1, 10)], [(3, 2)])
+    order_id = batch.orders[0].id
+
+    update_order(
+        {
+            "update_order": OrderUpdate(status="cancelled"),
+            "order_id": order_id,
+            "session": session,
+        }
+    )
+
+    assert report(session, SalesGrouping.PRODUCT) == {"3": (2, 9.98, 1)}
+    assert report(session, SalesGrouping.PRODUCT, statuses=["cancelled"]) == {
+        "1": (10, 15.0, 1)
+    }
+    assert [status for _, _, status, *_ in rollup(session)] == ["cancelled", "pending"]
+
+
+def test_delete_order_takes_totals_out(session, create_batch):
+    batch = create_batch(session, [(1, 10)], [(1, 5), (3, 2)])
+
+    delete_order({"order_id": batch.orders[1].id, "session": session})
+
+    assert rollup(session) == [(datetime.utcnow().date(), 1, "pending", 10, 15.0, 1)]
+
+
+def test_rebuild_matches_incremental_rollup(session, create_batch):
+    batch = create_batch(session, [(1, 10), (3, 2)], [(1, 5)], [(15, 1)])
+    update_order(
+        {
+            "update_order": OrderUpdate(status="completed"),
+            "order_id": batch.orders[0].id,
+            "session": session,
+        }
+    )
+    delete_order({"order_id": batch.orders[2].id, "session": session})
+    incremental = rollup(session)
+
+    rebuild_sales_rollup(session)
+
+    assert rollup(session) == incremental
+
+
+def test_rollup_without_upsert_support(session, monkeypatch, create_batch):
+    monkeypatch.setattr(sales, "UPSERT_DIALECTS", {})
+    today = datetime.utcnow().date()
+
+    batch = create_batch(session, [(1, 10), (3, 2)])
+    create_batch(session, [(1, 5)])
+    assert rollup(session) == [
+        (today, 1, "pending", 15, 22.5, 2),
+        (today, 3, "pending", 2, 9.98, 1),
+    ]
+
+    update_order(
+        {
+            "update_order": OrderUpdate(status="cancelled"),
+            "order_id": batch.orders[0].id,
+            "session": session,
+        }
+    )
+    incremental = rollup(session)
+    assert incremental == [
+        (today, 1, "cancelled", 10, 15.0, 1),
+        (today, 1, "pending", 5, 7.5, 1),
+        (today, 3, "cancelled", 2, 9.98, 1),
+    ]
+
+    rebuild_sales_rollup(session)
+    assert rollup(session) == incremental
+
+
+def test_report_by_day_and_range(session, create_batch):
+    batch = create_batch(session, [(1, 1)], [(1, 2)], [(1, 3)])
+    for order, day in zip(batch.orders, [1, 2, 3]):
+        session.get(Order, order.id).order_date = date(2025, 1, day)
+    session.commit()
+    rebuild_sales_rollup(session)
+
+    assert report(
+        session,
+        SalesGrouping.DAY,
+        start=date(2025, 1, 2),
+        end=date(2025, 1, 3),
+    ) == {"2025-01-02": (2, 3.0, 1), "2025-01-03": (3, 4.5, 1)}
+
+
+def test_sales_report_endpoint(client, session, query_counter, create_batch):
+    create_batch(session, [(1, 10), (15, 1)])
+
+    query_counter.clear()
+    response = client.get("/reports/sales", params={"group_by": "category"})
+
+    assert response.status_code == 200
+    assert [row["key"] for row in response.json()] == ["Furniture", "Stationery"]
+    assert len(query_counter) == 1
+
+    rebuilt = client.post("/reports/sales/rebuild")
+    assert rebuilt.json() == {"ok": True, "rows": 2}
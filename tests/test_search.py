@@ -0,0 +1,160 @@
+import pytest
+from sqlmodel import select
+
+import app.search as search
+from app.model import Product, ProductCreate, ProductUpdate
+from app.products import delete_product, import_product_chunk, update_product
+from app.search import SEARCH_INDEXES, rebuild_search_index, search_statement
+
+
+def names(session, query=None, **filters):
+    rows = session.exec(search_statement(session, query, **filters)).all()
+    return [product.name for product, _, _ in rows]
+
+
+def test_search_matches_prefix_of_last_term(session):
+    assert sorted(names(session, "note")) == ["A4 Notebook", "Sticky Notes"]
+    assert names(session, "whiteboard mark") == ["Whiteboard Marker"]
+
+
+def test_name_matches_rank_ahead_of_category_matches(session):
+    session.add(Product(name="Office Chair", category="Furniture", unit_price=90))
+    session.commit()
+
+    matches = names(session, "office")
+
+    assert matches[0] == "Office Chair"
+    assert "Stapler" in matches
+
+
+def test_search_combines_with_filters(session):
+    session.get(Product, 2).out_of_stock = True
+    session.commit()
+
+    assert names(session, "pen", out_of_stock=False) == ["Blue Pen"]
+    assert names(session, "marker", max_price=3) == ["Black Marker"]
+    assert names(session, "stapler", category="Stationery") == []
+    assert names(session, category="Furniture") == ["Desk Lamp"]
+    assert names(session, min_price=20, max_price=30) == ["Calculator"]
+
+
+def test_search_terms_are_not_parsed_as_query_syntax(session):
+    assert names(session, 'pen" OR (*') == []
+    assert names(session, "blue-pen") == ["Blue Pen"]
+    assert len(names(session, "  ", limit=5)) == 5
+
+
+def test_rank_window_keeps_newest_category_matches(session, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_RANK_WINDOW", 2)
+
+    assert names(session, "stationery", limit=1) == ["Ruler 12inch"]
+    # The candidates do not depend on the page.
+    assert names(session, "stationery", limit=5) == [
+        "Ruler 12inch",
+        "Whiteboard Marker",
+    ]
+    assert names(session, "stationery", offset=1) == ["Whiteboard Marker"]
+
+
+def test_name_matches_outside_rank_window_come_first(session, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_RANK_WINDOW", 2)
+    session.get(Product, 1).name = "Office Pen"
+    session.commit()
+
+    # Seven newer products match on their Office category.
+    assert names(session, "office") == ["Office Pen", "File Folder", "Tape Dispenser"]
+
+
+def test_index_follows_product_writes(session):
+    update_product(
+        {
+            "update_product": ProductUpdate(name="Halogen Lamp"),
+            "product_id": 15,
+            "session": session,
+        }
+    )
+    assert names(session, "desk") == []
+    assert names(session, "halogen") == ["Halogen Lamp"]
+
+    delete_product({"product_id": 15, "session": session})
+    assert names(session, "halogen") == []
+
+    records = [
+        (
+            1,
+            ProductCreate(
+                name="Gel Pen", category="Stationery", unit_price=2, stock_quantity=5
+            ).model_dump(),
+        )
+    ]
+    import_product_chunk(session, records, set())
+    assert "Gel Pen" in names(session, "gel")
+
+
+def test_rebuild_restores_index(session):
+    session.exec(select(Product)).all()
+    for table in SEARCH_INDEXES:
+        session.connection().exec_driver_sql(f"DELETE FROM {table}")
+    session.commit()
+    assert names(session, "pen") == []
+
+    rebuild_search_index(session)
+
+    assert names(session, "pen") == ["Red Pen", "Blue Pen"]
+
+
+@pytest.mark.parametrize(
+    "params, expected",
+    [
+        ({"q": "marker"}, ["Black Marker", "Whiteboard Marker"]),
+        ({"q": "lamp", "category": "Furniture"}, ["Desk Lamp"]),
+        ({"category": "Electronics"}, ["Calculator", "USB Drive 16GB"]),
+    ],
+)
+def test_search_endpoint(client, params, expected):
+    response = client.get("/products/search", params=params)
+
+    assert response.status_code == 200
+    assert sorted(product["name"] for product in response.json()) == expected
+
+
+def test_search_endpoint_pages_filtered_listing_by_cursor(client):
+    first = client.get("/products/search", params={"category": "Office", "limit": 2})
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(
+        "/products/search",
+        params={"category": "Office", "limit": 2, "cursor": cursor},
+    )
+
+    first_ids = [product["id"] for product in first.json()]
+    second_ids = [product["id"] for product in second.json()]
+    assert len(first_ids) == len(second_ids) == 2
+    assert max(first_ids) < min(second_ids)
+
+
+def test_search_endpoint_pages_ranked_matches_by_cursor(client):
+    created = client.post(
+        "/products/",
+        json={
+            "name": "Office Chair",
+            "category": "Furniture",
+            "unit_price": 90.0,
+            "stock_quantity": 3,
+            "out_of_stock": False,
+        },
+    )
+    assert created.status_code == 200
+    ranked = client.get("/products/search", params={"q": "office", "limit": 100})
+    expected = [product["id"] for product in ranked.json()]
+    assert "X-Next-Cursor" not in ranked.headers
+
+    seen, params = [], {"q": "office", "limit": 3}
+    while True:
+        response = client.get("/products/search", params=params)
+        seen += [product["id"] for product in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert seen == expected
+    assert len(expected) == 8
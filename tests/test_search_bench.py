@@ -0,0 +1,24 @@
+import json
+
+from benchmarks.search_bench import QUERIES, main, missed_targets
+
+
+def test_missed_targets_compares_medians():
+    results = [
+        {"params": {"query": "pen"}, "median_ms": 4.0},
+        {"params": {"query": "lamp"}, "median_ms": 12.5},
+    ]
+
+    assert missed_targets(results, 10) == [{"query": "lamp"}]
+    assert missed_targets(results, 20) == []
+
+
+def test_search_bench_holds_latency_target(capsys):
+    # A small catalog keeps the test quick; the FTS scans are bounded by
+    # SEARCH_RANK_WINDOW, not the catalog size.
+    status = main(["--products", "20000", "--repeat", "5", "--target-ms", "10"])
+
+    report = json.loads(capsys.readouterr().out)
+    assert report["failed"] == []
+    assert status == 0
+    assert len(report["queries"]) == len(QUERIES)
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlmodel import select
+
+import app.serialization as serialization
+from app.model import (
+    Order,
+    OrderBatchResponse,
+    OrderPublic,
+    Product,
+    ProductPublic,
+)
+from app.orders import order_details_loader
+from app.serialization import render_json
+
+
+def fastapi_body(content, response_model) -> bytes:
+    """Body FastAPI produces for ``content`` under ``response_model``."""
+    field = create_model_field("Response", response_model, mode="serialization")
+    serialized = asyncio.run(serialize_response(field=field, response_content=content))
+    return JSONResponse(serialized).body
+
+
+def test_products_render_like_fastapi(session):
+    products = session.exec(select(Product)).all()
+
+    rendered = render_json(products, list[ProductPublic])
+
+    assert rendered.body == fastapi_body(products, list[ProductPublic])
+
+
+def test_orders_render_like_fastapi(session, create_batch):
+    create_batch(session, *[[(1, 3), (3, 1)]] * 3, customer_name="Zoë Ünal")
+    orders = session.exec(select(Order).options(order_details_loader)).all()
+
+    rendered = render_json(orders, list[OrderPublic])
+
+    assert rendered.body == fastapi_body(orders, list[OrderPublic])
+
+
+def test_order_batch_renders_like_fastapi(session, create_batch):
+    batch = create_batch(session, *[[(1, 3), (3, 1)]] * 3, customer_name="Zoë Ünal")
+
+    rendered = render_json(batch, OrderBatchResponse)
+
+    assert rendered.body == fastapi_body(batch, OrderBatchResponse)
+    assert rendered.media_type == "application/json"
+
+
+@pytest.mark.parametrize("url", ["/products/?limit=5", "/orders/?limit=2"])
+def test_fast_responses_match_validated_responses(
+    client, session, monkeypatch, url, create_batch
+):
+    create_batch(session, *[[(1, 3), (3, 1)]] * 3, customer_name="Zoë Ünal")
+    session.expunge_all()
+
+    fast = client.get(url)
+    monkeypatch.setattr(serialization, "FAST_SERIALIZATION", False)
+    validated = client.get(url)
+
+    assert fast.status_code == validated.status_code == 200
+    assert fast.content == validated.content
+    assert fast.headers["content-type"] == validated.headers["content-type"]
+    assert fast.headers.get("X-Next-Cursor") == validated.headers.get("X-Next-Cursor")
+    assert fast.headers.get("ETag") == validated.headers.get("ETag")